@@ -4,14 +4,18 @@ from models.models import db
 from routes.routes import api
 from dotenv import load_dotenv
 from middleware import setup_cors_middleware
+from commands import setup_commands
+from config_servidor import opcoes_engine
+from services.cache_respostas import configurar_cache
+from services.logs import configurar_logs
+from services.metricas import configurar_metricas
 import os
-import logging
 
 def create_app():
     app = Flask(__name__)
     
-    # Configurar logging
-    logging.basicConfig(level=logging.DEBUG)
+    # Logs em JSON escritos por uma thread própria (services/logs.py)
+    configurar_logs()
     
     # Forçar carregamento do arquivo correto baseado no ambiente
     env = os.getenv('FLASK_ENV', 'production')
@@ -39,12 +43,22 @@ def create_app():
     try:
         app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        # Pool dimensionado pelo perfil do Gunicorn (threads/greenlets por worker)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(os.getenv('DATABASE_URL'))
         db.init_app(app)
         app.logger.info("Banco de dados configurado com sucesso")
     except Exception as e:
         app.logger.error(f"Erro ao configurar banco de dados: {str(e)}")
         
+    # Respostas em fluxo já saem comprimidas em blocos (services/serializacao.py);
+    # o Flask-Compress leria o fluxo inteiro para comprimir de uma vez
+    app.config['COMPRESS_STREAMS'] = False
+    
+    # Primeiro, para medir também o tempo dos demais hooks
+    configurar_metricas(app)
+    configurar_cache(app)
     setup_cors_middleware(app)
+    setup_commands(app)
     
     # Registrar blueprint para API
     app.register_blueprint(api, url_prefix='/api')
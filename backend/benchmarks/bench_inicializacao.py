@@ -0,0 +1,131 @@
+"""
+Benchmark da inicialização de um worker.
+
+"frio": um processo Python novo importa o wsgi (create_app) e atende a
+primeira requisição, como um worker do Gunicorn sem preload_app a cada
+reciclagem (max_requests). "preload": a aplicação já construída no processo
+mestre é copiada com fork e atende a primeira requisição, como no
+preload_app. Também mostra, pelo `python -X importtime`, os pacotes que mais
+pesam na importação e se pandas/openpyxl foram carregados na subida.
+
+Executar a partir da pasta backend:
+    python -m benchmarks.bench_inicializacao [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from benchmarks.carga import PASTA_RESULTADOS, commit_atual
+from benchmarks.semente import percentil
+
+PASTA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS_PESADOS = ('pandas', 'numpy', 'openpyxl')
+
+SCRIPT_WORKER = """
+import json, sys, time
+inicio = time.perf_counter()
+from wsgi import app
+pronto = time.perf_counter()
+app.test_client().get('/')
+fim = time.perf_counter()
+print(json.dumps({
+    'create_app_ms': (pronto - inicio) * 1000,
+    'primeira_requisicao_ms': (fim - pronto) * 1000,
+    'modulos_pesados': [m for m in %r if m in sys.modules],
+}))
+""" % (MODULOS_PESADOS,)
+
+def ambiente():
+    return dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.join(tempfile.gettempdir(), 'valex_benchmark_inicializacao.db'),
+        CACHE_DIR=tempfile.mkdtemp(prefix='valex-cache-'),
+    )
+
+def importacoes_por_pacote(saida_importtime):
+    """
+    Soma o tempo próprio (self, em µs) de cada pacote de primeiro nível a
+    partir da saída do `-X importtime`.
+    """
+    por_pacote = defaultdict(int)
+    for linha in saida_importtime.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, _, nome = linha[len('import time:'):].split('|')
+        por_pacote[nome.strip().split('.')[0]] += int(proprio)
+    return por_pacote
+
+def worker_frio():
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT_WORKER],
+        cwd=PASTA_BACKEND, env=ambiente(), capture_output=True, text=True, check=True
+    )
+    total_ms = (time.perf_counter() - inicio) * 1000
+    medidas = json.loads(processo.stdout.strip().splitlines()[-1])
+    return total_ms, medidas, importacoes_por_pacote(processo.stderr)
+
+def worker_preload(app):
+    inicio = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        app.test_client().get('/')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return (time.perf_counter() - inicio) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--saida', help="arquivo JSON do resultado (padrão: benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    frios = [worker_frio() for _ in range(args.repeticoes)]
+    tempos_frios = [total for total, _, _ in frios]
+    _, medidas, por_pacote = frios[-1]
+
+    tempos_preload = []
+    if hasattr(os, 'fork'):
+        os.environ.update(ambiente())
+        sys.path.insert(0, PASTA_BACKEND)
+        from wsgi import app
+        tempos_preload = [worker_preload(app) for _ in range(args.repeticoes)]
+
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'worker_frio_ms': round(percentil(tempos_frios, 0.5), 1),
+        'create_app_ms': round(medidas['create_app_ms'], 1),
+        'primeira_requisicao_ms': round(medidas['primeira_requisicao_ms'], 1),
+        'worker_preload_ms': round(percentil(tempos_preload, 0.5), 1) if tempos_preload else None,
+        'modulos_pesados_na_subida': medidas['modulos_pesados'],
+        'importacao_por_pacote_ms': {
+            pacote: round(micro / 1000, 1)
+            for pacote, micro in sorted(por_pacote.items(), key=lambda item: -item[1])[:10]
+        },
+    }
+
+    print(f"Worker frio (processo novo, mediana de {args.repeticoes}): {resultado['worker_frio_ms']:.0f} ms"
+          f" (create_app {resultado['create_app_ms']:.0f} ms, primeira requisição {resultado['primeira_requisicao_ms']:.0f} ms)")
+    if tempos_preload:
+        print(f"Worker com preload (fork do mestre): {resultado['worker_preload_ms']:.0f} ms")
+    print(f"Carregados na subida: {', '.join(resultado['modulos_pesados_na_subida']) or 'nenhum de ' + ', '.join(MODULOS_PESADOS)}")
+    print("Importação por pacote (tempo próprio):")
+    for pacote, ms in resultado['importacao_por_pacote_ms'].items():
+        print(f"  {pacote:<24}{ms:>8.1f} ms")
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        saida = os.path.join(PASTA_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-inicializacao-{resultado['commit'] or 'local'}.json")
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em {saida}")
+
+if __name__ == '__main__':
+    main()
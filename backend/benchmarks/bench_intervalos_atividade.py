@@ -0,0 +1,153 @@
+"""
+Benchmark dos endpoints de colheita antes/depois dos filtros por intervalo.
+
+"antes": consultas no formato antigo (DATE(created_at), uma consulta por
+produtor no resumo geral) sobre os índices que existiam no dump.
+"depois": as mesmas consultas com intervalos semiabertos (e o resumo diário
+no resumo geral), com os índices da migração 0003. A última coluna mede o
+endpoint completo, incluindo a serialização.
+
+Executar a partir da pasta backend:
+    python -m benchmarks.bench_intervalos_atividade [--dias 150]
+"""
+import argparse
+from datetime import datetime, timedelta
+from benchmarks.semente import criar_app_benchmark, semear_safra, cronometrar
+from services.datas import hoje_local, intervalo_utc
+
+def consultas_legadas(db, modelos, produtor_id):
+    Produtor, Atividade, Variedade, ClassificacaoUva = modelos
+    hoje = datetime.utcnow().date()
+    
+    def resumo_semana():
+        db.session.query(
+            Atividade, Variedade.nome, ClassificacaoUva.classificacao
+        ).join(
+            Variedade, Atividade.variedade_id == Variedade.id
+        ).outerjoin(
+            ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
+        ).filter(
+            Atividade.produtor_id == produtor_id,
+            db.func.date(Atividade.created_at) >= hoje - timedelta(days=7),
+            db.func.date(Atividade.created_at) <= hoje
+        ).all()
+        
+    def resumo_geral():
+        for produtor in Produtor.query.all():
+            db.session.query(
+                Atividade, Variedade.nome, ClassificacaoUva.classificacao
+            ).join(
+                Variedade, Atividade.variedade_id == Variedade.id
+            ).outerjoin(
+                ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
+            ).filter(
+                Atividade.produtor_id == produtor.id,
+                db.func.date(Atividade.created_at) == hoje
+            ).all()
+            
+    def estatisticas():
+        filtro = db.func.date(Atividade.created_at) == hoje
+        db.session.query(db.func.sum(Atividade.quantidade_pallets)).filter(filtro).scalar()
+        db.session.query(db.func.count(db.distinct(Atividade.produtor_id))).filter(filtro).scalar()
+        db.session.query(Atividade.tipo_atividade, db.func.count(Atividade.id)).filter(filtro).group_by(Atividade.tipo_atividade).all()
+        
+    return {
+        'resumo_semana': resumo_semana,
+        'resumo_geral': resumo_geral,
+        'estatisticas': estatisticas,
+    }
+
+def consultas_por_intervalo(db, modelos, produtor_id):
+    Produtor, Atividade, Variedade, ClassificacaoUva, ResumoDiarioAtividade = modelos
+    hoje = hoje_local()
+    semana = intervalo_utc(hoje - timedelta(days=7), hoje)
+    dia = intervalo_utc(hoje)
+    
+    def resumo_semana():
+        db.session.query(
+            Atividade, Variedade.nome, ClassificacaoUva.classificacao
+        ).join(
+            Variedade, Atividade.variedade_id == Variedade.id
+        ).outerjoin(
+            ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
+        ).filter(
+            Atividade.produtor_id == produtor_id,
+            Atividade.created_at >= semana[0],
+            Atividade.created_at < semana[1]
+        ).all()
+        
+    def resumo_geral():
+        db.session.query(
+            Produtor.id, Variedade.nome, ClassificacaoUva.classificacao, ResumoDiarioAtividade.total_pallets
+        ).outerjoin(
+            ResumoDiarioAtividade, db.and_(
+                ResumoDiarioAtividade.produtor_id == Produtor.id,
+                ResumoDiarioAtividade.data == hoje
+            )
+        ).outerjoin(
+            Variedade, ResumoDiarioAtividade.variedade_id == Variedade.id
+        ).outerjoin(
+            ClassificacaoUva, ResumoDiarioAtividade.classificacao_id == ClassificacaoUva.id
+        ).all()
+        
+    def estatisticas():
+        filtro = (Atividade.created_at >= dia[0], Atividade.created_at < dia[1])
+        db.session.query(db.func.sum(Atividade.quantidade_pallets)).filter(*filtro).scalar()
+        db.session.query(db.func.count(db.distinct(Atividade.produtor_id))).filter(*filtro).scalar()
+        db.session.query(Atividade.tipo_atividade, db.func.count(Atividade.id)).filter(*filtro).group_by(Atividade.tipo_atividade).all()
+        
+    return {
+        'resumo_semana': resumo_semana,
+        'resumo_geral': resumo_geral,
+        'estatisticas': estatisticas,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dias', type=int, default=150)
+    parser.add_argument('--produtores', type=int, default=40)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+    
+    app = criar_app_benchmark()
+    total = semear_safra(app, dias=args.dias, produtores=args.produtores)
+    print(f"Safra sintética: {total} atividades em {args.dias} dias")
+    
+    from models.models import db, Produtor, Atividade, Variedade, ClassificacaoUva, ResumoDiarioAtividade
+    
+    indice_composto = next(i for i in Atividade.__table__.indexes if i.name == 'idx_atividade_produtor_created_at')
+    client = app.test_client()
+    
+    with app.app_context():
+        # Esquema do dump: índices simples em produtor_id e created_at
+        indice_composto.drop(db.engine)
+        indice_produtor = db.Index('idx_atividade_produtor_id', Atividade.produtor_id)
+        indice_produtor.create(db.engine)
+        
+        legadas = consultas_legadas(db, (Produtor, Atividade, Variedade, ClassificacaoUva), produtor_id=1)
+        antes = {nome: cronometrar(consulta, args.repeticoes) for nome, consulta in legadas.items()}
+        
+        indice_produtor.drop(db.engine)
+        indice_composto.create(db.engine)
+        
+        novas = consultas_por_intervalo(
+            db, (Produtor, Atividade, Variedade, ClassificacaoUva, ResumoDiarioAtividade), produtor_id=1
+        )
+        depois = {nome: cronometrar(consulta, args.repeticoes) for nome, consulta in novas.items()}
+        
+    endpoints = {
+        'resumo_semana': '/api/atividades/resumo/1',
+        'resumo_geral': '/api/gestor/resumo-geral',
+        'estatisticas': '/api/gestor/estatisticas',
+    }
+    endpoint = {
+        nome: cronometrar(lambda url=url: client.get(url), args.repeticoes)
+        for nome, url in endpoints.items()
+    }
+    
+    print(f"{'endpoint':<16}{'antes (ms)':>12}{'depois (ms)':>13}{'endpoint (ms)':>15}")
+    for nome in endpoints:
+        print(f"{nome:<16}{antes[nome]:>12.2f}{depois[nome]:>13.2f}{endpoint[nome]:>15.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark da serialização do balancete completo.
+
+"legado": objetos ORM, dicionários montados com float() e o json da
+biblioteca padrão (como a rota fazia). "colunas": with_entities com o
+ProvedorJSON (orjson quando instalado). "fluxo": a resposta em blocos de
+/contabilidade/balancete/completo, lida até o fim. Mostra a mediana do tempo
+e o pico de memória alocada (tracemalloc) de cada forma.
+
+Executar a partir da pasta backend:
+    python -m benchmarks.bench_serializacao [--linhas 50000]
+"""
+import argparse
+import io
+import json
+import tracemalloc
+from benchmarks.semente import criar_app_benchmark, cronometrar
+
+def balancete_csv(linhas):
+    cabecalho = "Conta,Reduz,Tp,Descricao,Saldo Anterior,Debito Periodo,Credito Periodo,Saldo Atual\n"
+    corpo = "\n".join(
+        f"{i // 1000 + 1}.{i // 100 % 10 + 1}.{i},{i},A,Conta {i},\"1.234,56\",\"100,00\",\"50,25\",\"1.284,31\""
+        for i in range(linhas)
+    )
+    return (cabecalho + corpo).encode()
+
+def pico_memoria_mb(funcao):
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+    
+    app = criar_app_benchmark()
+    
+    from services import balancete, importacao_balancete
+    from services.serializacao import orjson, para_json
+    
+    with app.app_context():
+        importacao_balancete.importar_balancete(io.BytesIO(balancete_csv(args.linhas)), '2024-12')
+        
+        def legado():
+            itens = balancete.itens_publicados().all()
+            json.dumps([{
+                'id': item.id,
+                'conta': item.conta,
+                'reducao': item.reducao,
+                'tipo': item.tipo,
+                'descricao': item.descricao,
+                'valor_anterior': float(item.valor_anterior) if item.valor_anterior else 0.0,
+                'valor_periodo_debito': float(item.valor_periodo_debito) if item.valor_periodo_debito else 0.0,
+                'valor_periodo_credito': float(item.valor_periodo_credito) if item.valor_periodo_credito else 0.0,
+                'valor_atual': float(item.valor_atual) if item.valor_atual else 0.0,
+                'competencia': item.competencia
+            } for item in itens], sort_keys=True)
+            
+        def colunas():
+            itens = balancete.itens_publicados().with_entities(*balancete.colunas_itens()).all()
+            para_json([item._asdict() for item in itens])
+            
+        formas = {'legado': legado, 'colunas': colunas}
+        medidas = {}
+        for nome, funcao in formas.items():
+            medidas[nome] = (cronometrar(funcao, args.repeticoes), pico_memoria_mb(funcao))
+            
+    client = app.test_client()
+    
+    def fluxo():
+        resposta = client.get('/api/contabilidade/balancete/completo')
+        for _ in resposta.response:
+            pass
+        resposta.close()
+        
+    medidas['fluxo'] = (cronometrar(fluxo, args.repeticoes), pico_memoria_mb(fluxo))
+    
+    print(f"{args.linhas} itens; serializador: {'orjson' if orjson else 'json (biblioteca padrão)'}")
+    print(f"{'forma':<10}{'tempo (ms)':>12}{'pico (MB)':>12}")
+    for nome, (tempo, pico) in medidas.items():
+        print(f"{nome:<10}{tempo:>12.1f}{pico:>12.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Suíte de carga HTTP da API.
+
+Sobe o create_app() num servidor local com threads, sobre o banco de
+benchmark semeado, e reproduz um cenário de tráfego com `--clientes`
+clientes simultâneos durante `--duracao` segundos:
+
+- cooperados: registro de atividades e consulta de histórico/resumo
+- gestor: painel do gestor (resumo geral, estatísticas, cadastros)
+- importacoes: envio do plano de contas e do balancete (a rota só agenda o
+  job; a importação roda no pool de processos e não entra na latência)
+- safra: os três juntos, com importações ocasionais
+
+Mostra por endpoint: requisições/s, p50/p95/p99 e comandos SQL por
+requisição. O resultado é salvo em JSON (com o commit atual) para comparar
+execuções entre commits com `--comparar`.
+
+Executar a partir da pasta backend:
+    python -m benchmarks.carga --cenario safra [--saida resultado.json] [--comparar anterior.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from benchmarks.semente import criar_app_benchmark, percentil, semear_safra
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Cada requisição do cenário: (peso, nome do endpoint, gerador)
+# O gerador recebe (aleatorio, contexto) e retorna (método, caminho, corpo, tipo do corpo)
+
+def _atividade(aleatorio, contexto):
+    produtor_id = aleatorio.randint(1, contexto['produtores'])
+    corpo = json.dumps({
+        'produtor_id': produtor_id, 'fazenda_id': produtor_id * 2 - 1, 'variedade_id': 1,
+        'classificacao_id': aleatorio.randint(1, 6), 'tipo_atividade': 'colheita',
+        'quantidade_pallets': aleatorio.randint(1, 6), 'caixas': aleatorio.randint(20, 120)
+    }).encode()
+    return 'POST', '/api/atividades', corpo, 'application/json'
+
+def _get(caminho):
+    def gerador(aleatorio, contexto):
+        return 'GET', caminho.format(produtor=aleatorio.randint(1, contexto['produtores'])), None, None
+    return gerador
+
+def _multipart(nome_arquivo, conteudo, campos=None):
+    fronteira = uuid.uuid4().hex
+    partes = []
+    for nome, valor in (campos or {}).items():
+        partes.append(f'--{fronteira}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode())
+    partes.append(
+        f'--{fronteira}\r\nContent-Disposition: form-data; name="arquivo"; filename="{nome_arquivo}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'.encode() + conteudo + b'\r\n'
+    )
+    partes.append(f'--{fronteira}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={fronteira}'
+
+def _importar_plano(aleatorio, contexto):
+    corpo, tipo = _multipart('plano.csv', contexto['plano_csv'])
+    return 'POST', '/api/contabilidade/importar-plano', corpo, tipo
+
+def _importar_balancete(aleatorio, contexto):
+    corpo, tipo = _multipart('balancete.csv', contexto['balancete_csv'], {'competencia': '2024-12'})
+    return 'POST', '/api/contabilidade/importar-balancete-csv', corpo, tipo
+
+COOPERADOS = [
+    (20, 'POST /atividades', _atividade),
+    (40, 'GET /atividades/historico/<id>', _get('/api/atividades/historico/{produtor}')),
+    (40, 'GET /atividades/resumo/<id>', _get('/api/atividades/resumo/{produtor}')),
+]
+GESTOR = [
+    (40, 'GET /gestor/resumo-geral', _get('/api/gestor/resumo-geral')),
+    (40, 'GET /gestor/estatisticas', _get('/api/gestor/estatisticas')),
+    (10, 'GET /produtores', _get('/api/produtores')),
+    (10, 'GET /classificacoes', _get('/api/classificacoes')),
+]
+IMPORTACOES = [
+    (50, 'POST /contabilidade/importar-plano', _importar_plano),
+    (50, 'POST /contabilidade/importar-balancete-csv', _importar_balancete),
+]
+CENARIOS = {
+    'cooperados': COOPERADOS,
+    'gestor': GESTOR,
+    'importacoes': IMPORTACOES,
+    # Tabletes no campo são a maior parte do tráfego; importações são raras
+    'safra': [(peso * 7, nome, g) for peso, nome, g in COOPERADOS]
+           + [(peso * 3, nome, g) for peso, nome, g in GESTOR]
+           + [(1, nome, g) for _, nome, g in IMPORTACOES],
+}
+
+def arquivos_contabeis(contas_por_grupo=100):
+    """
+    CSVs de plano de contas e balancete no formato exportado pelo sistema contábil.
+    """
+    plano, balancete = [], []
+    for raiz in range(1, 6):
+        plano.append(f";{raiz};S;Grupo {raiz};")
+        for grupo in range(1, 11):
+            plano.append(f";{raiz}.{grupo};S;Subgrupo {raiz}.{grupo};")
+            for conta in range(1, contas_por_grupo + 1):
+                codigo = f"{raiz}.{grupo}.{conta}"
+                plano.append(f"{len(plano)};{codigo};A;Conta {codigo};{len(plano)}")
+                balancete.append(f"{codigo},{len(plano)},A,Conta {codigo},100.00,50.00,25.00,125.00")
+                
+    plano_csv = "sequencial;codigo;tipo;descricao;referencia\n" + "\n".join(plano)
+    balancete_csv = ("Conta,Reduz,Tp,Descricao,Saldo Anterior,Debito Periodo,Credito Periodo,Saldo Atual\n"
+                     + "\n".join(balancete))
+    return plano_csv.encode('latin-1'), balancete_csv.encode()
+
+def comandos_sql(cabecalhos):
+    """
+    Quantidade de comandos SQL informada no Server-Timing (services/metricas.py).
+    """
+    encontrado = re.search(r'db;dur=[\d.]+;desc="(\d+)', cabecalhos.get('Server-Timing', ''))
+    return int(encontrado.group(1)) if encontrado else 0
+
+def iniciar_servidor(app):
+    from werkzeug.serving import make_server # type: ignore
+    
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def executar(porta, cenario, clientes, duracao, contexto):
+    """
+    Executa o cenário e retorna {endpoint: [(latência ms, comandos SQL, ok)]}.
+    """
+    pesos = [peso for peso, _, _ in CENARIOS[cenario]]
+    amostras = {nome: [] for _, nome, _ in CENARIOS[cenario]}
+    lock = threading.Lock()
+    fim = time.time() + duracao
+    
+    def cliente(semente):
+        aleatorio = random.Random(semente)
+        while time.time() < fim:
+            _, nome, gerador = aleatorio.choices(CENARIOS[cenario], weights=pesos)[0]
+            metodo, caminho, corpo, tipo = gerador(aleatorio, contexto)
+            requisicao = urllib.request.Request(f'http://127.0.0.1:{porta}{caminho}', data=corpo, method=metodo)
+            if tipo:
+                requisicao.add_header('Content-Type', tipo)
+                
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(requisicao, timeout=120) as resposta:
+                    resposta.read()
+                    sql, ok = comandos_sql(resposta.headers), True
+            except urllib.error.HTTPError as erro:
+                sql, ok = comandos_sql(erro.headers), False
+            except OSError:
+                sql, ok = 0, False
+            decorrido = (time.perf_counter() - inicio) * 1000
+            
+            with lock:
+                amostras[nome].append((decorrido, sql, ok))
+                
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return amostras
+
+def resumir(amostras, duracao):
+    resumo = {}
+    for nome, valores in amostras.items():
+        if not valores:
+            continue
+        latencias = [latencia for latencia, _, ok in valores if ok]
+        resumo[nome] = {
+            'requisicoes': len(valores),
+            'erros': sum(1 for _, _, ok in valores if not ok),
+            'req_s': round(len(valores) / duracao, 2),
+            'p50_ms': round(percentil(latencias, 0.50), 2),
+            'p95_ms': round(percentil(latencias, 0.95), 2),
+            'p99_ms': round(percentil(latencias, 0.99), 2),
+            'sql_por_requisicao': round(sum(sql for _, sql, _ in valores) / len(valores), 1),
+        }
+    return resumo
+
+def commit_atual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir(resultado, anterior=None):
+    print(f"{'endpoint':<44}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>7}{'erros':>7}")
+    for nome, m in resultado['endpoints'].items():
+        linha = (f"{nome:<44}{m['req_s']:>9.1f}{m['p50_ms']:>9.1f}{m['p95_ms']:>9.1f}"
+                 f"{m['p99_ms']:>9.1f}{m['sql_por_requisicao']:>7.1f}{m['erros']:>7}")
+        referencia = (anterior or {}).get('endpoints', {}).get(nome)
+        if referencia and referencia['p95_ms']:
+            linha += f"   p95 {(m['p95_ms'] / referencia['p95_ms'] - 1) * 100:+.0f}% vs {anterior.get('commit')}"
+        print(linha)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cenario', choices=CENARIOS, default='safra')
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--duracao', type=float, default=20)
+    parser.add_argument('--dias', type=int, default=60)
+    parser.add_argument('--produtores', type=int, default=40)
+    parser.add_argument('--saida', help="arquivo JSON do resultado (padrão: benchmarks/resultados/)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+    
+    app = criar_app_benchmark()
+    total = semear_safra(app, dias=args.dias, produtores=args.produtores)
+    plano_csv, balancete_csv = arquivos_contabeis()
+    contexto = {'produtores': args.produtores, 'plano_csv': plano_csv, 'balancete_csv': balancete_csv}
+    
+    servidor = iniciar_servidor(app)
+    print(f"Safra sintética: {total} atividades; cenário '{args.cenario}', {args.clientes} clientes por {args.duracao:.0f} s")
+    try:
+        amostras = executar(servidor.server_port, args.cenario, args.clientes, args.duracao, contexto)
+    finally:
+        servidor.shutdown()
+        
+    with app.app_context():
+        from models.models import db
+        banco = db.engine.dialect.name
+        
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'cenario': args.cenario,
+        'banco': banco,
+        'parametros': {'clientes': args.clientes, 'duracao': args.duracao, 'dias': args.dias, 'produtores': args.produtores},
+        'endpoints': resumir(amostras, args.duracao),
+    }
+    
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+    imprimir(resultado, anterior)
+    
+    saida = args.saida
+    if not saida:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        saida = os.path.join(PASTA_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-{args.cenario}-{resultado['commit'] or 'local'}.json")
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em {saida}")
+
+if __name__ == '__main__':
+    main()
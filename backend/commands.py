@@ -0,0 +1,34 @@
+# commands.py
+import click # type: ignore
+from models.models import db
+from services import arvore_plano, balancete, cache_respostas, indicadores, resumo_diario
+
+def setup_commands(app):
+    @app.cli.command('reconstruir-resumo-diario')
+    def reconstruir_resumo_diario():
+        """Recalcula o resumo diário de pallets a partir da tabela atividade."""
+        total = resumo_diario.reconstruir()
+        click.echo(f"Resumo diário reconstruído: {total} linhas")
+
+    @app.cli.command('reconstruir-arvore-plano')
+    def reconstruir_arvore_plano():
+        """Recalcula o índice da árvore (lft/rgt) do plano de contas."""
+        total = arvore_plano.reconstruir_indice()
+        db.session.commit()
+        click.echo(f"Árvore do plano de contas reconstruída: {total} contas")
+
+    @app.cli.command('invalidar-cache')
+    @click.argument('tabelas', nargs=-1, required=True)
+    def invalidar_cache(tabelas):
+        """Descarta as respostas em cache das tabelas alteradas fora da API."""
+        cache_respostas.invalidar(*tabelas)
+        click.echo(f"Cache invalidado: {', '.join(tabelas)}")
+
+    @app.cli.command('recalcular-indicadores')
+    @click.argument('competencias', nargs=-1)
+    def recalcular_indicadores(competencias):
+        """Recalcula os indicadores financeiros (padrão: todas as competências publicadas)."""
+        for competencia in competencias or balancete.competencias_publicadas():
+            recalculados = indicadores.atualizar(competencia)
+            click.echo(f"{competencia}: {len(recalculados)} indicadores recalculados")
+        cache_respostas.invalidar('balancete_items')
@@ -0,0 +1,99 @@
+# config_servidor.py
+"""
+Perfis de execução do Gunicorn e o pool do SQLAlchemy correspondente.
+
+O perfil é escolhido por PERFIL_SERVIDOR (padrão: gthread) e lido tanto pelo
+gunicorn.conf.py quanto pelo create_app, para que o pool de conexões tenha o
+tamanho da concorrência real de cada worker:
+
+- gthread: threads do sistema; uma requisição ocupa no máximo uma conexão,
+  então o pool comporta todas as threads sem fila.
+- gevent: milhares de greenlets por worker; o banco não comporta uma conexão
+  por greenlet, então o pool é fixo e as requisições esperam até POOL_TIMEOUT.
+  Requer um driver Python puro (mysql+pymysql://) para não bloquear o loop.
+- sync: perfil antigo (um worker, uma requisição por vez), mantido apenas
+  como referência nos benchmarks. Não serve os fluxos SSE.
+
+Sempre um único worker: o broker de eventos é local ao processo.
+
+Cada fluxo SSE aberto ocupa uma thread (gthread) ou um greenlet (gevent) pelo
+tempo da conexão; `limite_conexoes_sse` reserva metade da concorrência para
+a API, e os painéis além disso recebem 503 e tentam de novo mais tarde.
+
+Com preload_app (padrão em gthread e sync, GUNICORN_PRELOAD=0 desativa) a
+aplicação é construída uma vez no processo mestre e cada worker, inclusive
+os reciclados por max_requests, é uma cópia por fork, sem repetir as
+importações e o create_app. No gevent fica desligado: o monkey patching
+acontece no worker, depois do fork, e o app importado antes dele ficaria
+com sockets e locks não cooperativos.
+"""
+import os
+
+PERFIS = ('gthread', 'gevent', 'sync')
+
+# MySQL/proxies do Railway fecham conexões ociosas; reciclar antes disso
+POOL_RECYCLE = 280
+POOL_TIMEOUT = 10
+
+def perfil_atual():
+    perfil = os.getenv('PERFIL_SERVIDOR', 'gthread')
+    if perfil not in PERFIS:
+        raise ValueError(f"PERFIL_SERVIDOR inválido: {perfil}. Use um de {', '.join(PERFIS)}")
+    return perfil
+
+def _inteiro(nome, padrao):
+    return int(os.getenv(nome, padrao))
+
+def opcoes_gunicorn(perfil=None):
+    """
+    Configurações do Gunicorn para o perfil (worker_class, threads, conexões, preload).
+    """
+    perfil = perfil or perfil_atual()
+    preload = bool(_inteiro('GUNICORN_PRELOAD', 0 if perfil == 'gevent' else 1))
+    if perfil == 'gthread':
+        return {'workers': 1, 'worker_class': 'gthread', 'threads': _inteiro('GUNICORN_THREADS', 64), 'preload_app': preload}
+    if perfil == 'gevent':
+        return {'workers': 1, 'worker_class': 'gevent', 'worker_connections': _inteiro('GUNICORN_CONEXOES', 1000), 'preload_app': preload}
+    return {'workers': 1, 'worker_class': 'sync', 'preload_app': preload}
+
+def limite_conexoes_sse(perfil=None):
+    """
+    Máximo de fluxos SSE simultâneos no worker (SSE_MAX_CONEXOES sobrescreve).
+    """
+    perfil = perfil or perfil_atual()
+    opcoes = opcoes_gunicorn(perfil)
+    if perfil == 'gthread':
+        padrao = opcoes['threads'] // 2
+    elif perfil == 'gevent':
+        padrao = opcoes['worker_connections'] // 2
+    else:
+        padrao = 0  # sync: o fluxo prenderia o único worker
+    return _inteiro('SSE_MAX_CONEXOES', padrao)
+
+def opcoes_engine(url, perfil=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS para o perfil. DB_POOL_SIZE e DB_MAX_OVERFLOW
+    sobrescrevem os valores calculados.
+    """
+    perfil = perfil or perfil_atual()
+    opcoes = {'pool_pre_ping': True, 'pool_recycle': POOL_RECYCLE}
+    
+    # SQLite (testes e benchmarks locais) usa um pool próprio, sem esses parâmetros
+    if not url or url.startswith('sqlite'):
+        return opcoes
+        
+    if perfil == 'gthread':
+        threads = opcoes_gunicorn(perfil)['threads']
+        pool_size = min(threads, 10)
+        max_overflow = threads - pool_size
+    elif perfil == 'gevent':
+        pool_size, max_overflow = 10, 10
+    else:
+        pool_size, max_overflow = 2, 0
+        
+    opcoes.update({
+        'pool_size': _inteiro('DB_POOL_SIZE', pool_size),
+        'max_overflow': _inteiro('DB_MAX_OVERFLOW', max_overflow),
+        'pool_timeout': POOL_TIMEOUT
+    })
+    return opcoes
@@ -1,17 +1,36 @@
 # gunicorn.conf.py
-import multiprocessing
+import os
+import sys
+
+# O Gunicorn não coloca o diretório do projeto no sys.path ao ler este arquivo
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config_servidor import opcoes_gunicorn, perfil_atual
 
 bind = "0.0.0.0:8000"
-workers = 1
+# Perfil escolhido por PERFIL_SERVIDOR (gthread, gevent ou sync), ver config_servidor.py
+_opcoes = opcoes_gunicorn(perfil_atual())
+workers = _opcoes['workers']
+worker_class = _opcoes['worker_class']
+threads = _opcoes.get('threads', 1)
+worker_connections = _opcoes.get('worker_connections', 1000)
+# Constrói o app uma vez no mestre e faz fork dos workers (ver config_servidor.py)
+preload_app = _opcoes['preload_app']
 timeout = 30
 keepalive = 2
 max_requests = 500
 max_requests_jitter = 25
-worker_class = "sync"
 loglevel = "info"
 accesslog = "-"
 errorlog = "-"
 
 # Adicione estas configurações
 forwarded_allow_ips = '*'
-proxy_allow_ips = '*'
\ No newline at end of file
+proxy_allow_ips = '*'
+
+def post_fork(server, worker):
+    # Com preload_app o worker herda o app do mestre: descarta as conexões
+    # herdadas (sem fechá-las, são do mestre) para abrir as próprias
+    if preload_app:
+        from models.models import db
+        with worker.app.wsgi().app_context():
+            db.engine.dispose(close=False)
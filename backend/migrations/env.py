@@ -0,0 +1,38 @@
+# migrations/env.py
+from logging.config import fileConfig
+from alembic import context # type: ignore
+from app import create_app
+from models.models import db
+import models.financeiro_models  # noqa: F401 - registra as tabelas contábeis no metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+app = create_app()
+target_metadata = db.metadata
+
+def run_migrations_offline():
+    context.configure(
+        url=app.config['SQLALCHEMY_DATABASE_URI'],
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with app.app_context():
+        with db.engine.connect() as connection:
+            context.configure(connection=connection, target_metadata=target_metadata)
+
+            with context.begin_transaction():
+                context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,22 @@
+"""Schema inicial
+
+O banco existente foi criado a partir do dump em `Banco de Dados/valex.sql`.
+Esta revisão apenas marca esse ponto de partida para as migrações seguintes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,37 @@
+"""Resumo diário de pallets por produtor, variedade e classificação
+
+Depois de aplicar, popular com `flask reconstruir-resumo-diario`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('resumo_diario_atividade'):
+        return
+        
+    op.create_table(
+        'resumo_diario_atividade',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('data', sa.Date, nullable=False),
+        sa.Column('produtor_id', sa.Integer, nullable=False),
+        sa.Column('variedade_id', sa.Integer, nullable=False),
+        sa.Column('classificacao_id', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total_pallets', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total_caixas', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('quantidade_registros', sa.Integer, nullable=False, server_default='0'),
+        sa.UniqueConstraint('data', 'produtor_id', 'variedade_id', 'classificacao_id', name='uq_resumo_diario_chave'),
+    )
+
+
+def downgrade():
+    op.drop_table('resumo_diario_atividade')
@@ -0,0 +1,30 @@
+"""Índices de atividade para filtros por período
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDICES = {
+    'idx_atividade_produtor_created_at': ['produtor_id', 'created_at'],
+    'idx_atividade_created_at': ['created_at'],  # Já existe nos bancos criados pelo dump
+}
+
+
+def upgrade():
+    existentes = {i['name'] for i in sa.inspect(op.get_bind()).get_indexes('atividade')}
+    
+    for nome, colunas in INDICES.items():
+        if nome not in existentes:
+            op.create_index(nome, 'atividade', colunas)
+
+
+def downgrade():
+    op.drop_index('idx_atividade_produtor_created_at', table_name='atividade')
@@ -0,0 +1,43 @@
+"""Código único no plano de contas
+
+A importação em lote usa INSERT ... ON DUPLICATE KEY UPDATE sobre o código,
+que exige um índice único (os bancos criados pelo dump já têm `uk_codigo`).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspetor = sa.inspect(bind)
+    
+    unicos = [i for i in inspetor.get_indexes('plano_contas') if i['unique']]
+    unicos += inspetor.get_unique_constraints('plano_contas')
+    if any(u['column_names'] == ['codigo'] for u in unicos):
+        return
+        
+    repetidos = bind.execute(sa.text(
+        "SELECT codigo FROM plano_contas GROUP BY codigo HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if repetidos:
+        raise RuntimeError(
+            f"Códigos repetidos em plano_contas, corrija antes de migrar: {', '.join(repetidos[:20])}"
+        )
+    
+    if any(i['name'] == 'idx_plano_contas_codigo' for i in inspetor.get_indexes('plano_contas')):
+        op.drop_index('idx_plano_contas_codigo', table_name='plano_contas')
+    op.create_index('idx_plano_contas_codigo', 'plano_contas', ['codigo'], unique=True)
+
+
+def downgrade():
+    op.drop_index('idx_plano_contas_codigo', table_name='plano_contas')
+    op.create_index('idx_plano_contas_codigo', 'plano_contas', ['codigo'])
@@ -0,0 +1,47 @@
+"""Balancete versionado por competência
+
+Adiciona a coluna `versao` em balancete_items e a tabela de ponteiros
+balancete_versoes. Os itens já importados passam a ser a versão 1 publicada.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    colunas = {c['name'] for c in inspetor.get_columns('balancete_items')}
+    
+    # Bancos criados pelo dump ainda não têm a coluna de competência
+    if 'competencia' not in colunas:
+        op.add_column('balancete_items', sa.Column('competencia', sa.String(7), server_default='2024-12'))
+    op.execute("UPDATE balancete_items SET competencia = '2024-12' WHERE competencia IS NULL")
+    
+    op.add_column('balancete_items', sa.Column('versao', sa.Integer, nullable=False, server_default='1'))
+    op.create_index('idx_balancete_competencia_versao_conta', 'balancete_items', ['competencia', 'versao', 'conta'])
+    
+    op.create_table(
+        'balancete_versoes',
+        sa.Column('competencia', sa.String(7), primary_key=True),
+        sa.Column('versao_publicada', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('ultima_versao', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('publicado_em', sa.DateTime),
+    )
+    op.execute(
+        "INSERT INTO balancete_versoes (competencia, versao_publicada, ultima_versao, publicado_em) "
+        "SELECT competencia, 1, 1, MAX(data_importacao) FROM balancete_items GROUP BY competencia"
+    )
+
+
+def downgrade():
+    op.drop_table('balancete_versoes')
+    op.drop_index('idx_balancete_competencia_versao_conta', table_name='balancete_items')
+    op.drop_column('balancete_items', 'versao')
@@ -0,0 +1,28 @@
+"""Índice de conjuntos aninhados do plano de contas
+
+Depois de aplicar, preencher com `flask reconstruir-arvore-plano`
+(ou reimportar o plano de contas).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('plano_contas', sa.Column('lft', sa.Integer))
+    op.add_column('plano_contas', sa.Column('rgt', sa.Integer))
+    op.create_index('idx_plano_contas_lft', 'plano_contas', ['lft'])
+
+
+def downgrade():
+    op.drop_index('idx_plano_contas_lft', table_name='plano_contas')
+    op.drop_column('plano_contas', 'rgt')
+    op.drop_column('plano_contas', 'lft')
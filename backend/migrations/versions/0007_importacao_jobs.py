@@ -0,0 +1,40 @@
+"""Jobs de importação do plano de contas e do balancete
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('importacao_jobs'):
+        return
+        
+    op.create_table(
+        'importacao_jobs',
+        sa.Column('id', sa.String(32), primary_key=True),
+        sa.Column('tipo', sa.String(20), nullable=False),
+        sa.Column('competencia', sa.String(7)),
+        sa.Column('nome_arquivo', sa.String(255)),
+        sa.Column('caminho_arquivo', sa.String(500)),
+        sa.Column('status', sa.Enum('PENDENTE', 'EXECUTANDO', 'CONCLUIDO', 'ERRO'), nullable=False, server_default='PENDENTE'),
+        sa.Column('linhas_processadas', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('linhas_ignoradas', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('erro', sa.Text),
+        sa.Column('resultado', sa.Text),
+        sa.Column('criado_em', sa.DateTime),
+        sa.Column('iniciado_em', sa.DateTime),
+        sa.Column('atualizado_em', sa.DateTime),
+        sa.Column('concluido_em', sa.DateTime),
+    )
+
+
+def downgrade():
+    op.drop_table('importacao_jobs')
@@ -0,0 +1,29 @@
+"""Chave de idempotência das atividades enviadas em lote
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    
+    if 'chave_idempotencia' not in {c['name'] for c in inspetor.get_columns('atividade')}:
+        op.add_column('atividade', sa.Column('chave_idempotencia', sa.String(64), nullable=True))
+        
+    # Único: o banco recusa a segunda gravação de um reenvio concorrente
+    if 'idx_atividade_chave_idempotencia' not in {i['name'] for i in inspetor.get_indexes('atividade')}:
+        op.create_index('idx_atividade_chave_idempotencia', 'atividade', ['chave_idempotencia'], unique=True)
+
+
+def downgrade():
+    op.drop_index('idx_atividade_chave_idempotencia', table_name='atividade')
+    op.drop_column('atividade', 'chave_idempotencia')
@@ -0,0 +1,44 @@
+"""Fazenda na chave do resumo diário
+
+A análise da safra agrupa também por fazenda. As linhas existentes ficam com
+fazenda_id = 0: depois de aplicar, recalcular com `flask reconstruir-resumo-diario`.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+CHAVE_ANTIGA = ['data', 'produtor_id', 'variedade_id', 'classificacao_id']
+CHAVE_NOVA = CHAVE_ANTIGA + ['fazenda_id']
+
+
+def upgrade():
+    inspetor = sa.inspect(op.get_bind())
+    
+    unicos = {u['name']: u['column_names'] for u in inspetor.get_unique_constraints('resumo_diario_atividade')}
+    if unicos.get('uq_resumo_diario_chave') == CHAVE_NOVA:
+        return
+        
+    # batch: o SQLite não altera constraints no lugar (recria a tabela)
+    with op.batch_alter_table('resumo_diario_atividade') as tabela:
+        if 'fazenda_id' not in {c['name'] for c in inspetor.get_columns('resumo_diario_atividade')}:
+            tabela.add_column(sa.Column('fazenda_id', sa.Integer, nullable=False, server_default='0'))
+        tabela.drop_constraint('uq_resumo_diario_chave', type_='unique')
+        tabela.create_unique_constraint('uq_resumo_diario_chave', CHAVE_NOVA)
+
+
+def downgrade():
+    # Linhas de fazendas diferentes colidiriam na chave antiga: o resumo é
+    # esvaziado e deve ser recalculado com `flask reconstruir-resumo-diario`
+    op.execute("DELETE FROM resumo_diario_atividade")
+    with op.batch_alter_table('resumo_diario_atividade') as tabela:
+        tabela.drop_constraint('uq_resumo_diario_chave', type_='unique')
+        tabela.drop_column('fazenda_id')
+        tabela.create_unique_constraint('uq_resumo_diario_chave', CHAVE_ANTIGA)
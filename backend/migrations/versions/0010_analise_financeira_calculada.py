@@ -0,0 +1,59 @@
+"""Análises financeiras calculadas a partir do balancete
+
+Acrescenta o período comparado e as versões dos balancetes usados, amplia o
+percentual (variações horizontais passam de 9999%) e garante a chave única
+(ano, mes) dos períodos contábeis, que o cálculo usa para criar o período.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspetor = sa.inspect(bind)
+    
+    unicos = [i for i in inspetor.get_indexes('periodos_contabeis') if i['unique']]
+    unicos += inspetor.get_unique_constraints('periodos_contabeis')
+    if not any(u['column_names'] == ['ano', 'mes'] for u in unicos):
+        repetidos = bind.execute(sa.text(
+            "SELECT ano, mes FROM periodos_contabeis GROUP BY ano, mes HAVING COUNT(*) > 1"
+        )).all()
+        if repetidos:
+            raise RuntimeError(
+                f"Períodos repetidos em periodos_contabeis, corrija antes de migrar: {repetidos[:20]}"
+            )
+        op.create_index('uk_ano_mes', 'periodos_contabeis', ['ano', 'mes'], unique=True)
+    
+    colunas = {c['name'] for c in inspetor.get_columns('analises_financeiras')}
+    if 'periodo_comparacao_id' in colunas:
+        return
+        
+    # batch: o SQLite recria a tabela para alterar o tipo e incluir a chave estrangeira
+    with op.batch_alter_table('analises_financeiras') as tabela:
+        tabela.add_column(sa.Column('periodo_comparacao_id', sa.Integer, nullable=True))
+        tabela.add_column(sa.Column('versao_balancete', sa.Integer, nullable=True))
+        tabela.add_column(sa.Column('versao_comparacao', sa.Integer, nullable=True))
+        tabela.alter_column('percentual', type_=sa.DECIMAL(12, 4), existing_type=sa.DECIMAL(8, 4))
+        tabela.create_foreign_key(
+            'fk_analise_periodo_comparacao', 'periodos_contabeis', ['periodo_comparacao_id'], ['id']
+        )
+        tabela.create_index('idx_analise_periodo_tipo', ['periodo_id', 'tipo_analise', 'periodo_comparacao_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('analises_financeiras') as tabela:
+        tabela.drop_index('idx_analise_periodo_tipo')
+        tabela.drop_constraint('fk_analise_periodo_comparacao', type_='foreignkey')
+        tabela.alter_column('percentual', type_=sa.DECIMAL(8, 4), existing_type=sa.DECIMAL(12, 4))
+        tabela.drop_column('versao_comparacao')
+        tabela.drop_column('versao_balancete')
+        tabela.drop_column('periodo_comparacao_id')
@@ -0,0 +1,43 @@
+"""Índice único (periodo_id, nome_indicador) em indicadores_financeiros
+
+Cada indicador tem uma linha por período, regravada com upsert quando as
+contas de que ele depende mudam numa nova importação do balancete.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspetor = sa.inspect(bind)
+
+    indices = {i['name'] for i in inspetor.get_indexes('indicadores_financeiros')}
+    if 'uq_indicador_periodo_nome' in indices:
+        return
+
+    repetidos = bind.execute(sa.text(
+        "SELECT periodo_id, nome_indicador FROM indicadores_financeiros "
+        "GROUP BY periodo_id, nome_indicador HAVING COUNT(*) > 1"
+    )).all()
+    if repetidos:
+        raise RuntimeError(
+            f"Indicadores repetidos em indicadores_financeiros, corrija antes de migrar: {repetidos[:20]}"
+        )
+    op.create_index(
+        'uq_indicador_periodo_nome', 'indicadores_financeiros', ['periodo_id', 'nome_indicador'], unique=True
+    )
+
+
+def downgrade():
+    # No MySQL a chave estrangeira de periodo_id precisa de um índice que comece por ela
+    op.create_index('idx_indicador_periodo', 'indicadores_financeiros', ['periodo_id'])
+    op.drop_index('uq_indicador_periodo_nome', table_name='indicadores_financeiros')
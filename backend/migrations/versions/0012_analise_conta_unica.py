@@ -0,0 +1,52 @@
+"""Índice único por conta em analises_financeiras
+
+Uma linha por (período, tipo, período comparado, conta, demonstrativo): um
+cálculo concorrente falha em vez de duplicar a análise. Substitui o índice
+idx_analise_periodo_tipo, que é prefixo do novo.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op # type: ignore
+import sqlalchemy as sa # type: ignore
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+COLUNAS = ['periodo_id', 'tipo_analise', 'periodo_comparacao_id', 'conta_id', 'tipo_demonstrativo']
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspetor = sa.inspect(bind)
+    
+    indices = {i['name'] for i in inspetor.get_indexes('analises_financeiras')}
+    if 'uq_analise_conta' in indices:
+        return
+    
+    # As análises são recalculáveis: as repetidas são apagadas e refeitas na próxima leitura
+    repetidos = bind.execute(sa.text(
+        f"SELECT DISTINCT periodo_id FROM analises_financeiras "
+        f"GROUP BY {', '.join(COLUNAS)} HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if repetidos:
+        bind.execute(
+            sa.text("DELETE FROM analises_financeiras WHERE periodo_id IN :periodos")
+            .bindparams(sa.bindparam('periodos', expanding=True)),
+            {'periodos': repetidos}
+        )
+    
+    op.create_index('uq_analise_conta', 'analises_financeiras', COLUNAS, unique=True)
+    if 'idx_analise_periodo_tipo' in indices:
+        op.drop_index('idx_analise_periodo_tipo', table_name='analises_financeiras')
+
+
+def downgrade():
+    # No MySQL a chave estrangeira de periodo_id precisa de um índice que comece por ela
+    op.create_index(
+        'idx_analise_periodo_tipo', 'analises_financeiras', ['periodo_id', 'tipo_analise', 'periodo_comparacao_id']
+    )
+    op.drop_index('uq_analise_conta', table_name='analises_financeiras')
@@ -17,15 +17,20 @@ class PlanoContas(db.Model):
     permite_lancamento = db.Column(Boolean, default=True)
     tipo = db.Column(db.String(5))  # Campo para o tipo (S ou A)
     referencia = db.Column(db.String(50))  # Campo para referência
+    # Índice de conjuntos aninhados (nested set) da hierarquia, recalculado a
+    # cada importação do plano: a subárvore de uma conta é lft..rgt
+    lft = db.Column(db.Integer)
+    rgt = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamento próprio para hierarquia
     conta_pai = db.relationship('PlanoContas', remote_side=[id], backref='contas_filhas')
     
-    # Adicionando índice para o código para melhorar performance
+    # Índice único no código: base do upsert em lote da importação do plano
     __table_args__ = (
-        db.Index('idx_plano_contas_codigo', 'codigo'),
+        db.Index('idx_plano_contas_codigo', 'codigo', unique=True),
+        db.Index('idx_plano_contas_lft', 'lft'),
     )
     
 class BalanceteItem(db.Model):
@@ -41,12 +46,43 @@ class BalanceteItem(db.Model):
     valor_periodo_credito = db.Column(DECIMAL(15,2), nullable=True)
     valor_atual = db.Column(DECIMAL(15,2), nullable=True)
     competencia = db.Column(db.String(7), default='2024-12')  # Adicionando campo competencia
+    versao = db.Column(db.Integer, nullable=False, default=1)  # Versão da importação (ver BalanceteVersao)
     data_importacao = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (
         db.Index('idx_balancete_conta', 'conta'),
         db.Index('idx_balancete_data_importacao', 'data_importacao'),
+        db.Index('idx_balancete_competencia_versao_conta', 'competencia', 'versao', 'conta'),
     )
+
+class BalanceteVersao(db.Model):
+    __tablename__ = 'balancete_versoes'
+    
+    # Ponteiro da versão publicada de cada competência. A importação grava uma
+    # versão nova ao lado da publicada e só então troca o ponteiro.
+    competencia = db.Column(db.String(7), primary_key=True)
+    versao_publicada = db.Column(db.Integer, nullable=False, default=0)  # 0 = nada publicado
+    ultima_versao = db.Column(db.Integer, nullable=False, default=0)
+    publicado_em = db.Column(db.DateTime)
+    
+class ImportacaoJob(db.Model):
+    __tablename__ = 'importacao_jobs'
+    
+    # Importação de plano/balancete executada fora da requisição (services/importacao_jobs.py)
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # plano ou balancete
+    competencia = db.Column(db.String(7))
+    nome_arquivo = db.Column(db.String(255))
+    caminho_arquivo = db.Column(db.String(500))
+    status = db.Column(Enum('PENDENTE', 'EXECUTANDO', 'CONCLUIDO', 'ERRO'), nullable=False, default='PENDENTE')
+    linhas_processadas = db.Column(db.Integer, nullable=False, default=0)
+    linhas_ignoradas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(Text)
+    resultado = db.Column(Text)  # JSON com os totais finais da importação
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
     
 class PeriodoContabil(db.Model):
     __tablename__ = 'periodos_contabeis'
@@ -58,6 +94,10 @@ class PeriodoContabil(db.Model):
     data_abertura = db.Column(db.DateTime)
     data_fechamento = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('ano', 'mes', name='uk_ano_mes'),
+    )
 
 class AnaliseFinanceira(db.Model):
     __tablename__ = 'analises_financeiras'
@@ -69,10 +109,22 @@ class AnaliseFinanceira(db.Model):
     conta_id = db.Column(db.Integer, db.ForeignKey('plano_contas.id'), nullable=False)
     valor_base = db.Column(DECIMAL(15,2))
     valor_calculado = db.Column(DECIMAL(15,2))
-    percentual = db.Column(DECIMAL(8,4))
+    percentual = db.Column(DECIMAL(12,4))
+    # Calculadas por services/analise_financeira.py: período comparado (só na
+    # horizontal) e versões publicadas dos balancetes usados no cálculo
+    periodo_comparacao_id = db.Column(db.Integer, db.ForeignKey('periodos_contabeis.id'), nullable=True)
+    versao_balancete = db.Column(db.Integer)
+    versao_comparacao = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    periodo = db.relationship('PeriodoContabil')
+    periodo = db.relationship('PeriodoContabil', foreign_keys=[periodo_id])
+    
+    __table_args__ = (
+        db.Index(
+            'uq_analise_conta', 'periodo_id', 'tipo_analise', 'periodo_comparacao_id', 'conta_id', 'tipo_demonstrativo',
+            unique=True
+        ),
+    )
 
 class LancamentoContabil(db.Model):
     __tablename__ = 'lancamentos_contabeis'
@@ -125,4 +177,9 @@ class IndicadorFinanceiro(db.Model):
     nome_indicador = db.Column(db.String(100), nullable=False)
     valor = db.Column(DECIMAL(15,4))
     formula = db.Column(Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Uma linha por indicador e período: base do upsert do recálculo incremental
+    __table_args__ = (
+        db.Index('uq_indicador_periodo_nome', 'periodo_id', 'nome_indicador', unique=True),
+    )
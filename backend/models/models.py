@@ -50,11 +50,21 @@ class Atividade(db.Model):
     tipo_atividade = db.Column(db.String(20), nullable=False)
     quantidade_pallets = db.Column(db.Integer, nullable=False)
     caixas = db.Column(db.Integer, nullable=True)  # Nova coluna
+    # Chave gerada pelo tablet para cada registro; reenvios da fila offline
+    # com a mesma chave não duplicam a atividade (POST /atividades/lote)
+    chave_idempotencia = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relacionamentos
     classificacao = db.relationship('ClassificacaoUva', backref='atividades', lazy=True)
+    
+    # Índices para os filtros por período (created_at em intervalo semiaberto)
+    __table_args__ = (
+        db.Index('idx_atividade_produtor_created_at', 'produtor_id', 'created_at'),
+        db.Index('idx_atividade_created_at', 'created_at'),
+        db.Index('idx_atividade_chave_idempotencia', 'chave_idempotencia', unique=True),
+    )
 
 class ClassificacaoUva(db.Model):
     __tablename__ = 'classificacao_uva'
@@ -66,4 +76,23 @@ class ClassificacaoUva(db.Model):
     peso = db.Column(db.String(10), nullable=False)
     cumbuca = db.Column(db.String(20), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ResumoDiarioAtividade(db.Model):
+    __tablename__ = 'resumo_diario_atividade'
+    
+    # Tabela derivada de atividade: mantida por create_atividade/delete_atividade
+    # e recalculável com `flask reconstruir-resumo-diario`
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    data = db.Column(db.Date, nullable=False)  # Dia no fuso da cooperativa
+    produtor_id = db.Column(db.Integer, nullable=False)
+    variedade_id = db.Column(db.Integer, nullable=False)
+    classificacao_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = sem classificação
+    fazenda_id = db.Column(db.Integer, nullable=False, default=0)
+    total_pallets = db.Column(db.Integer, nullable=False, default=0)
+    total_caixas = db.Column(db.Integer, nullable=False, default=0)
+    quantidade_registros = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('data', 'produtor_id', 'variedade_id', 'classificacao_id', 'fazenda_id', name='uq_resumo_diario_chave'),
+    )
@@ -1,11 +1,12 @@
-from flask import Blueprint, request, jsonify, current_app # type: ignore
-from models.models import db, Produtor, Fazenda, Variedade, Atividade, ClassificacaoUva
-from models.financeiro_models import BalanceteItem, PlanoContas
-from datetime import datetime, timedelta
-from pytz import timezone # type: ignore
-from io import StringIO
-import csv
-import pandas as pd # type: ignore
+from flask import Blueprint, Response, request, jsonify, current_app # type: ignore
+from models.models import db, Produtor, Fazenda, Variedade, Atividade, ClassificacaoUva, ResumoDiarioAtividade
+from models.financeiro_models import BalanceteItem, ImportacaoJob, PlanoContas
+from services import analise_colheita, arvore_plano, balancete, busca_plano, cache_respostas, cooperado, eventos, importacao_jobs, indicadores, lote_atividades, resumo_diario
+from services.exportacao import ler_formato, resposta_exportacao
+from services.paginacao import ler_limite, listagem, paginar, resposta_paginada
+from services.serializacao import TAMANHO_LOTE
+from services.cache_respostas import invalidar, resposta_cacheada
+from services.datas import converter_data, hoje_local, intervalo_utc, momento_local
 import re
 
 # Criar Blueprint
@@ -13,28 +14,28 @@ api = Blueprint('api', __name__)
 
 # Rotas para Produtor
 @api.route('/produtores', methods=['GET'])
+@resposta_cacheada('produtor')
 def get_produtores():
     try:
-        produtores = Produtor.query.all()
-        return jsonify([{
+        produtores, proximo_cursor = paginar(
+            Produtor.query, [Produtor.id], ler_limite(), request.args.get('cursor')
+        )
+        return resposta_paginada([{
             'id': p.id,
             'nome': p.nome,
             'ggn': p.ggn,
             'sigla': p.sigla
-        } for p in produtores])
+        } for p in produtores], proximo_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Erro ao buscar produtores: {str(e)}")  # Log mais simples
+        current_app.logger.error(f"Erro ao buscar produtores: {str(e)}")
         return jsonify({"error": "Erro ao buscar produtores", "details": str(e)}), 500
 
 @api.route('/produtores/<int:id>', methods=['GET'])
+@resposta_cacheada('produtor')
 def get_produtor(id):
-    produtor = Produtor.query.get_or_404(id)
-    return jsonify({
-        'id': produtor.id,
-        'nome': produtor.nome,
-        'ggn': produtor.ggn,
-        'sigla': produtor.sigla
-    })
+    return jsonify(cooperado.dados_produtor(Produtor.query.get_or_404(id)))
 
 @api.route('/produtores', methods=['POST'])
 def create_produtor():
@@ -48,6 +49,7 @@ def create_produtor():
     )
     db.session.add(novo_produtor)
     db.session.commit()
+    invalidar('produtor')
     return jsonify({
         'id': novo_produtor.id,
         'nome': novo_produtor.nome,
@@ -69,6 +71,7 @@ def update_produtor(id):
     produtor.endereco = data.get('endereco', produtor.endereco)
     
     db.session.commit()
+    invalidar('produtor')
     return jsonify({
         'id': produtor.id,
         'nome': produtor.nome,
@@ -83,22 +86,34 @@ def delete_produtor(id):
     produtor = Produtor.query.get_or_404(id)
     db.session.delete(produtor)
     db.session.commit()
+    invalidar('produtor')
     return '', 204
 
 # Rotas para Fazenda
 @api.route('/fazendas', methods=['GET'])
+@resposta_cacheada('fazenda')
 def get_fazendas():
-    fazendas = Fazenda.query.all()
-    return jsonify([{
+    consulta = Fazenda.query
+    produtor_id = request.args.get('produtor_id', type=int)
+    if produtor_id is not None:
+        consulta = consulta.filter(Fazenda.produtor_id == produtor_id)
+        
+    try:
+        fazendas, proximo_cursor = paginar(consulta, [Fazenda.id], ler_limite(), request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    return resposta_paginada([{
         'id': f.id,
         'nome': f.nome,
         'area_parcela': f.area_parcela,
         'produtor_id': f.produtor_id,
         'variedade_id': f.variedade_id
-    } for f in fazendas])
+    } for f in fazendas], proximo_cursor)
 
 # Rotas para Variedade
 @api.route('/variedades', methods=['GET'])
+@resposta_cacheada('variedade')
 def get_variedades():
     variedades = Variedade.query.all()
     return jsonify([{
@@ -107,17 +122,12 @@ def get_variedades():
     } for v in variedades])
 
 @api.route('/fazendas/produtor/<int:produtor_id>', methods=['GET'])
+@resposta_cacheada('fazenda', 'variedade')
 def get_fazendas_by_produtor(produtor_id):
-    fazendas = Fazenda.query.filter_by(produtor_id=produtor_id).all()
-    return jsonify([{
-        'id': f.id,
-        'nome': f.nome,
-        'area_parcela': f.area_parcela,
-        'variedade_id': f.variedade_id,
-        'variedade_nome': f.variedade.nome
-    } for f in fazendas])
+    return jsonify(cooperado.fazendas_do_produtor(produtor_id))
 
 @api.route('/fazendas/<int:fazenda_id>/variedades', methods=['GET'])
+@resposta_cacheada('fazenda', 'variedade')
 def get_variedades_by_fazenda(fazenda_id):
     try:
         fazenda = Fazenda.query.get_or_404(fazenda_id)
@@ -147,138 +157,208 @@ def create_atividade():
         caixas=data.get('caixas')  # Adicionando caixas
     )
     db.session.add(nova_atividade)
+    db.session.flush()  # Preenche id e created_at antes de atualizar o resumo
+    resumo_diario.registrar_atividades([nova_atividade])
+    evento = eventos.dados_atividade(nova_atividade)
     db.session.commit()
+    eventos.publicar_atividade('atividade_criada', evento)
     return jsonify({
         'id': nova_atividade.id,
         'message': 'Atividade registrada com sucesso'
     }), 201
 
+@api.route('/atividades/lote', methods=['POST'])
+def create_atividades_lote():
+    """
+    Recebe a fila offline de um tablet: lista de atividades, cada uma com
+    'chave' (idempotência) e opcionalmente 'registrado_em' (ISO 8601).
+    Responde com o resultado de cada item na ordem enviada.
+    """
+    try:
+        return jsonify(lote_atividades.registrar_lote(request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao registrar lote de atividades: {str(e)}")
+        return jsonify({"error": "Erro ao registrar lote de atividades"}), 500
+
 @api.route('/atividades/resumo/<int:produtor_id>', methods=['GET'])
 def get_resumo_semana(produtor_id):
     try:
-        # Calcula a data inicial (7 dias atrás) e final (hoje)
-        hoje = datetime.utcnow().date()
-        data_inicial = hoje - timedelta(days=7)
-        
-        # Buscar atividades da semana com informações relacionadas
-        atividades = db.session.query(
-            Atividade,
-            Variedade.nome.label('variedade_nome'),
-            ClassificacaoUva.classificacao.label('classificacao_nome')
-        ).join(
-            Variedade, Atividade.variedade_id == Variedade.id
-        ).outerjoin(
-            ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
-        ).filter(
-            Atividade.produtor_id == produtor_id,
-            db.func.date(Atividade.created_at) >= data_inicial,
-            db.func.date(Atividade.created_at) <= hoje
-        ).all()
-        
-        # Agrupar por variedade e classificação
-        resumo_detalhado = {}
-        resumo_diario = {}
-        total_pallets = 0
-        
-        for atividade, var_nome, class_nome in atividades:
-            data = atividade.created_at.date()
-            total_pallets += atividade.quantidade_pallets
-            
-            # Inicializar estrutura para o dia se não existir
-            if data not in resumo_diario:
-                resumo_diario[data] = {
-                    'total_pallets': 0,
-                    'detalhamento': {}
-                }
-            
-            # Atualizar totais diários
-            resumo_diario[data]['total_pallets'] += atividade.quantidade_pallets
-            
-            # Agrupar por variedade no resumo geral
-            if var_nome not in resumo_detalhado:
-                resumo_detalhado[var_nome] = {
-                    'total_pallets': 0,
-                    'classificacoes': {}
-                }
+        return jsonify(cooperado.resumo_semana(produtor_id))
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar resumo da semana: {str(e)}")
+        return jsonify({"error": "Erro ao buscar resumo da semana"}), 500
+
+@api.route('/atividades/historico/<int:produtor_id>', methods=['GET'])
+def get_historico_atividades(produtor_id):
+    """
+    Histórico de atividades do produtor, da mais recente para a mais antiga,
+    paginado por (created_at, id). Filtros opcionais: data_inicio, data_fim
+    (AAAA-MM-DD, dias locais) e tipo_atividade.
+    """
+    try:
+        consulta = cooperado.consulta_historico(produtor_id)
+        if request.args.get('data_inicio'):
+            inicio, _ = intervalo_utc(converter_data(request.args['data_inicio']))
+            consulta = consulta.filter(Atividade.created_at >= inicio)
+        if request.args.get('data_fim'):
+            _, fim = intervalo_utc(converter_data(request.args['data_fim']))
+            consulta = consulta.filter(Atividade.created_at < fim)
             
-            resumo_detalhado[var_nome]['total_pallets'] += atividade.quantidade_pallets
+        tipo_atividade = request.args.get('tipo_atividade')
+        if tipo_atividade:
+            consulta = consulta.filter(Atividade.tipo_atividade == tipo_atividade)
             
-            # Agrupar por classificação dentro da variedade
-            if class_nome:
-                if class_nome not in resumo_detalhado[var_nome]['classificacoes']:
-                    resumo_detalhado[var_nome]['classificacoes'][class_nome] = 0
-                resumo_detalhado[var_nome]['classificacoes'][class_nome] += atividade.quantidade_pallets
-        
-        # Converter datas para string no formato brasileiro
-        resumo_diario_formatado = {
-            data.strftime('%d/%m/%Y'): dados 
-            for data, dados in resumo_diario.items()
-        }
+        # Percorre o índice (produtor_id, created_at) de trás para frente, 20 por página por padrão
+        atividades, proximo_cursor = paginar(
+            consulta, [Atividade.created_at, Atividade.id], ler_limite(20),
+            request.args.get('cursor'), descendente=True
+        )
         
+        return resposta_paginada(cooperado.itens_historico(atividades), proximo_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar histórico: {str(e)}")
+        return jsonify({"error": "Erro ao buscar histórico de atividades"}), 500
+
+@api.route('/cooperado/<int:produtor_id>/bootstrap', methods=['GET'])
+def get_bootstrap_cooperado(produtor_id):
+    """
+    Tudo o que a tela do cooperado precisa ao abrir, numa requisição: produtor,
+    fazendas, classificações, primeira página do histórico (com o cursor da
+    próxima em historico_proximo_cursor) e resumo da semana.
+    """
+    # Dados de referência vêm do cache versionado por tabela; só o
+    # histórico e o resumo consultam o banco, na mesma conexão
+    produtor = cache_respostas.dados_cacheados(
+        f'cooperado:produtor:{produtor_id}', ('produtor',),
+        lambda: cooperado.dados_produtor(Produtor.query.get_or_404(produtor_id))
+    )
+    try:
+        fazendas = cache_respostas.dados_cacheados(
+            f'cooperado:fazendas:{produtor_id}', ('fazenda', 'variedade'),
+            lambda: cooperado.fazendas_do_produtor(produtor_id)
+        )
+        classificacoes = cache_respostas.dados_cacheados(
+            'cooperado:classificacoes', ('classificacao_uva',), cooperado.classificacoes
+        )
+
+        atividades, proximo_cursor = paginar(
+            cooperado.consulta_historico(produtor_id), [Atividade.created_at, Atividade.id],
+            20, descendente=True
+        )
+
         return jsonify({
-            'total_pallets': total_pallets,
-            'detalhamento': resumo_detalhado,
-            'resumo_diario': resumo_diario_formatado
+            'produtor': produtor,
+            'fazendas': fazendas,
+            'classificacoes': classificacoes,
+            'historico': cooperado.itens_historico(atividades),
+            'historico_proximo_cursor': proximo_cursor,
+            'resumo': cooperado.resumo_semana(produtor_id)
         })
     except Exception as e:
-        print(f"Erro ao buscar resumo da semana: {str(e)}")
-        return jsonify({"error": "Erro ao buscar resumo da semana"}), 500
+        current_app.logger.error(f"Erro ao carregar a tela do cooperado: {str(e)}")
+        return jsonify({"error": "Erro ao carregar dados do cooperado"}), 500
 
-@api.route('/atividades/historico/<int:produtor_id>', methods=['GET'])
-def get_historico_atividades(produtor_id):
+@api.route('/atividades/export', methods=['GET'])
+def exportar_atividades():
+    """
+    Exporta as atividades em CSV (padrão) ou XLSX (formato=xlsx), em ordem
+    cronológica. Filtros opcionais: produtor_id, data_inicio, data_fim
+    (AAAA-MM-DD, dias locais) e tipo_atividade.
+    """
     try:
-        # Adiciona índices para melhorar performance
-        atividades = db.session.query(
-            Atividade,
-            Fazenda.nome.label('fazenda_nome'),
-            Variedade.nome.label('variedade_nome'),
-            ClassificacaoUva.classificacao.label('classificacao_nome'),
-            ClassificacaoUva.caixa.label('classificacao_caixa') 
+        formato = ler_formato()
+        consulta = db.session.query(
+            Atividade.created_at,
+            Produtor.nome,
+            Fazenda.nome,
+            Variedade.nome,
+            ClassificacaoUva.classificacao,
+            ClassificacaoUva.caixa,
+            Atividade.tipo_atividade,
+            Atividade.quantidade_pallets,
+            Atividade.caixas
+        ).join(
+            Produtor, Atividade.produtor_id == Produtor.id
         ).join(
             Fazenda, Atividade.fazenda_id == Fazenda.id
         ).join(
             Variedade, Atividade.variedade_id == Variedade.id
         ).outerjoin(
             ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
-        ).filter(
-            Atividade.produtor_id == produtor_id
-        ).order_by(
-            Atividade.created_at.desc()
-        ).limit(20).all()  # Reduz o limite para 20 registros
-        
-        # Usa list comprehension para melhor performance
-        resultado = [{
-            'id': a.id,
-            'tipo_atividade': a.tipo_atividade,
-            'quantidade_pallets': a.quantidade_pallets,
-            'caixas': a.caixas,
-            'created_at': a.created_at.astimezone(timezone('America/Sao_Paulo')).strftime('%d/%m/%Y %H:%M'),
-            'fazenda': fazenda_nome,
-            'variedade': variedade_nome,
-            'classificacao': f"{classificacao_nome} - {classificacao_caixa}" if classificacao_nome else None
-        } for a, fazenda_nome, variedade_nome, classificacao_nome, classificacao_caixa in atividades]
+        )
         
-        return jsonify(resultado)
+        produtor_id = request.args.get('produtor_id', type=int)
+        if produtor_id:
+            consulta = consulta.filter(Atividade.produtor_id == produtor_id)
+        if request.args.get('data_inicio'):
+            inicio, _ = intervalo_utc(converter_data(request.args['data_inicio']))
+            consulta = consulta.filter(Atividade.created_at >= inicio)
+        if request.args.get('data_fim'):
+            _, fim = intervalo_utc(converter_data(request.args['data_fim']))
+            consulta = consulta.filter(Atividade.created_at < fim)
+        if request.args.get('tipo_atividade'):
+            consulta = consulta.filter(Atividade.tipo_atividade == request.args['tipo_atividade'])
+            
+        linhas = (
+            (momento_local(created_at).replace(tzinfo=None), *demais)
+            for created_at, *demais in consulta.order_by(Atividade.created_at, Atividade.id).yield_per(TAMANHO_LOTE)
+        )
+        return resposta_exportacao(
+            linhas,
+            ['Data', 'Produtor', 'Fazenda', 'Variedade', 'Classificação', 'Caixa', 'Tipo', 'Pallets', 'Caixas'],
+            f'atividades-{produtor_id}' if produtor_id else 'atividades',
+            formato,
+            titulo='Atividades'
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Erro ao buscar histórico: {str(e)}")
-        return jsonify({"error": "Erro ao buscar histórico de atividades"}), 500
+        current_app.logger.error(f"Erro ao exportar atividades: {str(e)}")
+        return jsonify({"error": "Erro ao exportar atividades"}), 500
     
 @api.route('/classificacoes', methods=['GET'])
+@resposta_cacheada('classificacao_uva')
 def get_classificacoes():
     try:
-        classificacoes = db.session.query(ClassificacaoUva).all()
-        return jsonify([{
-            'id': c.id,
-            'classificacao': c.classificacao,
-            'caixa': c.caixa,
-            'cinta': c.cinta,
-            'peso': c.peso,
-            'cumbuca': c.cumbuca
-        } for c in classificacoes])
+        return jsonify(cooperado.classificacoes())
     except Exception as e:
-        print(f"Erro ao buscar classificações: {str(e)}")
+        current_app.logger.error(f"Erro ao buscar classificações: {str(e)}")
         return jsonify({"error": "Erro ao buscar classificações"}), 500
 
+@api.route('/colheita/analise', methods=['GET'])
+def get_analise_colheita():
+    """
+    Pallets, caixas e registros entre data_inicio e data_fim (AAAA-MM-DD, dias
+    locais) por periodo (dia, semana ou mes), em séries por `agrupar`
+    (produtor, variedade, classificacao e/ou fazenda, separados por vírgula).
+    Filtros opcionais: produtor_id, variedade_id, classificacao_id, fazenda_id.
+    """
+    try:
+        if not request.args.get('data_inicio') or not request.args.get('data_fim'):
+            return jsonify({"error": "Informe data_inicio e data_fim"}), 400
+        filtros = {
+            dimensao: request.args.get(f'{dimensao}_id', type=int)
+            for dimensao in analise_colheita.DIMENSOES
+            if request.args.get(f'{dimensao}_id', type=int) is not None
+        }
+        return jsonify(analise_colheita.analisar(
+            converter_data(request.args['data_inicio']),
+            converter_data(request.args['data_fim']),
+            request.args.get('periodo', 'dia'),
+            analise_colheita.ler_agrupamento(request.args.get('agrupar')),
+            filtros
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao gerar análise da colheita: {str(e)}")
+        return jsonify({"error": "Erro ao gerar análise da colheita"}), 500
+
 @api.route('/gestor/resumo-geral', methods=['GET'])
 def get_resumo_geral():
     """
@@ -286,65 +366,71 @@ def get_resumo_geral():
     Inclui total de pallets e detalhamento por variedade e classificação.
     """
     try:
-        hoje = datetime.utcnow().date()
+        hoje = hoje_local()
         
-        # Buscar todos os produtores ativos
-        produtores = Produtor.query.all()
-        resumo_geral = []
+        # Uma única leitura: produtores com os totais do dia já agregados no resumo diário
+        linhas = db.session.query(
+            Produtor.id,
+            Produtor.nome,
+            Produtor.sigla,
+            Variedade.nome.label('variedade_nome'),
+            ClassificacaoUva.classificacao.label('classificacao_nome'),
+            ClassificacaoUva.peso.label('classificacao_peso'),
+            ClassificacaoUva.caixa.label('classificacao_caixa'),
+            ResumoDiarioAtividade.total_pallets
+        ).outerjoin(
+            ResumoDiarioAtividade, db.and_(
+                ResumoDiarioAtividade.produtor_id == Produtor.id,
+                ResumoDiarioAtividade.data == hoje
+            )
+        ).outerjoin(
+            Variedade, ResumoDiarioAtividade.variedade_id == Variedade.id
+        ).outerjoin(
+            ClassificacaoUva, ResumoDiarioAtividade.classificacao_id == ClassificacaoUva.id
+        ).order_by(Produtor.id).all()
         
-        for produtor in produtores:
-            # Buscar atividades do dia para cada produtor
-            atividades = db.session.query(
-                Atividade,
-                Variedade.nome.label('variedade_nome'),
-                ClassificacaoUva.classificacao.label('classificacao_nome'),
-                ClassificacaoUva.peso.label('classificacao_peso'),  # Adicionando o peso
-                ClassificacaoUva.caixa.label('classificacao_caixa')  # Adicionando a caixa
-            ).join(
-                Variedade, Atividade.variedade_id == Variedade.id
-            ).outerjoin(
-                ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
-            ).filter(
-                Atividade.produtor_id == produtor.id,
-                db.func.date(Atividade.created_at) == hoje
-            ).all()
-            
-            # Processar atividades do produtor
-            resumo_detalhado = {}
-            total_pallets = 0
+        resumo_geral = []
+        resumos_por_produtor = {}
+        
+        for produtor_id, nome, sigla, var_nome, class_nome, class_peso, class_caixa, pallets in linhas:
+            if produtor_id not in resumos_por_produtor:
+                resumos_por_produtor[produtor_id] = {
+                    'produtor_id': produtor_id,
+                    'produtor_nome': nome,
+                    'produtor_sigla': sigla,
+                    'total_pallets': 0,
+                    'detalhamento': {}
+                }
+                resumo_geral.append(resumos_por_produtor[produtor_id])
             
-            for atividade, var_nome, class_nome, class_peso, class_caixa in atividades:
-                total_pallets += atividade.quantidade_pallets
-                
-                if var_nome not in resumo_detalhado:
-                    resumo_detalhado[var_nome] = {
-                        'total_pallets': 0,
-                        'classificacoes': {}
-                    }
-                
-                resumo_detalhado[var_nome]['total_pallets'] += atividade.quantidade_pallets
+            # Produtor sem atividades no dia
+            if pallets is None:
+                continue
                 
-                if class_nome:
-                    # Criar uma chave composta para classificação incluindo peso e tipo de caixa
-                    class_key = f"{class_nome} {class_peso} {class_caixa}"
-                    
-                    if class_key not in resumo_detalhado[var_nome]['classificacoes']:
-                        resumo_detalhado[var_nome]['classificacoes'][class_key] = 0
-                    resumo_detalhado[var_nome]['classificacoes'][class_key] += atividade.quantidade_pallets
+            resumo_produtor = resumos_por_produtor[produtor_id]
+            resumo_produtor['total_pallets'] += pallets
+            resumo_detalhado = resumo_produtor['detalhamento']
             
-            # Adicionar resumo do produtor ao resumo geral
-            resumo_geral.append({
-                'produtor_id': produtor.id,
-                'produtor_nome': produtor.nome,
-                'produtor_sigla': produtor.sigla,
-                'total_pallets': total_pallets,
-                'detalhamento': resumo_detalhado
-            })
+            if var_nome not in resumo_detalhado:
+                resumo_detalhado[var_nome] = {
+                    'total_pallets': 0,
+                    'classificacoes': {}
+                }
+            
+            resumo_detalhado[var_nome]['total_pallets'] += pallets
+            
+            if class_nome:
+                # Chave composta para classificação incluindo peso e tipo de caixa
+                class_key = f"{class_nome} {class_peso} {class_caixa}"
+                
+                if class_key not in resumo_detalhado[var_nome]['classificacoes']:
+                    resumo_detalhado[var_nome]['classificacoes'][class_key] = 0
+                resumo_detalhado[var_nome]['classificacoes'][class_key] += pallets
         
         return jsonify(resumo_geral)
     
     except Exception as e:
-        print(f"Erro ao gerar resumo geral: {str(e)}")
+        current_app.logger.error(f"Erro ao gerar resumo geral: {str(e)}")
         return jsonify({"error": "Erro ao gerar resumo geral"}), 500
     
 @api.route('/gestor/estatisticas', methods=['GET'])
@@ -353,16 +439,17 @@ def get_estatisticas():
     Retorna estatísticas gerais do sistema
     """
     try:
-        hoje = datetime.utcnow().date()
+        inicio, fim = intervalo_utc(hoje_local())
+        periodo_do_dia = (Atividade.created_at >= inicio, Atividade.created_at < fim)
         
         # Total de pallets do dia
         total_pallets_dia = db.session.query(db.func.sum(Atividade.quantidade_pallets)).filter(
-            db.func.date(Atividade.created_at) == hoje
+            *periodo_do_dia
         ).scalar() or 0
         
         # Total de produtores ativos (que registraram atividade hoje)
         produtores_ativos = db.session.query(db.func.count(db.distinct(Atividade.produtor_id))).filter(
-            db.func.date(Atividade.created_at) == hoje
+            *periodo_do_dia
         ).scalar() or 0
         
         # Totais por tipo de atividade
@@ -370,7 +457,7 @@ def get_estatisticas():
             Atividade.tipo_atividade,
             db.func.count(Atividade.id).label('quantidade')
         ).filter(
-            db.func.date(Atividade.created_at) == hoje
+            *periodo_do_dia
         ).group_by(Atividade.tipo_atividade).all()
         
         return jsonify({
@@ -380,11 +467,15 @@ def get_estatisticas():
         })
         
     except Exception as e:
-        print(f"Erro ao buscar estatísticas: {str(e)}")
+        current_app.logger.error(f"Erro ao buscar estatísticas: {str(e)}")
         return jsonify({"error": "Erro ao buscar estatísticas"}), 500
     
 @api.route('/contabilidade/importar-plano', methods=['POST'])
 def importar_plano_contas():
+    """
+    Recebe o CSV do plano de contas e agenda a importação. Responde 202 com o
+    job; o andamento é consultado em /contabilidade/jobs/<id>.
+    """
     if 'arquivo' not in request.files:
         return jsonify({"error": "Nenhum arquivo enviado"}), 400
         
@@ -393,248 +484,102 @@ def importar_plano_contas():
     if arquivo.filename == '':
         return jsonify({"error": "Nome de arquivo vazio"}), 400
         
-    # Verificar informações do arquivo para debug
-    current_app.logger.info(f"Nome do arquivo: {arquivo.filename}")
-    current_app.logger.info(f"Tipo MIME: {arquivo.content_type}")
+    current_app.logger.info("Plano de contas recebido", extra={'arquivo': arquivo.filename, 'tipo_mime': arquivo.content_type})
     
     try:
-        # Ler o conteúdo do arquivo
-        arquivo.stream.seek(0)
-        
-        # Tentar diferentes codificações
-        try:
-            conteudo = arquivo.read().decode('utf-8')
-        except UnicodeDecodeError:
-            arquivo.stream.seek(0)
-            try:
-                conteudo = arquivo.read().decode('iso-8859-1')
-            except UnicodeDecodeError:
-                arquivo.stream.seek(0)
-                conteudo = arquivo.read().decode('latin-1')
-                
-        # Detectar o delimitador
-        sniffer = csv.Sniffer()
-        dialect = sniffer.sniff(conteudo[:1024])
-        delimiter = dialect.delimiter
-        
-        # Se não conseguir detectar, tentar delimitadores comuns
-        if not delimiter or delimiter.isalnum():
-            if ';' in conteudo[:1024]:
-                delimiter = ';'
-            elif ',' in conteudo[:1024]:
-                delimiter = ','
-            elif '\t' in conteudo[:1024]:
-                delimiter = '\t'
-            else:
-                delimiter = ';'  # Padrão
-                
-        current_app.logger.info(f"Delimitador detectado: '{delimiter}'")
-        
-        # Ler CSV com pandas
-        df = pd.read_csv(StringIO(conteudo), 
-                         sep=delimiter, 
-                         encoding='utf-8',
-                         dtype=str,  # Trata todas as colunas como strings
-                         on_bad_lines='skip',
-                         engine='python',  # Motor mais flexível
-                         skipinitialspace=True,  # Ignora espaços iniciais
-                         keep_default_na=False)  # Evita que pandas converta valores vazios em NaN
-        
-        # Verificar e registrar estrutura do CSV
-        current_app.logger.info(f"Colunas detectadas: {list(df.columns)}")
-        current_app.logger.info(f"Primeiras linhas: {df.head(3).to_dict()}")
-
-        # Identificar colunas
-        colunas_esperadas = ['sequencial', 'codigo', 'tipo', 'descricao', 'referencia']
-        mapeamento_colunas = {}
-        
-        # Verificar cada coluna esperada e encontrar correspondência
-        for coluna in colunas_esperadas:
-            # Verificar se existe exatamente
-            if coluna in df.columns:
-                mapeamento_colunas[coluna] = coluna
-                continue
-                
-            # Tentar alternativas para cada coluna
-            if coluna == 'sequencial' and any(c in df.columns for c in ['seq', 'id', 'num']):
-                for alt in ['seq', 'id', 'num']:
-                    if alt in df.columns:
-                        mapeamento_colunas[coluna] = alt
-                        break
-            elif coluna == 'codigo' and any(c in df.columns for c in ['cod', 'código', 'conta']):
-                for alt in ['cod', 'código', 'conta']:
-                    if alt in df.columns:
-                        mapeamento_colunas[coluna] = alt
-                        break
-            elif coluna == 'tipo' and any(c in df.columns for c in ['t', 'tp', 'sintética']):
-                for alt in ['t', 'tp', 'sintética']:
-                    if alt in df.columns:
-                        mapeamento_colunas[coluna] = alt
-                        break
-            elif coluna == 'descricao' and any(c in df.columns for c in ['desc', 'descrição', 'nome']):
-                for alt in ['desc', 'descrição', 'nome']:
-                    if alt in df.columns:
-                        mapeamento_colunas[coluna] = alt
-                        break
-            elif coluna == 'referencia' and any(c in df.columns for c in ['ref', 'referência', 'reduzido']):
-                for alt in ['ref', 'referência', 'reduzido']:
-                    if alt in df.columns:
-                        mapeamento_colunas[coluna] = alt
-                        break
-            
-            # Se ainda não encontrou, usar a posição (índice numérico das colunas)
-            if coluna not in mapeamento_colunas and len(df.columns) >= colunas_esperadas.index(coluna) + 1:
-                mapeamento_colunas[coluna] = df.columns[colunas_esperadas.index(coluna)]
-        
-        current_app.logger.info(f"Mapeamento de colunas: {mapeamento_colunas}")
-        
-        # Se não conseguiu mapear todas as colunas, tentar inferir pela posição
-        if len(mapeamento_colunas) < len(colunas_esperadas):
-            current_app.logger.warning("Algumas colunas não foram mapeadas. Usando posições.")
-            
-            if len(df.columns) >= 5:  # Assumimos que temos pelo menos 5 colunas
-                df.columns = colunas_esperadas[:len(df.columns)]
-                mapeamento_colunas = {col: col for col in colunas_esperadas if col in df.columns}
-            else:
-                return jsonify({"error": "Estrutura do CSV não reconhecida. O arquivo deve ter pelo menos 5 colunas."}), 400
-        
-        registros_importados = 0
-        registros_atualizados = 0
-        registros_ignorados = 0
-        
-        # Limpar todos os registros existentes antes da importação
-        # db.session.query(PlanoContas).delete()
-        # db.session.commit()
-        
-        # Processar linha a linha
-        for index, row in df.iterrows():
-            try:
-                # Obter valores com tratamento de nulos
-                sequencial = str(row.get(mapeamento_colunas.get('sequencial', ''), '')).strip() if 'sequencial' in mapeamento_colunas else ''
-                codigo = str(row.get(mapeamento_colunas.get('codigo', ''), '')).strip() if 'codigo' in mapeamento_colunas else ''
-                tipo = str(row.get(mapeamento_colunas.get('tipo', ''), '')).strip() if 'tipo' in mapeamento_colunas else ''
-                descricao = str(row.get(mapeamento_colunas.get('descricao', ''), '')).strip() if 'descricao' in mapeamento_colunas else ''
-                referencia = str(row.get(mapeamento_colunas.get('referencia', ''), '')).strip() if 'referencia' in mapeamento_colunas else ''
-                
-                # Pular linhas sem código ou descrição
-                if not codigo or codigo.lower() == 'none' or not descricao or descricao.lower() == 'none':
-                    registros_ignorados += 1
-                    continue
-                
-                # Determinar o nível com base no número de pontos no código
-                nivel = codigo.count('.') + 1
-                
-                # Determinar tipo da conta
-                tipo_conta = 'PASSIVO'
-                if codigo.startswith('1'):
-                    tipo_conta = 'ATIVO'
-                elif codigo.startswith('3'):
-                    tipo_conta = 'DESPESA'
-                elif codigo.startswith('4'):
-                    tipo_conta = 'RECEITA'
-                elif codigo.startswith('2.4'):
-                    tipo_conta = 'PATRIMONIO_LIQUIDO'
-                
-                # Determinar natureza do saldo
-                natureza_saldo = 'DEVEDOR' if codigo.startswith(('1', '3')) else 'CREDOR'
-                
-                # Determinar se permite lançamento
-                permite_lancamento = tipo.upper() != 'S'
-                
-                # Verificar se a conta já existe
-                conta_existente = PlanoContas.query.filter_by(codigo=codigo).first()
-                
-                if conta_existente:
-                    # Atualizar conta existente
-                    conta_existente.sequencial = sequencial
-                    conta_existente.codigo_reduzido = referencia
-                    conta_existente.descricao = descricao
-                    conta_existente.nivel = nivel
-                    conta_existente.tipo_conta = tipo_conta
-                    conta_existente.natureza_saldo = natureza_saldo
-                    conta_existente.permite_lancamento = permite_lancamento
-                    conta_existente.tipo = tipo
-                    conta_existente.referencia = referencia
-                    conta_existente.updated_at = datetime.utcnow()
-                    registros_atualizados += 1
-                else:
-                    # Criar nova conta
-                    nova_conta = PlanoContas(
-                        sequencial=sequencial,
-                        codigo=codigo,
-                        codigo_reduzido=referencia,
-                        descricao=descricao,
-                        nivel=nivel,
-                        tipo_conta=tipo_conta,
-                        natureza_saldo=natureza_saldo,
-                        permite_lancamento=permite_lancamento,
-                        tipo=tipo,
-                        referencia=referencia
-                    )
-                    
-                    # Identificar conta pai
-                    if '.' in codigo:
-                        codigo_pai = '.'.join(codigo.split('.')[:-1])
-                        conta_pai = PlanoContas.query.filter_by(codigo=codigo_pai).first()
-                        if conta_pai:
-                            nova_conta.conta_pai_id = conta_pai.id
-                    
-                    db.session.add(nova_conta)
-                    registros_importados += 1
-                
-                # Commit a cada 100 registros para evitar sobrecarga
-                if (registros_importados + registros_atualizados) % 100 == 0:
-                    db.session.commit()
-                    
-            except Exception as row_error:
-                current_app.logger.warning(f"Erro ao processar linha {index+1}: {str(row_error)}")
-                registros_ignorados += 1
-                continue  # Continuar com a próxima linha
-        
-        # Commit final
-        db.session.commit()
-        
-        return jsonify({
-            "message": "Importação concluída com sucesso",
-            "registros_importados": registros_importados,
-            "registros_atualizados": registros_atualizados,
-            "registros_ignorados": registros_ignorados
-        }), 200
-        
+        job = importacao_jobs.enfileirar('plano', arquivo)
+        return jsonify(importacao_jobs.situacao(job)), 202
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Erro na importação: {str(e)}")
-        return jsonify({"error": f"Erro ao processar arquivo: {str(e)}"}), 500
+        current_app.logger.error(f"Erro ao agendar importação: {str(e)}")
+        return jsonify({"error": f"Erro ao agendar importação: {str(e)}"}), 500
     
 @api.route('/contabilidade/plano-contas', methods=['GET'])
+@resposta_cacheada('plano_contas')
 def get_plano_contas():
+    """
+    Retorna o plano de contas na ordem do código. Sem 'limite'/'cursor' o plano
+    inteiro é escrito em fluxo; filtro opcional: prefixo do código.
+    """
+    try:
+        consulta = PlanoContas.query.with_entities(
+            PlanoContas.id,
+            PlanoContas.sequencial,
+            PlanoContas.codigo,
+            PlanoContas.codigo_reduzido,
+            PlanoContas.descricao,
+            PlanoContas.nivel,
+            PlanoContas.conta_pai_id,
+            PlanoContas.tipo_conta,
+            PlanoContas.natureza_saldo,
+            PlanoContas.permite_lancamento,
+            # Formato S/A: sintética quando não permite lançamento
+            db.case((PlanoContas.permite_lancamento.is_(True), 'A'), else_='S').label('tipo'),
+            PlanoContas.referencia
+        )
+        prefixo = request.args.get('prefixo')
+        if prefixo:
+            consulta = consulta.filter(PlanoContas.codigo.like(f'{prefixo}%'))
+            
+        return listagem(consulta, [PlanoContas.codigo, PlanoContas.id])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar plano de contas: {str(e)}")
+        return jsonify({"error": "Erro ao buscar plano de contas", "details": str(e)}), 500
+    
+@api.route('/contabilidade/plano-contas/busca', methods=['GET'])
+def buscar_plano_contas():
+    """
+    Busca contas por prefixo de código ou de código reduzido (q=2.1.3) ou por
+    palavras da descrição, sem diferenciar acentos (q=acao social). Retorna as
+    `limite` melhores (padrão 20, máximo 100), as correspondências de código primeiro.
+    """
     try:
-        # Buscar todos os registros do plano de contas
-        plano_contas = PlanoContas.query.all()
+        limite = request.args.get('limite', busca_plano.LIMITE_PADRAO, type=int)
+        if limite < 1:
+            return jsonify({"error": "limite deve ser maior que zero"}), 400
+        return jsonify(busca_plano.buscar(request.args.get('q', ''), limite))
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar no plano de contas: {str(e)}")
+        return jsonify({"error": "Erro ao buscar no plano de contas"}), 500
+
+@api.route('/contabilidade/plano-contas/arvore', methods=['GET'])
+@resposta_cacheada('plano_contas', 'balancete_items')
+def get_arvore_plano_contas():
+    """
+    Retorna o plano de contas em árvore, com contagem de contas sintéticas e
+    analíticas e saldos acumulados por nó. Parâmetros opcionais:
+    codigo (subárvore de uma conta) e competencia (padrão: a mais recente).
+    """
+    try:
+        codigo = request.args.get('codigo')
+        competencia = request.args.get('competencia')
         
-        # Transformar em dicionário para retorno
-        resultado = [{
-            'id': conta.id,
-            'sequencial': conta.sequencial,
-            'codigo': conta.codigo,
-            'codigo_reduzido': conta.codigo_reduzido,
-            'descricao': conta.descricao, 
-            'nivel': conta.nivel,
-            'conta_pai_id': conta.conta_pai_id,
-            'tipo_conta': conta.tipo_conta,
-            'natureza_saldo': conta.natureza_saldo,
-            'permite_lancamento': conta.permite_lancamento,
-            'tipo': 'S' if not conta.permite_lancamento else 'A',  # Convertendo para formato S/A
-            'referencia': conta.referencia
-        } for conta in plano_contas]
+        if competencia is None:
+            publicadas = balancete.competencias_publicadas()
+            competencia = publicadas[0] if publicadas else None
+        elif not re.match(r'^\d{4}-\d{2}$', competencia):
+            return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
         
-        return jsonify(resultado)
+        arvore = arvore_plano.montar_arvore(codigo, competencia)
+        if arvore is None:
+            return jsonify({"error": f"Conta {codigo} não encontrada"}), 404
+            
+        return jsonify({
+            'competencia': competencia,
+            'contas': arvore
+        })
     except Exception as e:
-        print(f"Erro ao buscar plano de contas: {str(e)}")
-        return jsonify({"error": "Erro ao buscar plano de contas", "details": str(e)}), 500
+        current_app.logger.error(f"Erro ao montar árvore do plano de contas: {str(e)}")
+        return jsonify({"error": "Erro ao buscar árvore do plano de contas", "details": str(e)}), 500
     
 @api.route('/contabilidade/importar-balancete-csv', methods=['POST'])
 def importar_balancete_csv():
+    """
+    Recebe o CSV do balancete e agenda a importação da competência. Responde
+    202 com o job; o andamento é consultado em /contabilidade/jobs/<id>.
+    """
     if 'arquivo' not in request.files:
         return jsonify({"error": "Nenhum arquivo enviado"}), 400
         
@@ -647,170 +592,243 @@ def importar_balancete_csv():
     if not arquivo.filename.lower().endswith('.csv'):
         return jsonify({"error": "O arquivo deve ter extensão .csv"}), 400
     
+    # Obter a competência (ano-mês) do formulário ou usar default 2024-12
+    competencia = request.form.get('competencia', '2024-12')
+    if not re.match(r'^\d{4}-\d{2}$', competencia):
+        return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
+    # Sem tamanho_bloco o job usa o padrão da importação (TAMANHO_BLOCO_PADRAO)
+    tamanho_bloco = request.form.get('tamanho_bloco', type=int)
+    
     try:
-        # Obter a competência (ano-mês) do formulário ou usar default 2024-12
-        competencia = request.form.get('competencia', '2024-12')
-        
-        # Ler o CSV com pandas
-        arquivo.stream.seek(0)
-        df = pd.read_csv(
-            arquivo, 
-            sep=',', 
-            encoding='utf-8',
-            dtype={
-                'Conta': str,
-                'Reduz': 'Int64',  # Permite valores nulos
-                'Tp': str,
-                'Descricao': str,
-                'Saldo Anterior': float,
-                'Debito Periodo': float,
-                'Credito Periodo': float,
-                'Saldo Atual': float
-            },
-            decimal=',',  # Considera vírgula como separador decimal
-            thousands='.'  # Considera ponto como separador de milhares
-        )
-        
-        # Limpar todos os registros existentes (como são dados acumulados, fazemos uma limpeza completa)
-        current_app.logger.info("Limpando registros anteriores antes da importação")
-        db.session.query(BalanceteItem).delete()
-        db.session.commit()
-        
-        # Contador de registros
-        registros_importados = 0
-        registros_ignorados = 0
-        
-        # Processar cada linha do DataFrame
-        for index, row in df.iterrows():
-            try:
-                # Validar se a conta é válida
-                conta = str(row['Conta']).strip()
-                if not conta or not any(c.isdigit() for c in conta):
-                    registros_ignorados += 1
-                    continue
-                
-                # Criar novo item de balancete
-                novo_item = BalanceteItem(
-                    conta=conta,
-                    reducao=pd.notna(row['Reduz']) and int(row['Reduz']) or None,
-                    tipo=str(row['Tp'])[0] if pd.notna(row['Tp']) and str(row['Tp']) else None,
-                    descricao=str(row['Descricao']).strip(),
-                    valor_anterior=float(row['Saldo Anterior']) if pd.notna(row['Saldo Anterior']) else 0.0,
-                    valor_periodo_debito=float(row['Debito Periodo']) if pd.notna(row['Debito Periodo']) else 0.0,
-                    valor_periodo_credito=float(row['Credito Periodo']) if pd.notna(row['Credito Periodo']) else 0.0,
-                    valor_atual=float(row['Saldo Atual']) if pd.notna(row['Saldo Atual']) else 0.0,
-                    competencia=competencia,  # Adicionar competência fixa
-                    data_importacao=datetime.utcnow()
-                )
-                
-                db.session.add(novo_item)
-                registros_importados += 1
-                
-                # Commit a cada 100 registros
-                if registros_importados % 100 == 0:
-                    db.session.commit()
-                    current_app.logger.info(f"Importados {registros_importados} registros até agora")
-                
-            except Exception as row_error:
-                current_app.logger.warning(f"Erro ao processar linha {index+1}: {str(row_error)}")
-                registros_ignorados += 1
-                continue
-        
-        # Commit final
-        db.session.commit()
-        
-        return jsonify({
-            "message": "Importação concluída com sucesso",
-            "registros_importados": registros_importados,
-            "registros_ignorados": registros_ignorados,
-            "competencia": competencia
-        }), 200
-        
+        job = importacao_jobs.enfileirar('balancete', arquivo, competencia, tamanho_bloco)
+        return jsonify(importacao_jobs.situacao(job)), 202
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Erro na importação: {str(e)}")
-        return jsonify({"error": f"Erro ao processar arquivo: {str(e)}"}), 500
+        current_app.logger.error(f"Erro ao agendar importação: {str(e)}")
+        return jsonify({"error": f"Erro ao agendar importação: {str(e)}"}), 500
+    
+@api.route('/contabilidade/jobs/<string:job_id>', methods=['GET'])
+def get_job_importacao(job_id):
+    """
+    Retorna o andamento de uma importação: status, linhas processadas, linhas/segundo, erro e totais finais
+    """
+    job = db.session.get(ImportacaoJob, job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    return jsonify(importacao_jobs.situacao(job))
     
 @api.route('/contabilidade/balancete/completo', methods=['GET'])
+@resposta_cacheada('balancete_items')
 def get_balancete_completo():
     """
-    Retorna todos os itens do balancete (dados acumulados 2024)
+    Retorna os itens publicados do balancete de todas as competências, na ordem
+    (competencia, conta, id). Sem 'limite'/'cursor' a listagem é escrita em
+    fluxo. Filtros opcionais: competencia e prefixo da conta.
     """
     try:
-        # Buscar todos os itens do balancete
-        itens = BalanceteItem.query.all()
-        
-        # Transformar em dicionário para retorno
-        resultado = [{
-            'id': item.id,
-            'conta': item.conta,
-            'reducao': item.reducao,
-            'tipo': item.tipo,
-            'descricao': item.descricao,
-            'valor_anterior': float(item.valor_anterior) if item.valor_anterior else 0.0,
-            'valor_periodo_debito': float(item.valor_periodo_debito) if item.valor_periodo_debito else 0.0,
-            'valor_periodo_credito': float(item.valor_periodo_credito) if item.valor_periodo_credito else 0.0,
-            'valor_atual': float(item.valor_atual) if item.valor_atual else 0.0,
-            'competencia': getattr(item, 'competencia', '2024-12')  # Usar atributo se existir, caso contrário default
-        } for item in itens]
-        
-        return jsonify(resultado)
+        consulta = balancete.itens_publicados(request.args.get('competencia') or None).with_entities(
+            *balancete.colunas_itens()
+        )
+        prefixo = request.args.get('prefixo')
+        if prefixo:
+            consulta = consulta.filter(BalanceteItem.conta.like(f'{prefixo}%'))
+            
+        return listagem(consulta, [BalanceteItem.competencia, BalanceteItem.conta, BalanceteItem.id])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar balancete completo: {str(e)}")
         return jsonify({"error": "Erro ao buscar dados do balancete", "details": str(e)}), 500
     
 @api.route('/contabilidade/competencias', methods=['GET'])
+@resposta_cacheada('balancete_items')
 def get_competencias():
     """
-    Retorna a lista de competências disponíveis no balancete
+    Retorna a lista de competências com balancete publicado, da mais recente para a mais antiga
     """
     try:
-        # Como os dados são acumulados de 2024, retornar apenas 2024-12
-        return jsonify(['2024-12'])
+        return jsonify(balancete.competencias_publicadas())
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar competências: {str(e)}")
         return jsonify({"error": "Erro ao buscar competências disponíveis", "details": str(e)}), 500
     
 @api.route('/contabilidade/balancete/<string:competencia>', methods=['GET'])
+@resposta_cacheada('balancete_items')
 def get_balancete(competencia):
     """
-    Retorna os itens do balancete para a competência especificada.
-    Como os dados são acumulados de 2024, retorna todos os itens independente da competência.
+    Retorna os itens da versão publicada do balancete para a competência especificada.
     """
     try:
         # Validar formato da competência
         if not re.match(r'^\d{4}-\d{2}$', competencia):
             return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
         
-        # Buscar todos os itens do balancete (independente da competência)
-        itens = BalanceteItem.query.all()
-        
-        # Transformar em dicionário para retorno
-        resultado = [{
-            'id': item.id,
-            'conta': item.conta,
-            'reducao': item.reducao,
-            'tipo': item.tipo,
-            'descricao': item.descricao,
-            'valor_anterior': float(item.valor_anterior) if item.valor_anterior else 0.0,
-            'valor_periodo_debito': float(item.valor_periodo_debito) if item.valor_periodo_debito else 0.0,
-            'valor_periodo_credito': float(item.valor_periodo_credito) if item.valor_periodo_credito else 0.0,
-            'valor_atual': float(item.valor_atual) if item.valor_atual else 0.0,
-            'competencia': competencia  # Usar a competência informada na URL
-        } for item in itens]
-        
-        return jsonify(resultado)
+        itens = balancete.itens_publicados(competencia).with_entities(*balancete.colunas_itens()).all()
+        return jsonify([item._asdict() for item in itens])
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar balancete: {str(e)}")
         return jsonify({"error": "Erro ao buscar dados do balancete", "details": str(e)}), 500
     
+@api.route('/contabilidade/balancete/<string:competencia>/export', methods=['GET'])
+def exportar_balancete(competencia):
+    """
+    Exporta o balancete publicado da competência em CSV (padrão, no layout do
+    arquivo importado) ou XLSX (formato=xlsx).
+    """
+    try:
+        if not re.match(r'^\d{4}-\d{2}$', competencia):
+            return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
+            
+        formato = ler_formato()
+        titulos, colunas = zip(*balancete.colunas_exportacao())
+        consulta = balancete.itens_publicados(competencia).with_entities(*colunas)\
+            .order_by(BalanceteItem.conta, BalanceteItem.id)
+        
+        return resposta_exportacao(
+            consulta.yield_per(TAMANHO_LOTE),
+            list(titulos),
+            f'balancete-{competencia}',
+            formato,
+            titulo=f'Balancete {competencia}'
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao exportar balancete: {str(e)}")
+        return jsonify({"error": "Erro ao exportar balancete", "details": str(e)}), 500
+    
+@api.route('/contabilidade/demonstrativos/<string:competencia>', methods=['GET'])
+@resposta_cacheada('balancete_items')
+def get_demonstrativos(competencia):
+    """
+    Retorna os demonstrativos (balanço, sobras e perdas, fluxo de caixa, PL,
+    contas a pagar e a receber) calculados sobre o balancete publicado.
+    """
+    try:
+        if not re.match(r'^\d{4}-\d{2}$', competencia):
+            return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
+            
+        # pandas só é carregado quando os demonstrativos são calculados
+        from services import demonstrativos
+        
+        resultado = demonstrativos.obter(competencia)
+        if resultado is None:
+            return jsonify({"error": "Nenhum balancete publicado para a competência"}), 404
+            
+        return jsonify(resultado)
+    except Exception as e:
+        current_app.logger.error(f"Erro ao calcular demonstrativos: {str(e)}")
+        return jsonify({"error": "Erro ao calcular demonstrativos", "details": str(e)}), 500
+
+@api.route('/contabilidade/analises/<string:competencia>', methods=['GET'])
+def get_analises(competencia):
+    """
+    Análise vertical e horizontal, conta a conta, do balancete publicado.
+    Parâmetros: comparacao (AAAA-MM, padrão a competência publicada anterior)
+    e demonstrativo (BP ou DRE).
+    """
+    try:
+        comparacao = request.args.get('comparacao')
+        demonstrativo = request.args.get('demonstrativo')
+        for valor in (competencia, comparacao):
+            if valor is not None and not re.match(r'^\d{4}-\d{2}$', valor):
+                return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
+
+        # pandas só é carregado quando a análise é pedida
+        from services import analise_financeira
+
+        if demonstrativo is not None and demonstrativo not in analise_financeira.DEMONSTRATIVOS:
+            return jsonify({"error": "Demonstrativo inválido. Use BP ou DRE"}), 400
+        if comparacao is None:
+            comparacao = analise_financeira.competencia_anterior(competencia)
+
+        resultado = analise_financeira.obter(competencia, comparacao, demonstrativo)
+        if resultado is None:
+            return jsonify({"error": "Nenhum balancete publicado para a competência"}), 404
+
+        return jsonify(resultado)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao calcular análises: {str(e)}")
+        return jsonify({"error": "Erro ao calcular análises", "details": str(e)}), 500
+
+@api.route('/contabilidade/indicadores', methods=['GET'])
+@resposta_cacheada('balancete_items')
+def get_indicadores():
+    """
+    Séries mensais dos indicadores financeiros gravados a cada importação.
+    Parâmetros: inicio e fim (AAAA-MM), nomes (separados por vírgula) e tipo
+    (LIQUIDEZ, ENDIVIDAMENTO ou RENTABILIDADE).
+    """
+    try:
+        inicio = request.args.get('inicio')
+        fim = request.args.get('fim')
+        for valor in (inicio, fim):
+            if valor is not None and not re.match(r'^\d{4}-\d{2}$', valor):
+                return jsonify({"error": "Formato de competência inválido. Use AAAA-MM"}), 400
+
+        return jsonify(indicadores.series(
+            inicio, fim, indicadores.ler_nomes(request.args.get('nomes')), request.args.get('tipo')
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao listar indicadores: {str(e)}")
+        return jsonify({"error": "Erro ao listar indicadores", "details": str(e)}), 500
+
 @api.route('/atividades/<int:id>', methods=['DELETE'])
 def delete_atividade(id):
     try:
         atividade = Atividade.query.get_or_404(id)
+        resumo_diario.remover_atividades([atividade])
+        evento = eventos.dados_atividade(atividade)
         db.session.delete(atividade)
         db.session.commit()
+        eventos.publicar_atividade('atividade_removida', evento)
         return '', 204
     except Exception as e:
-        print(f"Erro ao excluir atividade: {str(e)}")
-        return jsonify({"error": "Erro ao excluir atividade"}), 500
\ No newline at end of file
+        current_app.logger.error(f"Erro ao excluir atividade: {str(e)}")
+        return jsonify({"error": "Erro ao excluir atividade"}), 500
+
+def _fluxo_eventos(canais):
+    ultimo_id = request.headers.get('Last-Event-ID', type=int)
+    corpo = eventos.fluxo(canais, ultimo_id)
+    if corpo is None:
+        # Cada fluxo ocupa uma thread do worker: além do limite, a API ficaria sem threads
+        return jsonify({"error": "Limite de conexões de eventos atingido"}), 503, {
+            'Retry-After': str(eventos.ESPERA_LIMITE)
+        }
+    return Response(corpo, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Proxies (nginx) não devem segurar o fluxo
+    })
+
+@api.route('/eventos/produtor/<int:produtor_id>', methods=['GET'])
+def get_eventos_produtor(produtor_id):
+    """
+    Fluxo SSE com as atividades criadas/removidas do produtor
+    """
+    return _fluxo_eventos([eventos.canal_produtor(produtor_id)])
+
+@api.route('/eventos/gestor', methods=['GET'])
+def get_eventos_gestor():
+    """
+    Fluxo SSE com as atividades criadas/removidas de todos os produtores
+    """
+    return _fluxo_eventos([eventos.CANAL_GESTOR])
+
+@api.route('/eventos/conexoes', methods=['GET'])
+def get_conexoes_eventos():
+    """
+    Retorna quantos clientes estão conectados em cada canal deste worker
+    """
+    return jsonify(eventos.broker.conexoes())
+
+@api.route('/cache/estatisticas', methods=['GET'])
+def get_estatisticas_cache():
+    """
+    Retorna os contadores de hit/miss/304 do cache de respostas deste worker
+    """
+    return jsonify(cache_respostas.estatisticas())
@@ -0,0 +1,145 @@
+"""
+Análise da colheita em intervalos arbitrários (uma safra inteira, por exemplo).
+
+Lê apenas o resumo diário (services/resumo_diario.py), que já guarda pallets,
+caixas e registros por dia × produtor × variedade × classificação × fazenda e
+é mantido a cada gravação. Uma consulta agrupa os dias do intervalo pelas
+dimensões pedidas; a soma por semana ou mês e os acumulados são feitos aqui,
+sobre no máximo (dias × combinações) linhas. O tempo de resposta não depende
+de quantas atividades caíram no intervalo.
+"""
+from datetime import timedelta
+from models.models import db, ClassificacaoUva, Fazenda, Produtor, ResumoDiarioAtividade, Variedade
+from services.resumo_diario import SEM_CLASSIFICACAO
+
+PERIODOS = ('dia', 'semana', 'mes')
+
+# Dimensão -> (coluna do resumo, modelo, função que dá o nome exibido)
+DIMENSOES = {
+    'produtor': (ResumoDiarioAtividade.produtor_id, Produtor, lambda p: p.nome),
+    'variedade': (ResumoDiarioAtividade.variedade_id, Variedade, lambda v: v.nome),
+    'classificacao': (ResumoDiarioAtividade.classificacao_id, ClassificacaoUva, lambda c: f"{c.classificacao} - {c.caixa}"),
+    'fazenda': (ResumoDiarioAtividade.fazenda_id, Fazenda, lambda f: f.nome),
+}
+
+INTERVALO_MAXIMO_DIAS = 731
+
+def inicio_periodo(data, periodo):
+    if periodo == 'semana':
+        return data - timedelta(days=data.weekday())  # Segunda-feira
+    if periodo == 'mes':
+        return data.replace(day=1)
+    return data
+
+def _fim_periodo(inicio, periodo):
+    if periodo == 'semana':
+        return inicio + timedelta(days=6)
+    if periodo == 'mes':
+        return (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return inicio
+
+def _periodos(data_inicio, data_fim, periodo):
+    """
+    Períodos que cobrem o intervalo, recortados nas bordas (a primeira semana
+    ou mês pode começar depois do início real do período).
+    """
+    periodos = []
+    inicio = inicio_periodo(data_inicio, periodo)
+    while inicio <= data_fim:
+        periodos.append((inicio, max(inicio, data_inicio), min(_fim_periodo(inicio, periodo), data_fim)))
+        inicio = _fim_periodo(inicio, periodo) + timedelta(days=1)
+    return periodos
+
+def _nomes(dimensao, ids):
+    _, modelo, nome = DIMENSOES[dimensao]
+    ids = set(ids) - {SEM_CLASSIFICACAO}  # Sem classificação (ou linha anterior à fazenda no resumo)
+    if not ids:
+        return {}
+    return {objeto.id: nome(objeto) for objeto in db.session.query(modelo).filter(modelo.id.in_(ids))}
+
+def ler_agrupamento(texto):
+    agrupar = [d.strip() for d in (texto or '').split(',') if d.strip()]
+    invalidas = [d for d in agrupar if d not in DIMENSOES]
+    if invalidas:
+        raise ValueError(f"Agrupamento inválido: {', '.join(invalidas)}. Use {', '.join(DIMENSOES)}")
+    return list(dict.fromkeys(agrupar))
+
+def analisar(data_inicio, data_fim, periodo='dia', agrupar=(), filtros=None):
+    """
+    Pallets, caixas e registros por período (dia, semana ou mês) entre os dias
+    locais data_inicio e data_fim, uma série por combinação das dimensões em
+    `agrupar`. `filtros` restringe por id de dimensão ({'produtor': 3, ...}).
+    Cada período traz também os acumulados desde o início do intervalo.
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo}. Use {', '.join(PERIODOS)}")
+    if data_fim < data_inicio:
+        raise ValueError("data_fim anterior a data_inicio")
+    if (data_fim - data_inicio).days >= INTERVALO_MAXIMO_DIAS:
+        raise ValueError(f"Intervalo maior que {INTERVALO_MAXIMO_DIAS} dias")
+
+    colunas = [DIMENSOES[dimensao][0] for dimensao in agrupar]
+    consulta = db.session.query(
+        ResumoDiarioAtividade.data,
+        *colunas,
+        db.func.sum(ResumoDiarioAtividade.total_pallets),
+        db.func.sum(ResumoDiarioAtividade.total_caixas),
+        db.func.sum(ResumoDiarioAtividade.quantidade_registros)
+    ).filter(
+        ResumoDiarioAtividade.data >= data_inicio,
+        ResumoDiarioAtividade.data <= data_fim
+    )
+    for dimensao, valor in (filtros or {}).items():
+        consulta = consulta.filter(DIMENSOES[dimensao][0] == valor)
+    linhas = consulta.group_by(ResumoDiarioAtividade.data, *colunas).all()
+
+    periodos = _periodos(data_inicio, data_fim, periodo)
+    posicoes = {inicio: posicao for posicao, (inicio, _, _) in enumerate(periodos)}
+
+    # chave (ids das dimensões) -> [pallets, caixas, registros] por período
+    series = {}
+    for data, *chave, pallets, caixas, registros in linhas:
+        totais = series.setdefault(tuple(chave), [[0, 0, 0] for _ in periodos])
+        total = totais[posicoes[inicio_periodo(data, periodo)]]
+        total[0] += int(pallets or 0)
+        total[1] += int(caixas or 0)
+        total[2] += int(registros or 0)
+
+    nomes = {
+        dimensao: _nomes(dimensao, {chave[posicao] for chave in series})
+        for posicao, dimensao in enumerate(agrupar)
+    }
+
+    resultado = []
+    for chave, totais in sorted(series.items()):
+        serie = {
+            dimensao: {'id': chave[posicao], 'nome': nomes[dimensao].get(chave[posicao])}
+            for posicao, dimensao in enumerate(agrupar)
+        }
+        serie['periodos'] = []
+        acumulado = [0, 0, 0]
+        for (_, inicio, fim), (pallets, caixas, registros) in zip(periodos, totais):
+            acumulado = [acumulado[0] + pallets, acumulado[1] + caixas, acumulado[2] + registros]
+            serie['periodos'].append({
+                'inicio': inicio.isoformat(),
+                'fim': fim.isoformat(),
+                'pallets': pallets,
+                'caixas': caixas,
+                'registros': registros,
+                'pallets_acumulados': acumulado[0],
+                'caixas_acumuladas': acumulado[1],
+                'registros_acumulados': acumulado[2]
+            })
+        serie['total_pallets'], serie['total_caixas'], serie['quantidade_registros'] = acumulado
+        resultado.append(serie)
+
+    return {
+        'data_inicio': data_inicio.isoformat(),
+        'data_fim': data_fim.isoformat(),
+        'periodo': periodo,
+        'agrupar': list(agrupar),
+        'total_pallets': sum(serie['total_pallets'] for serie in resultado),
+        'total_caixas': sum(serie['total_caixas'] for serie in resultado),
+        'quantidade_registros': sum(serie['quantidade_registros'] for serie in resultado),
+        'series': resultado
+    }
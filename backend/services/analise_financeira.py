@@ -0,0 +1,278 @@
+"""
+Análise vertical e horizontal do balanço (BP) e das sobras e perdas (DRE),
+conta a conta, gravada em analises_financeiras.
+
+Vertical: participação de cada conta no total da seção, com os totais de
+services/demonstrativos.py (ativo sobre o total do ativo, passivo e PL sobre
+o total do passivo, contas de resultado sobre o total das receitas).
+Horizontal: variação de cada conta entre a competência e a de comparação.
+
+O cálculo usa operações sobre colunas inteiras do balancete (pandas), sem
+laço por conta, e grava tudo num único INSERT em lote. As linhas guardam as
+versões publicadas dos balancetes usados. A importação do balancete recalcula
+as análises lidas por padrão (atualizar_publicacao); a leitura só recalcula
+para comparações fora do padrão, com o período bloqueado durante o cálculo.
+"""
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+from models.models import db
+from models.financeiro_models import AnaliseFinanceira, BalanceteVersao, PlanoContas
+from services import balancete, demonstrativos
+from services.arvore_plano import chave_codigo
+
+DEMONSTRATIVOS = ('BP', 'DRE')
+
+# Maior valor de DECIMAL(12,4); variações além disso ficam sem percentual
+LIMITE_PERCENTUAL = 10 ** 8
+
+def versoes_publicadas(*competencias):
+    return dict(
+        db.session.query(BalanceteVersao.competencia, BalanceteVersao.versao_publicada)
+        .filter(BalanceteVersao.competencia.in_(competencias), BalanceteVersao.versao_publicada > 0)
+    )
+
+def competencia_anterior(competencia):
+    """
+    Competência publicada imediatamente anterior (padrão da comparação horizontal).
+    """
+    return db.session.query(db.func.max(BalanceteVersao.competencia)).filter(
+        BalanceteVersao.competencia < competencia,
+        BalanceteVersao.versao_publicada > 0
+    ).scalar()
+
+def competencia_seguinte(competencia):
+    """
+    Competência publicada imediatamente posterior: a que usa `competencia`
+    como comparação padrão.
+    """
+    return db.session.query(db.func.min(BalanceteVersao.competencia)).filter(
+        BalanceteVersao.competencia > competencia,
+        BalanceteVersao.versao_publicada > 0
+    ).scalar()
+
+def _valores(df):
+    """
+    Uma linha por (conta, demonstrativo) com o valor no sinal dos relatórios
+    e a base da análise vertical.
+    """
+    secoes = demonstrativos.secoes(df)
+    totais = demonstrativos.totais(df, secoes)
+    balanco = secoes['ativo'] | secoes['passivo'] | secoes['patrimonio']
+    resultado = secoes['receitas'] | secoes['custos'] | secoes['despesas']
+    passivo_pl = secoes['passivo'] | secoes['patrimonio']
+
+    atual = df['valor_atual']
+    valores = pd.DataFrame({
+        'conta': df['conta'],
+        'demonstrativo': np.select([balanco, resultado], DEMONSTRATIVOS, default=''),
+        # Passivo, PL e receitas são credores: positivos como nos relatórios
+        'valor': np.where(passivo_pl | secoes['receitas'], atual.abs(), atual),
+        'base': np.select(
+            [secoes['ativo'], passivo_pl, resultado],
+            [totais['total_ativo'], totais['total_passivo'], totais['total_receitas']],
+            default=0.0
+        ),
+    })
+    valores = valores[valores['demonstrativo'] != '']
+    # Conta repetida no balancete: soma as linhas
+    return valores.groupby(['conta', 'demonstrativo'], as_index=False, sort=False)\
+        .agg(valor=('valor', 'sum'), base=('base', 'first'))
+
+def _percentual(numerador, denominador):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentual = np.round(numerador / denominador * 100, 4)
+    return np.where((denominador != 0) & (np.abs(percentual) < LIMITE_PERCENTUAL), percentual, np.nan)
+
+def _linhas(tipo, df, constantes):
+    """
+    Dicionários para o INSERT em lote, com tipos Python (o driver não aceita
+    os inteiros do numpy) e None no lugar de NaN.
+    """
+    colunas = {
+        'tipo_demonstrativo': df['demonstrativo'].tolist(),
+        'conta_id': df['conta_id'].astype(int).tolist(),
+        'valor_base': df['valor_base'].round(2).tolist(),
+        'valor_calculado': df['valor_calculado'].round(2).tolist(),
+        'percentual': df['percentual'].astype(object).where(df['percentual'].notna(), None).tolist(),
+    }
+    return [
+        dict(zip(colunas, valores), tipo_analise=tipo, **constantes)
+        for valores in zip(*colunas.values())
+    ]
+
+def calcular(competencia, comparacao=None):
+    """
+    Recalcula e grava a análise vertical da competência e, com `comparacao`,
+    a horizontal entre as duas. Retorna a quantidade de linhas gravadas por
+    tipo, ou None se a competência não tiver balancete publicado ou se as
+    linhas gravadas já forem das versões atuais.
+    """
+    versoes = versoes_publicadas(*filter(None, (competencia, comparacao)))
+    if competencia not in versoes:
+        return None
+    if comparacao and comparacao not in versoes:
+        raise ValueError(f"Nenhum balancete publicado para a competência de comparação {comparacao}")
+
+    # Bloqueia os períodos até o commit: duas leituras que encontrem a análise
+    # desatualizada não apagam e regravam as mesmas linhas ao mesmo tempo. A
+    # segunda, ao ganhar o bloqueio, encontra as linhas já atualizadas
+    periodos = balancete.periodos_contabeis([c for c in (competencia, comparacao) if c], criar=True)
+    if _atualizada(periodos[competencia], periodos.get(comparacao), versoes, competencia, comparacao):
+        db.session.commit()
+        return None
+    ids_contas = dict(db.session.query(PlanoContas.codigo, PlanoContas.id))
+
+    atual = _valores(demonstrativos.carregar(competencia))
+    atual['conta_id'] = atual['conta'].map(ids_contas)
+    sem_plano = int(atual['conta_id'].isna().sum())
+    atual = atual[atual['conta_id'].notna()]
+
+    vertical = atual.assign(
+        valor_base=atual['base'],
+        valor_calculado=atual['valor'],
+        percentual=_percentual(atual['valor'], atual['base'])
+    )
+    linhas = _linhas('VERTICAL', vertical, {
+        'periodo_id': periodos[competencia],
+        'periodo_comparacao_id': None,
+        'versao_balancete': versoes[competencia],
+        'versao_comparacao': None,
+    })
+    tabela = AnaliseFinanceira.__table__
+    remover = [tabela.c.tipo_analise == 'VERTICAL']
+
+    if comparacao:
+        anterior = _valores(demonstrativos.carregar(comparacao))
+        anterior['conta_id'] = anterior['conta'].map(ids_contas)
+        anterior = anterior[anterior['conta_id'].notna()]
+        # Contas que só existem em um dos períodos entram com 0 no outro
+        horizontal = atual[['conta_id', 'demonstrativo', 'valor']].merge(
+            anterior[['conta_id', 'demonstrativo', 'valor']],
+            on=['conta_id', 'demonstrativo'], how='outer', suffixes=('', '_anterior')
+        ).fillna(0.0)
+        horizontal = horizontal.assign(
+            valor_base=horizontal['valor_anterior'],
+            valor_calculado=horizontal['valor'],
+            percentual=_percentual(horizontal['valor'] - horizontal['valor_anterior'], horizontal['valor_anterior'].abs())
+        )
+        linhas += _linhas('HORIZONTAL', horizontal, {
+            'periodo_id': periodos[competencia],
+            'periodo_comparacao_id': periodos[comparacao],
+            'versao_balancete': versoes[competencia],
+            'versao_comparacao': versoes[comparacao],
+        })
+        remover.append(db.and_(
+            tabela.c.tipo_analise == 'HORIZONTAL',
+            tabela.c.periodo_comparacao_id == periodos[comparacao]
+        ))
+
+    db.session.execute(tabela.delete().where(tabela.c.periodo_id == periodos[competencia], db.or_(*remover)))
+    if linhas:
+        db.session.execute(tabela.insert(), linhas)
+    db.session.commit()
+
+    return {
+        'vertical': len(vertical),
+        'horizontal': len(linhas) - len(vertical),
+        'contas_fora_do_plano': sem_plano,
+    }
+
+def _atualizada(periodo_id, comparacao_id, versoes, competencia, comparacao):
+    gravadas = set(
+        db.session.query(
+            AnaliseFinanceira.tipo_analise, AnaliseFinanceira.versao_balancete, AnaliseFinanceira.versao_comparacao
+        ).filter(
+            AnaliseFinanceira.periodo_id == periodo_id,
+            db.or_(
+                AnaliseFinanceira.tipo_analise == 'VERTICAL',
+                AnaliseFinanceira.periodo_comparacao_id == comparacao_id
+            ) if comparacao_id else AnaliseFinanceira.tipo_analise == 'VERTICAL'
+        ).distinct()
+    )
+    if ('VERTICAL', versoes[competencia], None) not in gravadas:
+        return False
+    return not comparacao or ('HORIZONTAL', versoes[competencia], versoes[comparacao]) in gravadas
+
+def atualizar_publicacao(competencia):
+    """
+    Recalcula, depois da publicação do balancete da competência, as análises
+    lidas por padrão: a dela (contra a anterior) e a da competência seguinte,
+    que a usa como comparação.
+    """
+    calcular(competencia, competencia_anterior(competencia))
+    seguinte = competencia_seguinte(competencia)
+    if seguinte:
+        calcular(seguinte, competencia)
+
+def obter(competencia, comparacao=None, demonstrativo=None):
+    """
+    Análise gravada da competência (e horizontal contra `comparacao`), uma
+    entrada por conta. Só recalcula se as linhas não forem das versões atuais
+    (comparação fora do padrão ou falha no cálculo da importação).
+    Retorna None se a competência não tiver balancete publicado.
+    """
+    versoes = versoes_publicadas(*filter(None, (competencia, comparacao)))
+    if competencia not in versoes:
+        return None
+    if comparacao and comparacao not in versoes:
+        raise ValueError(f"Nenhum balancete publicado para a competência de comparação {comparacao}")
+
+    periodos = balancete.periodos_contabeis([c for c in (competencia, comparacao) if c])
+    periodo_id, comparacao_id = periodos.get(competencia), periodos.get(comparacao)
+    if not (periodo_id and (comparacao_id or not comparacao)
+            and _atualizada(periodo_id, comparacao_id, versoes, competencia, comparacao)):
+        calcular(competencia, comparacao)
+        periodos = balancete.periodos_contabeis([c for c in (competencia, comparacao) if c])
+        periodo_id, comparacao_id = periodos[competencia], periodos.get(comparacao)
+
+    filtro_tipo = AnaliseFinanceira.tipo_analise == 'VERTICAL'
+    if comparacao_id:
+        filtro_tipo = db.or_(filtro_tipo, db.and_(
+            AnaliseFinanceira.tipo_analise == 'HORIZONTAL',
+            AnaliseFinanceira.periodo_comparacao_id == comparacao_id
+        ))
+    consulta = db.session.query(
+        AnaliseFinanceira.tipo_analise, AnaliseFinanceira.tipo_demonstrativo,
+        AnaliseFinanceira.valor_base, AnaliseFinanceira.valor_calculado, AnaliseFinanceira.percentual,
+        PlanoContas.codigo, PlanoContas.descricao, PlanoContas.nivel
+    ).join(
+        PlanoContas, AnaliseFinanceira.conta_id == PlanoContas.id
+    ).filter(AnaliseFinanceira.periodo_id == periodo_id, filtro_tipo)
+    if demonstrativo:
+        consulta = consulta.filter(AnaliseFinanceira.tipo_demonstrativo == demonstrativo)
+
+    contas = {}
+    for tipo, demo, base, valor, percentual, codigo, descricao, nivel in consulta:
+        base, valor = float(base), float(valor)
+        percentual = float(percentual) if percentual is not None else None
+        conta = contas.setdefault((demo, codigo), {
+            'demonstrativo': demo,
+            'codigo': codigo,
+            'descricao': descricao,
+            'nivel': nivel,
+            'valor': None,
+            'base_vertical': None,
+            'percentual_vertical': None,
+        })
+        if tipo == 'VERTICAL':
+            conta.update(valor=valor, base_vertical=base, percentual_vertical=percentual)
+        else:
+            conta.update(
+                valor_comparacao=base,
+                variacao=round(valor - base, 2),
+                percentual_horizontal=percentual
+            )
+            if conta['valor'] is None:
+                conta['valor'] = valor
+
+    return {
+        'competencia': competencia,
+        'comparacao': comparacao,
+        'versao': versoes[competencia],
+        'versao_comparacao': versoes.get(comparacao),
+        'contas': [
+            contas[chave] for chave in sorted(
+                contas, key=lambda chave: (DEMONSTRATIVOS.index(chave[0]), chave_codigo(chave[1]))
+            )
+        ],
+    }
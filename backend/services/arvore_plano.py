@@ -0,0 +1,150 @@
+"""
+Árvore do plano de contas.
+
+A hierarquia (conta_pai_id) é materializada como conjuntos aninhados nas
+colunas lft/rgt, recalculadas apenas quando o plano é importado. Assim a
+árvore inteira sai de uma leitura ordenada por lft e qualquer subárvore de
+um intervalo lft..rgt, sem reconstruir a hierarquia a cada requisição.
+"""
+from collections import defaultdict
+from models.models import db
+from models.financeiro_models import PlanoContas, BalanceteItem
+from services import balancete
+from services.upsert import upsert
+
+VALORES = ('valor_anterior', 'valor_periodo_debito', 'valor_periodo_credito', 'valor_atual')
+
+def chave_codigo(codigo):
+    """
+    Ordena códigos por segmento numérico (1.2 antes de 1.10).
+    """
+    return [(0, int(parte), '') if parte.isdigit() else (1, 0, parte) for parte in codigo.split('.')]
+
+def reconstruir_indice():
+    """
+    Recalcula lft/rgt de todas as contas a partir de conta_pai_id, na
+    transação corrente (o commit fica com quem chama, para que a importação do
+    plano grave contas e índice juntos). Retorna a quantidade de contas indexadas.
+    """
+    contas = db.session.query(
+        PlanoContas.id, PlanoContas.codigo, PlanoContas.descricao, PlanoContas.conta_pai_id
+    ).all()
+    ids = {conta.id for conta in contas}
+    
+    filhos = defaultdict(list)
+    for conta in contas:
+        # Contas com pai inexistente entram como raízes
+        pai = conta.conta_pai_id if conta.conta_pai_id in ids else None
+        filhos[pai].append(conta)
+    for irmaos in filhos.values():
+        irmaos.sort(key=lambda conta: chave_codigo(conta.codigo))
+    
+    posicoes = []
+    contador = 0
+    pilha = [(conta, False) for conta in reversed(filhos[None])]
+    visitados = set()
+    
+    # Percurso em profundidade iterativo: lft na entrada, rgt na saída
+    lft = {}
+    while pilha:
+        conta, saindo = pilha.pop()
+        if saindo:
+            contador += 1
+            # codigo e descricao (NOT NULL) só completam a linha do upsert; as contas já existem
+            posicoes.append({
+                'id': conta.id, 'codigo': conta.codigo, 'descricao': conta.descricao,
+                'lft': lft[conta.id], 'rgt': contador
+            })
+            continue
+        if conta.id in visitados:
+            continue
+        visitados.add(conta.id)
+        contador += 1
+        lft[conta.id] = contador
+        pilha.append((conta, True))
+        pilha.extend((filho, False) for filho in reversed(filhos[conta.id]))
+    
+    # Um único INSERT ... ON DUPLICATE KEY UPDATE em lote (um UPDATE por conta
+    # seria uma ida ao banco por linha no MySQL)
+    upsert(PlanoContas.__table__, posicoes, chaves=('id',), atualizar=('lft', 'rgt'))
+    
+    return len(posicoes)
+
+def _saldos_analiticos(competencia, codigo=None):
+    """
+    Soma dos valores das contas analíticas do balancete publicado, por conta.
+    """
+    consulta = balancete.itens_publicados(competencia).filter(
+        BalanceteItem.tipo == 'A'
+    ).with_entities(BalanceteItem.conta, *[getattr(BalanceteItem, v) for v in VALORES])
+    
+    if codigo:
+        consulta = consulta.filter(db.or_(
+            BalanceteItem.conta == codigo,
+            BalanceteItem.conta.like(f'{codigo}.%')
+        ))
+    
+    saldos = defaultdict(lambda: [0.0] * len(VALORES))
+    for conta, *valores in consulta:
+        saldo = saldos[conta]
+        for i, valor in enumerate(valores):
+            saldo[i] += float(valor or 0)
+    return saldos
+
+def montar_arvore(codigo=None, competencia=None):
+    """
+    Monta a árvore (ou a subárvore de `codigo`) com a contagem de contas
+    sintéticas e analíticas e os saldos acumulados de cada nó.
+    Retorna None se o código não existir.
+    """
+    consulta = db.session.query(
+        PlanoContas.id, PlanoContas.codigo, PlanoContas.descricao, PlanoContas.nivel,
+        PlanoContas.permite_lancamento, PlanoContas.lft, PlanoContas.rgt
+    )
+    
+    if codigo:
+        raiz = db.session.query(PlanoContas.lft, PlanoContas.rgt).filter_by(codigo=codigo).first()
+        if raiz is None:
+            return None
+        consulta = consulta.filter(PlanoContas.lft.between(raiz.lft, raiz.rgt))
+    
+    saldos = _saldos_analiticos(competencia, codigo) if competencia else {}
+    
+    raizes = []
+    pilha = []  # Nós abertos: (nó, rgt)
+    
+    def fechar(no):
+        # Propaga contagens e saldos do nó para o pai
+        if pilha:
+            pai = pilha[-1][0]
+            pai['contas_sinteticas'] += no['contas_sinteticas'] + (0 if no['tipo'] == 'A' else 1)
+            pai['contas_analiticas'] += no['contas_analiticas'] + (1 if no['tipo'] == 'A' else 0)
+            for valor in VALORES:
+                pai[valor] += no[valor]
+        for valor in VALORES:
+            no[valor] = round(no[valor], 2)
+    
+    for conta in consulta.filter(PlanoContas.lft.isnot(None)).order_by(PlanoContas.lft):
+        while pilha and pilha[-1][1] < conta.lft:
+            fechar(pilha.pop()[0])
+            
+        saldo = saldos.get(conta.codigo, [0.0] * len(VALORES))
+        no = {
+            'id': conta.id,
+            'codigo': conta.codigo,
+            'descricao': conta.descricao,
+            'nivel': conta.nivel,
+            'tipo': 'S' if not conta.permite_lancamento else 'A',
+            'contas_sinteticas': 0,
+            'contas_analiticas': 0,
+            **dict(zip(VALORES, saldo)),
+            'filhos': []
+        }
+        
+        (pilha[-1][0]['filhos'] if pilha else raizes).append(no)
+        pilha.append((no, conta.rgt))
+    
+    while pilha:
+        fechar(pilha.pop()[0])
+    
+    return raizes
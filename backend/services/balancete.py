@@ -0,0 +1,151 @@
+"""
+Publicação e leitura do balancete por competência.
+
+Cada importação grava uma versão nova dos itens da competência (área de
+staging invisível aos leitores) e, ao final, troca o ponteiro da versão
+publicada em uma única atualização. Os leitores filtram sempre pela versão
+publicada, então nunca veem a competência vazia ou carregada pela metade.
+"""
+from datetime import datetime
+from models.models import db
+from models.financeiro_models import BalanceteItem, BalanceteVersao, PeriodoContabil
+from services.upsert import upsert
+
+def reservar_versao(competencia):
+    """
+    Reserva o próximo número de versão da competência para uma importação.
+    """
+    upsert(
+        BalanceteVersao.__table__,
+        [{'competencia': competencia, 'versao_publicada': 0, 'ultima_versao': 1}],
+        chaves=('competencia',),
+        incrementar=('ultima_versao',)
+    )
+    # A linha continua bloqueada pelo upsert até o commit, então a leitura
+    # devolve a versão reservada por esta transação
+    versao = db.session.query(BalanceteVersao.ultima_versao)\
+        .filter_by(competencia=competencia).scalar()
+    db.session.commit()
+    return versao
+
+def publicar_versao(competencia, versao):
+    """
+    Troca o ponteiro para a versão importada e descarta as versões anteriores.
+    Uma importação mais antiga que termine depois não sobrescreve uma mais nova:
+    seus itens são descartados e a função retorna False.
+    """
+    publicada = db.session.query(BalanceteVersao).filter(
+        BalanceteVersao.competencia == competencia,
+        BalanceteVersao.versao_publicada < versao
+    ).update({'versao_publicada': versao, 'publicado_em': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    
+    if not publicada:
+        # Uma versão mais nova já foi publicada (e pode ter apagado parte
+        # destes itens no meio da carga): o restante ficaria órfão
+        descartar_versao(competencia, versao)
+        return False
+    
+    # Limpeza fora da transação de publicação: as versões antigas já não são lidas
+    db.session.query(BalanceteItem).filter(
+        BalanceteItem.competencia == competencia,
+        BalanceteItem.versao < versao
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return True
+
+def descartar_versao(competencia, versao):
+    """
+    Remove os itens de uma importação que falhou ou foi superada antes de ser publicada.
+    """
+    db.session.rollback()
+    db.session.query(BalanceteItem).filter_by(competencia=competencia, versao=versao)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+
+def itens_publicados(competencia=None):
+    """
+    Consulta dos itens da versão publicada (de uma competência ou de todas).
+    """
+    consulta = BalanceteItem.query.join(
+        BalanceteVersao, db.and_(
+            BalanceteVersao.competencia == BalanceteItem.competencia,
+            BalanceteVersao.versao_publicada == BalanceteItem.versao
+        )
+    )
+    
+    if competencia is not None:
+        consulta = consulta.filter(
+            BalanceteItem.competencia == competencia,
+            BalanceteVersao.competencia == competencia
+        )
+        
+    return consulta
+
+def colunas_itens():
+    """
+    Colunas dos itens para as listagens da API, com os valores nulos já como 0
+    (a serialização converte os DECIMAL direto, sem passar por objetos ORM).
+    """
+    return [
+        BalanceteItem.id,
+        BalanceteItem.conta,
+        BalanceteItem.reducao,
+        BalanceteItem.tipo,
+        BalanceteItem.descricao,
+        *[db.func.coalesce(getattr(BalanceteItem, coluna), 0).label(coluna) for coluna in (
+            'valor_anterior', 'valor_periodo_debito', 'valor_periodo_credito', 'valor_atual'
+        )],
+        BalanceteItem.competencia
+    ]
+
+def colunas_exportacao():
+    """
+    Títulos e colunas dos itens para exportação, no layout do CSV importado.
+    """
+    return [
+        ('Conta', BalanceteItem.conta),
+        ('Reduz', BalanceteItem.reducao),
+        ('Tp', BalanceteItem.tipo),
+        ('Descricao', BalanceteItem.descricao),
+        ('Saldo Anterior', BalanceteItem.valor_anterior),
+        ('Debito Periodo', BalanceteItem.valor_periodo_debito),
+        ('Credito Periodo', BalanceteItem.valor_periodo_credito),
+        ('Saldo Atual', BalanceteItem.valor_atual),
+    ]
+
+def competencias_publicadas():
+    """
+    Competências com balancete publicado, da mais recente para a mais antiga.
+    """
+    return [
+        competencia for (competencia,) in db.session.query(BalanceteVersao.competencia)
+        .filter(BalanceteVersao.versao_publicada > 0)
+        .order_by(BalanceteVersao.competencia.desc())
+    ]
+
+def ano_mes(competencia):
+    ano, mes = competencia.split('-')
+    return int(ano), int(mes)
+
+def periodos_contabeis(competencias, criar=False):
+    """
+    Ids dos períodos contábeis das competências. Com `criar`, cria os que
+    faltam e bloqueia as linhas até o commit: dois cálculos do mesmo período
+    não gravam ao mesmo tempo.
+    """
+    anos_meses = {ano_mes(competencia): competencia for competencia in competencias}
+    if criar:
+        upsert(
+            PeriodoContabil.__table__,
+            # Sempre na mesma ordem: dois cálculos com os mesmos períodos não se travam
+            [{'ano': ano, 'mes': mes, 'status': 'ABERTO'} for ano, mes in sorted(anos_meses)],
+            chaves=('ano', 'mes'),
+            atualizar=('ano',)
+        )
+    consulta = db.session.query(PeriodoContabil.id, PeriodoContabil.ano, PeriodoContabil.mes).filter(
+        db.tuple_(PeriodoContabil.ano, PeriodoContabil.mes).in_(list(anos_meses))
+    )
+    if criar:
+        consulta = consulta.with_for_update()
+    return {anos_meses[(ano, mes)]: id for id, ano, mes in consulta}
@@ -0,0 +1,179 @@
+"""
+Busca no plano de contas por código, código reduzido ou descrição.
+
+Cada worker mantém um índice em memória do plano: códigos e códigos reduzidos
+em listas ordenadas (prefixo = um intervalo achado por bisect) e as palavras
+das descrições, sem acento e em minúsculas, numa lista ordenada de termos com
+as contas de cada termo. O índice é montado na primeira busca depois de cada
+importação do plano: ele guarda a versão da tabela plano_contas no cache de
+respostas e é refeito quando ela muda (a importação roda em outro processo e
+cada worker tem a sua cópia).
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+from models.models import db
+from models.financeiro_models import PlanoContas
+from services import cache_respostas
+from services.arvore_plano import chave_codigo
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+_CODIGO = re.compile(r'^[\d.]+$')
+_PALAVRA = re.compile(r'[a-z0-9]+')
+
+def normalizar(texto):
+    """
+    Minúsculas e sem acentos ("Ação" -> "acao").
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+def palavras(texto):
+    return _PALAVRA.findall(normalizar(texto))
+
+def _intervalo(ordenados, prefixo):
+    """
+    Fatia de `ordenados` (lista ordenada de textos) que começa com `prefixo`.
+    """
+    inicio = bisect_left(ordenados, prefixo)
+    return slice(inicio, bisect_left(ordenados, prefixo + '\uffff', inicio))
+
+def _indexar(pares):
+    """
+    Listas paralelas (textos ordenados, conjunto de posições de cada texto).
+    """
+    posicoes = {}
+    for texto, posicao in pares:
+        posicoes.setdefault(texto, set()).add(posicao)
+    textos = sorted(posicoes)
+    return textos, [frozenset(posicoes[texto]) for texto in textos]
+
+def _unir(conjuntos):
+    return frozenset().union(*conjuntos)
+
+class IndiceContas:
+    def __init__(self, versao, contas):
+        self.versao = versao
+        self.contas = [{
+            'id': conta.id,
+            'codigo': conta.codigo,
+            'codigo_reduzido': conta.codigo_reduzido,
+            'descricao': conta.descricao,
+            'nivel': conta.nivel,
+            'tipo': 'A' if conta.permite_lancamento else 'S',
+            'referencia': conta.referencia
+        } for conta in sorted(contas, key=lambda conta: chave_codigo(conta.codigo))]
+        numeradas = list(enumerate(self.contas))
+
+        self.codigos, self.contas_codigo = _indexar((conta['codigo'], p) for p, conta in numeradas)
+        self.reduzidos, self.contas_reduzido = _indexar(
+            (conta['codigo_reduzido'], p) for p, conta in numeradas if conta['codigo_reduzido']
+        )
+        descricoes = [(p, palavras(conta['descricao'])) for p, conta in numeradas]
+        self.termos, self.contas_termo = _indexar((termo, p) for p, termos in descricoes for termo in termos)
+        self.iniciais, self.contas_inicial = _indexar((termos[0], p) for p, termos in descricoes if termos)
+
+        # Desempate dentro da mesma pontuação: contas mais altas na hierarquia, depois a ordem do código
+        self.por_ordem = sorted(range(len(self.contas)), key=lambda p: (self.contas[p]['nivel'] or 0, p))
+        self.ordem = [0] * len(self.contas)
+        for ordem, posicao in enumerate(self.por_ordem):
+            self.ordem[posicao] = ordem
+
+    def _por_prefixo(self, textos, conjuntos, prefixo):
+        return _unir(conjuntos[_intervalo(textos, prefixo)])
+
+    def _por_descricao(self, termos_busca):
+        """
+        Contas cuja descrição tem, para cada termo buscado, uma palavra que começa com ele.
+        """
+        encontradas = None
+        for termo in sorted(termos_busca, key=len, reverse=True):  # Termos longos filtram mais
+            posicoes = self._por_prefixo(self.termos, self.contas_termo, termo)
+            encontradas = posicoes if encontradas is None else encontradas & posicoes
+            if not encontradas:
+                break
+        return encontradas
+
+    def _primeiras(self, conjunto, quantidade):
+        """
+        As `quantidade` primeiras posições do conjunto na ordem de desempate.
+        """
+        if len(conjunto) <= quantidade * 8:
+            return sorted(conjunto, key=self.ordem.__getitem__)[:quantidade]
+        # Conjunto grande: percorre a ordem global até achar o suficiente
+        return list(islice((p for p in self.por_ordem if p in conjunto), quantidade))
+
+    def _exato(self, textos, conjuntos, texto):
+        indice = bisect_left(textos, texto)
+        if indice < len(textos) and textos[indice] == texto:
+            return conjuntos[indice]
+        return frozenset()
+
+    def _classes(self, texto):
+        """
+        Conjuntos de posições encontradas, da correspondência mais forte para a mais fraca.
+        """
+        partes = texto.split()
+        codigos = [parte for parte in partes if _CODIGO.match(parte)]
+        termos_busca = palavras(' '.join(parte for parte in partes if not _CODIGO.match(parte)))
+
+        if not termos_busca:
+            if len(codigos) != 1:
+                return []
+            codigo = codigos[0]
+            return [
+                self._exato(self.codigos, self.contas_codigo, codigo),
+                self._exato(self.reduzidos, self.contas_reduzido, codigo),
+                self._por_prefixo(self.codigos, self.contas_codigo, codigo),
+                self._por_prefixo(self.reduzidos, self.contas_reduzido, codigo),
+            ]
+
+        encontradas = self._por_descricao(termos_busca)
+        # "receita 3.1": palavras da descrição entre as contas do código 3.1
+        for codigo in codigos:
+            encontradas &= self._por_prefixo(self.codigos, self.contas_codigo, codigo)
+        # Descrições que começam com o primeiro termo vêm antes
+        inicio = encontradas & self._por_prefixo(self.iniciais, self.contas_inicial, termos_busca[0])
+        return [inicio, encontradas]
+
+    def buscar(self, texto, limite=LIMITE_PADRAO):
+        resultado = []
+        escolhidas = set()
+        for conjunto in self._classes((texto or '').strip()):
+            restantes = conjunto - escolhidas
+            if not restantes:
+                continue
+            melhores = self._primeiras(restantes, limite - len(resultado))
+            resultado.extend(melhores)
+            escolhidas.update(melhores)
+            if len(resultado) >= limite:
+                break
+        return [self.contas[posicao] for posicao in resultado]
+
+_indice = None
+_lock = threading.Lock()
+
+def indice_atual():
+    """
+    Índice da versão atual do plano, montado de novo se o plano mudou.
+    """
+    global _indice
+    versao = cache_respostas.versao('plano_contas')
+    indice = _indice
+    if indice is not None and indice.versao == versao:
+        return indice
+    with _lock:
+        if _indice is None or _indice.versao != versao:
+            contas = db.session.query(
+                PlanoContas.id, PlanoContas.codigo, PlanoContas.codigo_reduzido, PlanoContas.descricao,
+                PlanoContas.nivel, PlanoContas.permite_lancamento, PlanoContas.referencia
+            ).all()
+            _indice = IndiceContas(versao, contas)
+        return _indice
+
+def buscar(texto, limite=LIMITE_PADRAO):
+    return indice_atual().buscar(texto, min(limite, LIMITE_MAXIMO))
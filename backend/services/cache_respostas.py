@@ -0,0 +1,240 @@
+"""
+Cache de respostas versionado por tabela.
+
+Cada tabela tem um token de versão no cache, trocado por toda rota de escrita
+ou importação que altera a tabela. As respostas GET são guardadas já
+serializadas sob uma chave que inclui a URL e as versões das tabelas lidas;
+essa chave também é o ETag forte da resposta. Um cliente que envia
+If-None-Match com o ETag atual recebe 304 sem nenhuma consulta ao banco.
+
+As variantes comprimidas (gzip e brotli) também são guardadas, cada uma na
+própria chave, na primeira vez em que um cliente as pede para aquela versão
+dos dados; as leituras seguintes escolhem a variante pelo Accept-Encoding e
+não gastam CPU comprimindo. O Flask-Compress ignora respostas que já têm
+Content-Encoding, então segue valendo só para as rotas sem cache.
+
+As listagens completas escritas em fluxo (services/serializacao.py) saem com
+o mesmo ETag; o corpo é copiado enquanto é enviado e guardado ao fim do
+fluxo (junto com a saída gzip do fluxo, quando houver, como variante
+comprimida), e as requisições seguintes são atendidas do cache como as demais.
+
+O backend padrão é FileSystemCache, compartilhado entre os workers do
+Gunicorn na mesma máquina (CACHE_TYPE/CACHE_DIR permitem trocar).
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+from flask import Response, current_app, g, make_response, request # type: ignore
+from flask_caching import Cache # type: ignore
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+cache = Cache()
+
+# Tokens de versão expiram para limitar o tempo de uma resposta desatualizada
+# quando a tabela é alterada fora da API (ex.: direto no banco)
+VERSAO_TTL = int(os.getenv('CACHE_VERSAO_TTL', 3600))
+
+# Formato das entradas de resposta guardadas. Mudou o dicionário guardado?
+# Incrementar: o cache em disco sobrevive ao deploy e as chaves antigas
+# deixam de ser lidas (expiram pelo timeout padrão)
+FORMATO_RESPOSTA = 2
+
+# Cabeçalhos da resposta original que fazem parte do conteúdo (ex.: paginação)
+CABECALHOS_GUARDADOS = ('Link', 'X-Proximo-Cursor')
+
+# Comprimidas uma vez por versão dos dados: vale usar níveis altos
+NIVEL_GZIP = 9
+QUALIDADE_BROTLI = 9
+MIMETYPES_COMPRIMIVEIS = ('application/json', 'text/csv', 'text/plain')
+TAMANHO_MINIMO_COMPRESSAO = 500
+
+# Listagens escritas em fluxo (services/serializacao.py) maiores que isso não
+# são guardadas: o cache manteria em memória o corpo que o fluxo evita montar
+TAMANHO_MAXIMO_FLUXO = int(os.getenv('CACHE_TAMANHO_MAXIMO_FLUXO', 32 * 1024 * 1024))
+
+_estatisticas = Counter()
+_estatisticas_lock = threading.Lock()
+
+def configurar_cache(app):
+    cache.init_app(app, config={
+        'CACHE_TYPE': os.getenv('CACHE_TYPE', 'FileSystemCache'),
+        'CACHE_DIR': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'valex-cache')),
+        'CACHE_DEFAULT_TIMEOUT': int(os.getenv('CACHE_DEFAULT_TIMEOUT', 3600)),
+        'CACHE_THRESHOLD': int(os.getenv('CACHE_THRESHOLD', 2000)),
+    })
+
+def _contar(evento):
+    with _estatisticas_lock:
+        _estatisticas[evento] += 1
+
+def estatisticas():
+    """
+    Contadores deste processo (cada worker tem os seus).
+    """
+    with _estatisticas_lock:
+        return {
+            'pid': os.getpid(),
+            'hits': _estatisticas['hits'],
+            'misses': _estatisticas['misses'],
+            'nao_modificado': _estatisticas['nao_modificado'],
+            'invalidacoes': _estatisticas['invalidacoes'],
+            'compressoes': _estatisticas['compressoes'],
+        }
+
+def versao(tabela):
+    chave = f'versao:{tabela}'
+    token = cache.get(chave)
+    if token is None:
+        # add() não sobrescreve o token criado por outro worker ao mesmo tempo
+        cache.add(chave, uuid.uuid4().hex, timeout=VERSAO_TTL)
+        token = cache.get(chave)
+    return token
+
+def invalidar(*tabelas):
+    """
+    Troca a versão das tabelas. Chamar depois do commit da escrita.
+    """
+    cache.set_many({f'versao:{tabela}': uuid.uuid4().hex for tabela in tabelas}, timeout=VERSAO_TTL)
+    _contar('invalidacoes')
+
+def dados_cacheados(nome, tabelas, funcao):
+    """
+    Resultado de `funcao()` (dados Python, não uma resposta) guardado sob a
+    versão atual das tabelas. Serve para montar respostas compostas, como o
+    bootstrap da tela do cooperado, com partes de referência em cache.
+    """
+    versoes = [versao(tabela) for tabela in tabelas]
+    chave = 'dados:' + hashlib.sha1('|'.join([nome, *versoes]).encode()).hexdigest()
+    dados = cache.get(chave)
+    if dados is None:
+        _contar('misses')
+        dados = funcao()
+        cache.set(chave, dados)
+    else:
+        _contar('hits')
+    return dados
+
+def _etag_confere(etag):
+    # O Flask-Compress acrescenta o algoritmo ao ETag ("abc:gzip")
+    for candidato in (etag, f'{etag}:gzip', f'{etag}:br', f'{etag}:deflate'):
+        if request.if_none_match.contains(candidato):
+            return candidato
+    return None
+
+def _codificacoes():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def _comprimir(dados, codificacao):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=QUALIDADE_BROTLI)
+    return gzip.compress(dados, NIVEL_GZIP)
+
+def _codificacao_aceita():
+    # Em empate de qualidade vale a ordem do servidor (brotli antes de gzip)
+    escolhida = request.accept_encodings.best_match([*_codificacoes(), 'identity'])
+    return escolhida if escolhida in _codificacoes() else None
+
+def _comprimivel(corpo):
+    return (
+        corpo['mimetype'] in current_app.config.get('COMPRESS_MIMETYPES', MIMETYPES_COMPRIMIVEIS)
+        and len(corpo['dados']) >= current_app.config.get('COMPRESS_MIN_SIZE', TAMANHO_MINIMO_COMPRESSAO)
+    )
+
+def _variante(chave, corpo, codificacao):
+    """
+    Corpo comprimido com `codificacao`, guardado em `chave`. Corpos pequenos
+    ou não comprimíveis são guardados como estão, para que a próxima leitura
+    também seja uma só.
+    """
+    variante = corpo
+    if _comprimivel(corpo):
+        _contar('compressoes')
+        variante = dict(corpo, dados=_comprimir(corpo['dados'], codificacao), codificacao=codificacao)
+    cache.set(chave, variante)
+    return variante
+
+def _validacao(resposta, etag, codificacao):
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    # Mesmo formato de ETag do Flask-Compress para a variante comprimida
+    resposta.set_etag(f"{etag}:{codificacao}" if codificacao else etag)
+    resposta.headers['Cache-Control'] = 'no-cache'  # Sempre revalidar com If-None-Match
+    return resposta
+
+def resposta_cacheada(*tabelas):
+    """
+    Decorador para rotas GET cujo resultado depende apenas da URL e das tabelas informadas.
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # As versões são lidas antes dos dados: na pior das hipóteses o
+            # conteúdo guardado é mais novo que a versão, nunca mais velho
+            versoes = [versao(tabela) for tabela in tabelas]
+            etag = hashlib.sha1('|'.join([request.full_path, *versoes]).encode()).hexdigest()
+            
+            etag_cliente = _etag_confere(etag)
+            if etag_cliente:
+                _contar('nao_modificado')
+                resposta = Response(status=304)
+                resposta.set_etag(etag_cliente)
+                return resposta
+            
+            chave = f'resposta:v{FORMATO_RESPOSTA}:{etag}'
+            codificacao = _codificacao_aceita()
+            
+            # Caminho comum: a variante comprimida já existe, uma única leitura do cache
+            corpo = cache.get(f'{chave}:{codificacao}') if codificacao else None
+            if corpo is not None:
+                _contar('hits')
+            else:
+                corpo = cache.get(chave)
+                if corpo is None:
+                    _contar('misses')
+                    fluxo = {}
+                    
+                    def guardar_fluxo(dados, codificacao):
+                        if not fluxo:  # Preenchido abaixo só para respostas 200
+                            return
+                        if codificacao:
+                            # O fluxo já pagou a compressão: vira a variante pré-comprimida
+                            cache.set(f'{chave}:{codificacao}', dict(fluxo, dados=dados, codificacao=codificacao))
+                        else:
+                            cache.set(chave, dict(fluxo, dados=dados))
+                            
+                    # Listagem em fluxo: o corpo é guardado quando o fluxo termina
+                    g.copia_fluxo = (guardar_fluxo, TAMANHO_MAXIMO_FLUXO)
+                    try:
+                        resposta = make_response(view(*args, **kwargs))
+                    finally:
+                        g.pop('copia_fluxo', None)
+                    if resposta.status_code != 200:
+                        return resposta
+                    fluxo.update(
+                        mimetype=resposta.mimetype,
+                        cabecalhos={k: resposta.headers[k] for k in CABECALHOS_GUARDADOS if k in resposta.headers}
+                    )
+                    if resposta.is_streamed:
+                        return _validacao(resposta, etag, resposta.headers.get('Content-Encoding'))
+                    corpo = dict(fluxo, dados=resposta.get_data())
+                    cache.set(chave, corpo)
+                else:
+                    _contar('hits')
+                    
+                if codificacao:
+                    corpo = _variante(f'{chave}:{codificacao}', corpo, codificacao)
+                    
+            resposta = Response(corpo['dados'], mimetype=corpo['mimetype'], headers=corpo.get('cabecalhos', {}))
+            if corpo.get('codificacao'):
+                resposta.headers['Content-Encoding'] = corpo['codificacao']
+            return _validacao(resposta, etag, corpo.get('codificacao'))
+        return wrapper
+    return decorador
@@ -0,0 +1,144 @@
+"""
+Dados da tela do cooperado (CooperadoRegistro).
+
+As mesmas funções atendem as rotas individuais e o bootstrap da tela, que
+devolve tudo numa requisição só: os dados de referência (produtor, fazendas,
+classificações) vêm do cache versionado por tabela e só o histórico e o
+resumo da semana consultam o banco, na mesma conexão.
+"""
+from datetime import timedelta
+from models.models import db, Atividade, ClassificacaoUva, Fazenda, Variedade
+from services.datas import data_local, hoje_local, intervalo_utc, momento_local
+
+def dados_produtor(produtor):
+    return {
+        'id': produtor.id,
+        'nome': produtor.nome,
+        'ggn': produtor.ggn,
+        'sigla': produtor.sigla
+    }
+
+def fazendas_do_produtor(produtor_id):
+    fazendas = db.session.query(Fazenda, Variedade.nome)\
+        .join(Variedade, Fazenda.variedade_id == Variedade.id)\
+        .filter(Fazenda.produtor_id == produtor_id)\
+        .order_by(Fazenda.id)
+    return [{
+        'id': f.id,
+        'nome': f.nome,
+        'area_parcela': f.area_parcela,
+        'variedade_id': f.variedade_id,
+        'variedade_nome': variedade_nome
+    } for f, variedade_nome in fazendas]
+
+def classificacoes():
+    return [{
+        'id': c.id,
+        'classificacao': c.classificacao,
+        'caixa': c.caixa,
+        'cinta': c.cinta,
+        'peso': c.peso,
+        'cumbuca': c.cumbuca
+    } for c in db.session.query(ClassificacaoUva).all()]
+
+def consulta_historico(produtor_id):
+    """
+    Atividades do produtor com fazenda, variedade e classificação, para paginar
+    por (created_at, id) e formatar com `itens_historico`.
+    """
+    return db.session.query(
+        Atividade,
+        Fazenda.nome.label('fazenda_nome'),
+        Variedade.nome.label('variedade_nome'),
+        ClassificacaoUva.classificacao.label('classificacao_nome'),
+        ClassificacaoUva.caixa.label('classificacao_caixa')
+    ).join(
+        Fazenda, Atividade.fazenda_id == Fazenda.id
+    ).join(
+        Variedade, Atividade.variedade_id == Variedade.id
+    ).outerjoin(
+        ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
+    ).filter(
+        Atividade.produtor_id == produtor_id
+    )
+
+def itens_historico(linhas):
+    return [{
+        'id': a.id,
+        'tipo_atividade': a.tipo_atividade,
+        'quantidade_pallets': a.quantidade_pallets,
+        'caixas': a.caixas,
+        'created_at': momento_local(a.created_at).strftime('%d/%m/%Y %H:%M'),
+        'fazenda': fazenda_nome,
+        'variedade': variedade_nome,
+        'classificacao': f"{classificacao_nome} - {classificacao_caixa}" if classificacao_nome else None
+    } for a, fazenda_nome, variedade_nome, classificacao_nome, classificacao_caixa in linhas]
+
+def resumo_semana(produtor_id):
+    """
+    Pallets do produtor nos últimos 7 dias (no fuso da cooperativa), por
+    variedade e classificação e por dia.
+    """
+    hoje = hoje_local()
+    inicio, fim = intervalo_utc(hoje - timedelta(days=7), hoje)
+
+    # Buscar atividades da semana com informações relacionadas
+    atividades = db.session.query(
+        Atividade,
+        Variedade.nome.label('variedade_nome'),
+        ClassificacaoUva.classificacao.label('classificacao_nome')
+    ).join(
+        Variedade, Atividade.variedade_id == Variedade.id
+    ).outerjoin(
+        ClassificacaoUva, Atividade.classificacao_id == ClassificacaoUva.id
+    ).filter(
+        Atividade.produtor_id == produtor_id,
+        Atividade.created_at >= inicio,
+        Atividade.created_at < fim
+    ).all()
+
+    # Agrupar por variedade e classificação
+    resumo_detalhado = {}
+    resumo_diario = {}
+    total_pallets = 0
+
+    for atividade, var_nome, class_nome in atividades:
+        data = data_local(atividade.created_at)
+        total_pallets += atividade.quantidade_pallets
+
+        # Inicializar estrutura para o dia se não existir
+        if data not in resumo_diario:
+            resumo_diario[data] = {
+                'total_pallets': 0,
+                'detalhamento': {}
+            }
+
+        # Atualizar totais diários
+        resumo_diario[data]['total_pallets'] += atividade.quantidade_pallets
+
+        # Agrupar por variedade no resumo geral
+        if var_nome not in resumo_detalhado:
+            resumo_detalhado[var_nome] = {
+                'total_pallets': 0,
+                'classificacoes': {}
+            }
+
+        resumo_detalhado[var_nome]['total_pallets'] += atividade.quantidade_pallets
+
+        # Agrupar por classificação dentro da variedade
+        if class_nome:
+            if class_nome not in resumo_detalhado[var_nome]['classificacoes']:
+                resumo_detalhado[var_nome]['classificacoes'][class_nome] = 0
+            resumo_detalhado[var_nome]['classificacoes'][class_nome] += atividade.quantidade_pallets
+
+    # Converter datas para string no formato brasileiro
+    resumo_diario_formatado = {
+        data.strftime('%d/%m/%Y'): dados
+        for data, dados in resumo_diario.items()
+    }
+
+    return {
+        'total_pallets': total_pallets,
+        'detalhamento': resumo_detalhado,
+        'resumo_diario': resumo_diario_formatado
+    }
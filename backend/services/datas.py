@@ -0,0 +1,50 @@
+from datetime import datetime, time, timedelta
+from pytz import timezone, utc # type: ignore
+
+# Fuso horário da cooperativa (os created_at são gravados em UTC sem tzinfo)
+TIMEZONE_COOPERATIVA = timezone('America/Sao_Paulo')
+
+def momento_local(momento):
+    """
+    Converte um created_at gravado em UTC para data e hora no fuso da cooperativa.
+    """
+    if momento.tzinfo is None:
+        momento = utc.localize(momento)
+    return momento.astimezone(TIMEZONE_COOPERATIVA)
+
+def data_local(momento):
+    """
+    Converte um created_at gravado em UTC para a data no fuso da cooperativa.
+    """
+    return momento_local(momento).date()
+
+def converter_data(texto):
+    """
+    Converte uma data no formato AAAA-MM-DD vinda da requisição.
+    """
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Data inválida: {texto}. Use AAAA-MM-DD")
+
+def hoje_local():
+    """
+    Retorna a data de hoje no fuso da cooperativa.
+    """
+    return datetime.now(TIMEZONE_COOPERATIVA).date()
+
+def intervalo_utc(data_inicio, data_fim=None):
+    """
+    Converte os dias locais [data_inicio, data_fim] para o intervalo semiaberto
+    [inicio, fim) em UTC sem tzinfo, no mesmo formato gravado em created_at.
+    
+    Permite filtrar com `created_at >= inicio AND created_at < fim`, que usa os
+    índices de atividade, em vez de `DATE(created_at)`, que obriga a varrer a tabela.
+    """
+    data_fim = data_fim or data_inicio
+    inicio = TIMEZONE_COOPERATIVA.localize(datetime.combine(data_inicio, time.min))
+    fim = TIMEZONE_COOPERATIVA.localize(datetime.combine(data_fim + timedelta(days=1), time.min))
+    return (
+        inicio.astimezone(utc).replace(tzinfo=None),
+        fim.astimezone(utc).replace(tzinfo=None)
+    )
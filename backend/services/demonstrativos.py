@@ -0,0 +1,195 @@
+"""
+Demonstrativos financeiros (BP, DRE/sobras e perdas, DFC e DMPL) calculados
+no servidor a partir do balancete publicado de uma competência.
+
+Os cálculos seguem as mesmas regras de prefixo de conta do relatório
+financeiro do frontend, mas com operações vetorizadas sobre o balancete.
+O resultado fica em cache por (competência, versão publicada), portanto
+vale até a próxima importação daquela competência.
+"""
+import threading
+import pandas as pd # type: ignore
+from models.models import db
+from models.financeiro_models import BalanceteItem, BalanceteVersao
+from services import balancete
+
+COLUNAS = ['conta', 'tipo', 'descricao', 'valor_periodo_debito', 'valor_periodo_credito', 'valor_atual']
+VALORES = ['valor_periodo_debito', 'valor_periodo_credito', 'valor_atual']
+
+# Nível máximo das contas listadas no balanço patrimonial (o relatório exibe até o nível 2)
+NIVEL_MAXIMO_BALANCO = 2
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def carregar(competencia):
+    """
+    DataFrame do balancete publicado da competência, ordenado pela conta.
+    """
+    linhas = balancete.itens_publicados(competencia).with_entities(
+        *[getattr(BalanceteItem, coluna) for coluna in COLUNAS]
+    ).all()
+    
+    df = pd.DataFrame(linhas, columns=COLUNAS)
+    df = df[df['conta'].notna() & (df['conta'] != '')]
+    df[VALORES] = df[VALORES].astype(float).fillna(0.0)
+    
+    return df.assign(
+        tipo=df['tipo'].fillna(''),
+        descricao=df['descricao'].fillna(''),
+        nivel=df['conta'].str.count(r'\.') + 1
+    ).sort_values('conta', kind='stable')
+
+def _prefixo(df, *prefixos):
+    return df['conta'].str.startswith(prefixos)
+
+def _listar(df, mascara, valor, total=None):
+    """
+    Lista de contas no formato do relatório (codigo, descricao, valor,
+    percentual, nivel, tipo), com o percentual sobre o total da seção.
+    """
+    selecionadas = df[mascara]
+    valores = valor[mascara]
+    total = float(valores.sum()) if total is None else total
+    percentuais = (valores / total * 100) if total else pd.Series(0.0, index=valores.index)
+    
+    return [
+        {
+            'codigo': codigo,
+            'descricao': descricao,
+            'valor': round(v, 2),
+            'percentual': round(p, 4),
+            'nivel': int(nivel),
+            'tipo': tipo
+        }
+        for codigo, descricao, v, p, nivel, tipo in zip(
+            selecionadas['conta'], selecionadas['descricao'], valores.tolist(),
+            percentuais.tolist(), selecionadas['nivel'], selecionadas['tipo']
+        )
+    ]
+
+def secoes(df):
+    """
+    Máscaras das seções do balanço e das sobras e perdas, pelo prefixo da conta.
+    """
+    pl = _prefixo(df, '2.4')
+    return {
+        'ativo': _prefixo(df, '1'),
+        'passivo': _prefixo(df, '2') & ~pl,
+        'patrimonio': pl,
+        'receitas': _prefixo(df, '4'),
+        'custos': _prefixo(df, '5'),
+        'despesas': _prefixo(df, '3'),
+    }
+
+def totais(df, mascaras=None):
+    """
+    Totais das seções (base dos percentuais dos relatórios).
+    """
+    mascaras = mascaras or secoes(df)
+    atual = df['valor_atual']
+    absoluto = atual.abs()
+    analitica = df['tipo'] == 'A'
+    nivel = df['nivel']
+    
+    # Totais do balanço pelas contas sintéticas de primeiro nível
+    sintetica_raiz = (nivel == 1) & (df['tipo'] == 'S')
+    
+    # Sobras e perdas: receitas como positivas, custos e despesas como estão
+    return {
+        'total_ativo': float(atual[(df['conta'] == '1') | (mascaras['ativo'] & sintetica_raiz)].sum()),
+        'total_passivo': float(absoluto[(df['conta'] == '2') | (mascaras['passivo'] & sintetica_raiz)].sum()),
+        'total_patrimonio': float(absoluto[
+            (df['conta'] == '2.4') | (_prefixo(df, '2.4.') & (nivel == 2) & (df['tipo'] == 'S'))
+        ].sum()),
+        'total_receitas': float(absoluto[mascaras['receitas'] & analitica].sum()),
+        'total_custos': float(atual[mascaras['custos'] & analitica].sum()),
+        'total_despesas': float(atual[mascaras['despesas'] & analitica].sum()),
+    }
+
+def calcular(df):
+    """
+    Calcula todos os demonstrativos a partir do DataFrame do balancete.
+    """
+    atual = df['valor_atual']
+    absoluto = atual.abs()
+    debito = df['valor_periodo_debito']
+    credito = df['valor_periodo_credito']
+    analitica = df['tipo'] == 'A'
+    nivel = df['nivel']
+    
+    mascaras = secoes(df)
+    ativo, passivo, pl = mascaras['ativo'], mascaras['passivo'], mascaras['patrimonio']
+    receitas, custos, despesas = mascaras['receitas'], mascaras['custos'], mascaras['despesas']
+    
+    t = totais(df, mascaras)
+    total_ativo, total_passivo, total_patrimonio = t['total_ativo'], t['total_passivo'], t['total_patrimonio']
+    total_receitas, total_custos, total_despesas = t['total_receitas'], t['total_custos'], t['total_despesas']
+    
+    # Fluxo de caixa: movimentação do período por natureza da conta
+    movimento_devedor = debito - credito
+    movimento_credor = credito - debito
+    operacional = float(
+        movimento_credor[receitas].sum() +
+        movimento_devedor[_prefixo(df, '1.1.1', '3')].sum()
+    )
+    investimento = float(-movimento_devedor[_prefixo(df, '1.2.2', '1.2.3')].sum())
+    financiamento = float(movimento_credor[_prefixo(df, '2.2.1', '2.4.1')].sum())
+    
+    no_balanco = nivel <= NIVEL_MAXIMO_BALANCO
+    
+    return {
+        'balanco': {
+            'ativo': _listar(df, ativo & no_balanco, atual, total_ativo),
+            'passivo': _listar(df, passivo & no_balanco, absoluto, total_passivo),
+            'patrimonio': _listar(df, pl & no_balanco, absoluto, total_patrimonio),
+            'total_ativo': round(total_ativo, 2),
+            'total_passivo': round(total_passivo, 2),
+            'total_patrimonio': round(total_patrimonio, 2)
+        },
+        'sobras_perdas': {
+            'receitas': _listar(df, receitas & analitica, absoluto, total_receitas),
+            'custos': _listar(df, custos & analitica, atual, total_custos),
+            'despesas': _listar(df, despesas & analitica, atual, total_despesas),
+            'total_receitas': round(total_receitas, 2),
+            'total_custos': round(total_custos, 2),
+            'total_despesas': round(total_despesas, 2),
+            'resultado': round(total_receitas - total_custos - total_despesas, 2)
+        },
+        'fluxo_caixa': {
+            'operacional': round(operacional, 2),
+            'investimento': round(investimento, 2),
+            'financiamento': round(financiamento, 2)
+        },
+        'patrimonio_liquido': _listar(df, pl & (atual != 0), absoluto),
+        'contas_pagar': _listar(df, _prefixo(df, '2.1') & analitica & (atual > 0), atual),
+        'contas_receber': _listar(df, _prefixo(df, '1.1.2') & analitica & (atual > 0), atual),
+    }
+
+def obter(competencia):
+    """
+    Demonstrativos da versão publicada da competência, usando o cache
+    enquanto a versão não mudar. Retorna None se não houver balancete publicado.
+    """
+    versao = db.session.query(BalanceteVersao.versao_publicada)\
+        .filter_by(competencia=competencia).scalar()
+    if not versao:
+        return None
+        
+    with _cache_lock:
+        em_cache = _cache.get(competencia)
+    if em_cache and em_cache['versao'] == versao:
+        return em_cache
+        
+    resultado = {
+        'competencia': competencia,
+        'versao': versao,
+        **calcular(carregar(competencia))
+    }
+    
+    with _cache_lock:
+        atual = _cache.get(competencia)
+        if not atual or atual['versao'] <= versao:
+            _cache[competencia] = resultado
+            
+    return resultado
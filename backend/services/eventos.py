@@ -0,0 +1,169 @@
+"""
+Canal de eventos (Server-Sent Events) para os painéis.
+
+Quando uma atividade é criada ou removida, um evento pequeno é publicado no
+canal do produtor e no canal do gestor; os painéis conectados recebem o
+evento e só então buscam os dados de novo, no lugar do polling periódico.
+
+O broker é local ao processo: todos os clientes precisam estar no mesmo
+processo que recebe as escritas (um worker Gunicorn com várias threads, ver
+gunicorn.conf.py). Os eventos recentes ficam num buffer para que um cliente
+que reconecte com Last-Event-ID receba o que perdeu.
+
+Cada conexão aberta ocupa uma thread do worker (no perfil gthread), então o
+número de fluxos simultâneos é limitado (config_servidor.limite_conexoes_sse);
+além dele a rota responde 503 e o painel tenta de novo depois.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from config_servidor import limite_conexoes_sse
+
+# Intervalo do comentário de keep-alive; também é quanto demora para uma
+# conexão fechada pelo cliente liberar a thread
+INTERVALO_PING = 15
+TAMANHO_FILA = 100
+TAMANHO_HISTORICO = 500
+
+# Sugestão de espera (Retry-After) para o painel recusado pelo limite
+ESPERA_LIMITE = 30
+
+def canal_produtor(produtor_id):
+    return f'produtor:{produtor_id}'
+
+CANAL_GESTOR = 'gestor'
+
+class BrokerLocal:
+    def __init__(self, limite_conexoes):
+        self._lock = threading.Lock()
+        self._limite_conexoes = limite_conexoes
+        self._conexoes = 0
+        self._assinantes = {}
+        self._historico = deque(maxlen=TAMANHO_HISTORICO)
+        # Ids crescentes mesmo depois de reiniciar o processo, para o Last-Event-ID
+        self._sequencia = itertools.count(int(time.time() * 1000))
+
+    def reservar(self):
+        """
+        Ocupa uma vaga de conexão. False se o limite já foi atingido.
+        """
+        with self._lock:
+            if self._conexoes >= self._limite_conexoes:
+                return False
+            self._conexoes += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self._conexoes -= 1
+
+    def assinar(self, canais, ultimo_id=None):
+        """
+        Registra uma fila para os canais. Com `ultimo_id`, a fila já começa com
+        os eventos do histórico publicados depois dele.
+        """
+        fila = queue.Queue(maxsize=TAMANHO_FILA)
+        with self._lock:
+            if ultimo_id is not None:
+                for evento in self._historico:
+                    if evento[0] > ultimo_id and evento[1] in canais and not fila.full():
+                        fila.put_nowait(evento)
+            for canal in canais:
+                self._assinantes.setdefault(canal, set()).add(fila)
+        return fila
+
+    def cancelar(self, canais, fila):
+        with self._lock:
+            for canal in canais:
+                assinantes = self._assinantes.get(canal)
+                if assinantes is not None:
+                    assinantes.discard(fila)
+                    if not assinantes:
+                        del self._assinantes[canal]
+
+    def publicar(self, canal, tipo, dados):
+        with self._lock:
+            evento = (next(self._sequencia), canal, tipo, json.dumps(dados))
+            self._historico.append(evento)
+            assinantes = list(self._assinantes.get(canal, ()))
+            
+        for fila in assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                # Cliente lento: deixa de receber e reconecta pelo Last-Event-ID
+                self.cancelar([canal], fila)
+
+    def conexoes(self):
+        with self._lock:
+            return {canal: len(assinantes) for canal, assinantes in self._assinantes.items()}
+
+broker = BrokerLocal(limite_conexoes_sse())
+
+def dados_atividade(atividade):
+    """
+    Conteúdo do evento de uma atividade. Montar antes do commit: depois dele
+    uma atividade removida não pode mais ser lida.
+    """
+    return {
+        'id': atividade.id,
+        'produtor_id': atividade.produtor_id,
+        'tipo_atividade': atividade.tipo_atividade,
+        'quantidade_pallets': atividade.quantidade_pallets,
+        'caixas': atividade.caixas
+    }
+
+def publicar_atividade(tipo, dados):
+    """
+    Publica a criação/remoção de uma atividade. Chamar depois do commit.
+    """
+    broker.publicar(canal_produtor(dados['produtor_id']), tipo, dados)
+    broker.publicar(CANAL_GESTOR, tipo, dados)
+
+def _eventos(canais, ultimo_id):
+    fila = broker.assinar(canais, ultimo_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                id_evento, _, tipo, dados = fila.get(timeout=INTERVALO_PING)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield f'id: {id_evento}\nevent: {tipo}\ndata: {dados}\n\n'
+    finally:
+        broker.cancelar(canais, fila)
+
+class _Fluxo:
+    """
+    Corpo de uma conexão. O servidor chama close() ao fim da resposta, mesmo
+    que o corpo nem tenha começado a ser enviado: é aí que a vaga é liberada.
+    """
+    def __init__(self, canais, ultimo_id):
+        self._gerador = _eventos(canais, ultimo_id)
+        self._aberto = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._gerador)
+
+    def close(self):
+        if self._aberto:
+            self._aberto = False
+            self._gerador.close()
+            broker.liberar()
+
+def fluxo(canais, ultimo_id=None):
+    """
+    Corpo text/event-stream, ou None se o limite de conexões foi atingido.
+    Não usa o banco nem o contexto da aplicação, então não prende conexão do
+    pool enquanto o cliente está ocioso.
+    """
+    if not broker.reservar():
+        return None
+    return _Fluxo(canais, ultimo_id)
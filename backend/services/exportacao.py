@@ -0,0 +1,95 @@
+"""
+Exportação de listagens em CSV e XLSX direto do cursor do banco.
+
+O CSV é escrito em blocos enquanto a consulta (com yield_per) é percorrida:
+o download começa no primeiro lote e a memória não cresce com o tamanho da
+exportação. O XLSX usa o modo write-only do openpyxl, que despeja as linhas
+num arquivo temporário; como o ZIP só pode ser fechado depois da última
+linha, o arquivo é enviado em pedaços ao final, também sem ficar em memória.
+"""
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, request # type: ignore
+from services.serializacao import TAMANHO_LOTE, resposta_em_fluxo
+
+FORMATOS = ('csv', 'xlsx')
+TAMANHO_PEDACO = 64 * 1024
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def ler_formato():
+    """
+    Lê o parâmetro 'formato' da requisição (csv por padrão).
+    """
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}. Use {' ou '.join(FORMATOS)}")
+    return formato
+
+def _valor_csv(valor):
+    # Mesmo formato dos CSVs importados (separador ',' e vírgula decimal, entre aspas)
+    if isinstance(valor, (Decimal, float)):
+        return f'{valor:.2f}'.replace('.', ',')
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    return valor
+
+def _blocos_csv(linhas, cabecalho, tamanho_lote):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM para o Excel abrir o arquivo como UTF-8
+    buffer.write('\ufeff')
+    escritor.writerow(cabecalho)
+    for numero, linha in enumerate(linhas, 1):
+        escritor.writerow([_valor_csv(valor) for valor in linha])
+        if numero % tamanho_lote == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def _pedacos(arquivo):
+    with arquivo:
+        while True:
+            pedaco = arquivo.read(TAMANHO_PEDACO)
+            if not pedaco:
+                break
+            yield pedaco
+
+def _arquivo_xlsx(linhas, cabecalho, titulo):
+    from openpyxl import Workbook # type: ignore
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(titulo)
+    aba.append(cabecalho)
+    for linha in linhas:
+        aba.append(tuple(linha))
+
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+def resposta_exportacao(linhas, cabecalho, nome_arquivo, formato, titulo='Dados', tamanho_lote=TAMANHO_LOTE):
+    """
+    Resposta de download com `linhas` (tuplas na ordem de `cabecalho`) no
+    formato pedido. `linhas` deve ser um iterador sobre o cursor do banco,
+    ex.: query.yield_per(TAMANHO_LOTE), para a memória ficar constante.
+    """
+    cabecalhos = {'Content-Disposition': f'attachment; filename="{nome_arquivo}.{formato}"'}
+
+    if formato == 'xlsx':
+        # O arquivo já é um ZIP: não passa pela compressão das respostas
+        arquivo = _arquivo_xlsx(linhas, cabecalho, titulo)
+        return Response(_pedacos(arquivo), mimetype=MIMETYPES['xlsx'], headers=cabecalhos)
+
+    # O Werkzeug acrescenta "; charset=utf-8" aos mimetypes text/*
+    return resposta_em_fluxo(_blocos_csv(linhas, cabecalho, tamanho_lote), MIMETYPES['csv'], cabecalhos)
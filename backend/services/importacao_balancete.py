@@ -0,0 +1,193 @@
+"""
+Importação do balancete em blocos.
+
+O CSV é lido com `pd.read_csv(chunksize=...)`; cada bloco é validado e limpo
+com operações de coluna e gravado com um único INSERT em lote, de modo que a
+memória usada não depende do tamanho do arquivo. Os blocos formam uma versão
+nova da competência, publicada só no final (ver services/balancete.py).
+"""
+import os
+import time
+from datetime import datetime
+import pandas as pd # type: ignore
+from flask import current_app # type: ignore
+from models.models import db
+from models.financeiro_models import BalanceteItem
+from services import analise_financeira, balancete, indicadores
+
+TAMANHO_BLOCO_PADRAO = 5000
+
+TIPOS_COLUNAS = {
+    'Conta': str,
+    'Reduz': 'Int64',  # Permite valores nulos
+    'Tp': str,
+    'Descricao': str,
+    'Saldo Anterior': float,
+    'Debito Periodo': float,
+    'Credito Periodo': float,
+    'Saldo Atual': float
+}
+
+COLUNAS_VALORES = {
+    'Saldo Anterior': 'valor_anterior',
+    'Debito Periodo': 'valor_periodo_debito',
+    'Credito Periodo': 'valor_periodo_credito',
+    'Saldo Atual': 'valor_atual',
+}
+
+def preparar_bloco(bloco, competencia, versao, data_importacao):
+    """
+    Converte um bloco do CSV nas linhas de balancete_items.
+    Retorna (registros, registros_ignorados).
+    """
+    conta = bloco['Conta'].astype('string').str.strip()
+    
+    # Conta válida precisa conter ao menos um dígito
+    validas = conta.str.contains(r'\d', regex=True).fillna(False).astype(bool)
+    bloco = bloco[validas]
+    
+    tipo = bloco['Tp'].astype('string').str.strip().str[0]
+    reducao = bloco['Reduz'].astype('Int64')
+    
+    itens = pd.DataFrame({
+        'conta': conta[validas],
+        'reducao': reducao.where(reducao != 0),
+        'tipo': tipo.where(tipo != ''),
+        'descricao': bloco['Descricao'].astype('string').str.strip(),
+        **{
+            destino: pd.to_numeric(bloco[origem], errors='coerce').fillna(0.0)
+            for origem, destino in COLUNAS_VALORES.items()
+        }
+    }).astype(object)
+    itens = itens.where(itens.notna(), None)
+    
+    # Montagem direta das linhas a partir das colunas (mais rápido que to_dict)
+    colunas = list(itens.columns)
+    registros = [
+        dict(zip(colunas, valores), competencia=competencia, versao=versao, data_importacao=data_importacao)
+        for valores in zip(*(itens[coluna].tolist() for coluna in colunas))
+    ]
+    
+    return registros, int((~validas).sum())
+
+def memoria_residente():
+    """
+    Memória residente atual do processo em bytes (None fora do Linux).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class PicoMemoria:
+    """
+    Pico de memória residente de uma importação, acima do que o processo já
+    usava no início. O processo do pool é reaproveitado entre jobs, então o
+    pico de toda a vida dele (ru_maxrss) misturaria o create_app e as
+    importações anteriores. Amostrado a cada bloco: mais barato que
+    tracemalloc, que multiplica o tempo da importação.
+    """
+    def __init__(self):
+        self.inicial = memoria_residente()
+        self.pico = self.inicial
+
+    def amostrar(self):
+        atual = memoria_residente()
+        if atual is not None and self.pico is not None:
+            self.pico = max(self.pico, atual)
+
+    def mb(self):
+        if self.inicial is None:
+            return None
+        return round((self.pico - self.inicial) / (1024 * 1024), 2)
+
+def importar_balancete(arquivo, competencia, tamanho_bloco=TAMANHO_BLOCO_PADRAO, ao_progredir=None):
+    """
+    Importa o CSV como nova versão da competência e a publica ao final.
+    Retorna os totais da importação com linhas/segundo e o pico de memória
+    desta importação (acima da memória do processo no início dela).
+    
+    `ao_progredir(importados, ignorados)` é chamado depois de cada bloco confirmado.
+    """
+    inicio = time.perf_counter()
+    memoria = PicoMemoria()
+    
+    versao = balancete.reservar_versao(competencia)
+    current_app.logger.info(f"Importando balancete {competencia} como versão {versao}")
+    
+    registros_importados = 0
+    registros_ignorados = 0
+    data_importacao = datetime.utcnow()
+    
+    try:
+        leitor = pd.read_csv(
+            arquivo,
+            sep=',',
+            encoding='utf-8',
+            dtype=TIPOS_COLUNAS,
+            decimal=',',  # Considera vírgula como separador decimal
+            thousands='.',  # Considera ponto como separador de milhares
+            chunksize=tamanho_bloco
+        )
+        
+        for bloco in leitor:
+            registros, ignorados = preparar_bloco(bloco, competencia, versao, data_importacao)
+            registros_ignorados += ignorados
+            
+            # Os blocos podem ser confirmados: a versão só fica visível ao ser publicada
+            if registros:
+                db.session.execute(BalanceteItem.__table__.insert(), registros)
+                db.session.commit()
+                registros_importados += len(registros)
+                # Depois do INSERT, com o bloco e as linhas ainda em memória
+                memoria.amostrar()
+                # Amostrado (services/logs.py): no máximo um registro a cada poucos segundos
+                current_app.logger.info(
+                    "Importação do balancete em andamento",
+                    extra={'amostra': 'importacao_balancete', 'competencia': competencia, 'registros': registros_importados}
+                )
+                
+            if ao_progredir:
+                ao_progredir(registros_importados, registros_ignorados)
+    except Exception:
+        balancete.descartar_versao(competencia, versao)
+        raise
+    
+    publicada = balancete.publicar_versao(competencia, versao)
+    indicadores_recalculados = None
+    
+    if not publicada:
+        current_app.logger.warning(
+            f"Balancete {competencia} versão {versao} descartado: uma importação mais nova já foi publicada"
+        )
+    else:
+        # A importação já está publicada: uma falha aqui fica no log; os
+        # indicadores podem ser refeitos com `flask recalcular-indicadores` e
+        # as análises são recalculadas na próxima leitura
+        try:
+            indicadores_recalculados = indicadores.atualizar(competencia)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao recalcular indicadores de {competencia}: {str(e)}")
+        # Também fora da requisição: a leitura das análises não precisa gravar
+        try:
+            analise_financeira.atualizar_publicacao(competencia)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Erro ao recalcular as análises de {competencia}: {str(e)}")
+    
+    memoria.amostrar()
+    duracao = time.perf_counter() - inicio
+    
+    return {
+        "registros_importados": registros_importados,
+        "registros_ignorados": registros_ignorados,
+        "competencia": competencia,
+        "versao": versao,
+        "publicada": publicada,
+        "indicadores_recalculados": indicadores_recalculados,
+        "duracao_segundos": round(duracao, 3),
+        "linhas_por_segundo": round(registros_importados / duracao, 1) if duracao else None,
+        "memoria_pico_mb": memoria.mb()
+    }
@@ -0,0 +1,184 @@
+"""
+Importações contábeis em segundo plano.
+
+A rota grava o arquivo enviado em disco, cria um ImportacaoJob e devolve o id
+na hora; a importação roda num pool de processos separado do Gunicorn, de
+modo que um arquivo grande não estoura o timeout nem ocupa as threads que
+atendem os cooperados. O progresso fica na própria linha do job, consultada
+por GET /contabilidade/jobs/<id>.
+
+Os processos do pool são criados com spawn e têm a própria aplicação
+(create_app), com conexões próprias ao banco.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app # type: ignore
+from models.models import db
+from models.financeiro_models import ImportacaoJob
+
+PASTA_ARQUIVOS = os.getenv('IMPORTACOES_DIR', os.path.join(tempfile.gettempdir(), 'valex-importacoes'))
+PROCESSOS = int(os.getenv('IMPORTACAO_PROCESSOS', 1))
+
+# Sem atualização há mais tempo que isso, o job foi interrompido (ex.: reinício do servidor)
+EXPIRACAO = timedelta(minutes=15)
+
+# Tabela cujo cache de respostas cada tipo de importação invalida
+TABELAS = {'plano': 'plano_contas', 'balancete': 'balancete_items'}
+
+_executor = None
+_app_processo = None
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PROCESSOS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_iniciar_processo
+        )
+    return _executor
+
+def _iniciar_processo():
+    global _app_processo
+    from app import create_app
+    _app_processo = create_app()
+
+def enfileirar(tipo, arquivo, competencia=None, tamanho_bloco=None):
+    """
+    Grava o upload, registra o job e o envia ao pool. Retorna o job criado.
+    """
+    os.makedirs(PASTA_ARQUIVOS, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    caminho = os.path.join(PASTA_ARQUIVOS, f'{job_id}.csv')
+    arquivo.save(caminho)
+    
+    job = ImportacaoJob(
+        id=job_id,
+        tipo=tipo,
+        competencia=competencia,
+        nome_arquivo=arquivo.filename,
+        caminho_arquivo=caminho,
+        status='PENDENTE'
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    app = current_app._get_current_object()
+    futuro = _pool().submit(executar, job_id, tamanho_bloco)
+    futuro.add_done_callback(lambda f: _concluido(app, tipo, f))
+    return job
+
+def _concluido(app, tipo, futuro):
+    # Roda no processo web: as métricas são deste processo
+    from services import metricas
+    
+    if futuro.exception() is not None:
+        app.logger.error(f"Job de importação ({tipo}) falhou fora da importação: {futuro.exception()}")
+        return
+        
+    duracao, sucesso = futuro.result()
+    metricas.importacao_segundos.observar(duracao, tipo=tipo, resultado='ok' if sucesso else 'erro')
+
+def _atualizar(job_id, **valores):
+    db.session.query(ImportacaoJob).filter_by(id=job_id).update(
+        {**valores, 'atualizado_em': datetime.utcnow()}
+    )
+    db.session.commit()
+
+def executar(job_id, tamanho_bloco=None):
+    """
+    Executa o job no processo do pool. Retorna (duração em segundos, sucesso).
+    """
+    from services import importacao_balancete, importacao_plano
+    from services.cache_respostas import invalidar
+    
+    inicio = time.perf_counter()
+    with _app_processo.app_context():
+        job = db.session.get(ImportacaoJob, job_id)
+        _atualizar(job_id, status='EXECUTANDO', iniciado_em=datetime.utcnow())
+        
+        try:
+            if job.tipo == 'plano':
+                with open(job.caminho_arquivo, 'rb') as arquivo:
+                    conteudo = importacao_plano.decodificar(arquivo.read())
+                df, mapeamento_colunas = importacao_plano.ler_plano_csv(conteudo)
+                resultado = importacao_plano.importar_plano(df, mapeamento_colunas)
+                processadas = resultado['registros_importados'] + resultado['registros_atualizados']
+                ignoradas = resultado['registros_ignorados']
+            else:
+                with open(job.caminho_arquivo, 'rb') as arquivo:
+                    resultado = importacao_balancete.importar_balancete(
+                        arquivo, job.competencia,
+                        tamanho_bloco or importacao_balancete.TAMANHO_BLOCO_PADRAO,
+                        ao_progredir=lambda importados, ignorados: _atualizar(
+                            job_id, linhas_processadas=importados, linhas_ignoradas=ignorados
+                        )
+                    )
+                processadas = resultado['registros_importados']
+                ignoradas = resultado['registros_ignorados']
+                
+            # Aqui, e não no processo web: o worker que enfileirou o job pode ter
+            # sido reciclado. O cache (FileSystemCache) é compartilhado entre os processos
+            invalidar(TABELAS[job.tipo])
+            _atualizar(
+                job_id,
+                status='CONCLUIDO',
+                linhas_processadas=processadas,
+                linhas_ignoradas=ignoradas,
+                resultado=json.dumps(resultado),
+                concluido_em=datetime.utcnow()
+            )
+            return time.perf_counter() - inicio, True
+        except Exception as e:
+            db.session.rollback()
+            logging.getLogger(__name__).exception(f"Erro no job de importação {job_id}")
+            # A falha pode ter vindo depois de um commit (ex.: balancete já
+            # publicado): invalidar sem necessidade só custa um miss
+            try:
+                invalidar(TABELAS[job.tipo])
+            except Exception:
+                logging.getLogger(__name__).exception(f"Erro ao invalidar o cache do job {job_id}")
+            _atualizar(job_id, status='ERRO', erro=str(e), concluido_em=datetime.utcnow())
+            return time.perf_counter() - inicio, False
+        finally:
+            if os.path.exists(job.caminho_arquivo):
+                os.remove(job.caminho_arquivo)
+
+def situacao(job):
+    """
+    Estado do job para a API: progresso, linhas/segundo, erro e totais finais.
+    """
+    status = job.status
+    ultimo_sinal = job.atualizado_em or job.criado_em
+    if status in ('PENDENTE', 'EXECUTANDO') and ultimo_sinal < datetime.utcnow() - EXPIRACAO:
+        status = 'INTERROMPIDO'
+        
+    linhas_por_segundo = None
+    if job.iniciado_em and job.linhas_processadas:
+        fim = job.concluido_em or job.atualizado_em
+        decorrido = (fim - job.iniciado_em).total_seconds()
+        if decorrido > 0:
+            linhas_por_segundo = round(job.linhas_processadas / decorrido, 1)
+            
+    return {
+        'id': job.id,
+        'tipo': job.tipo,
+        'competencia': job.competencia,
+        'nome_arquivo': job.nome_arquivo,
+        'status': status,
+        'linhas_processadas': job.linhas_processadas,
+        'linhas_ignoradas': job.linhas_ignoradas,
+        'linhas_por_segundo': linhas_por_segundo,
+        'erro': job.erro,
+        'resultado': json.loads(job.resultado) if job.resultado else None,
+        'criado_em': job.criado_em.isoformat() if job.criado_em else None,
+        'iniciado_em': job.iniciado_em.isoformat() if job.iniciado_em else None,
+        'concluido_em': job.concluido_em.isoformat() if job.concluido_em else None
+    }
@@ -0,0 +1,191 @@
+"""
+Importação do plano de contas em lote.
+
+Carrega o mapa código → id uma única vez, classifica as contas com operações
+vetorizadas do pandas, grava tudo com um upsert em lote e só então resolve
+`conta_pai_id` em memória, independentemente da ordem das linhas no arquivo.
+"""
+import csv
+from datetime import datetime
+from io import StringIO
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+from flask import current_app # type: ignore
+from models.models import db
+from models.financeiro_models import PlanoContas
+from services import arvore_plano
+from services.upsert import upsert
+
+COLUNAS_ESPERADAS = ['sequencial', 'codigo', 'tipo', 'descricao', 'referencia']
+
+# Nomes alternativos aceitos para cada coluna do CSV
+ALTERNATIVAS_COLUNAS = {
+    'sequencial': ['seq', 'id', 'num'],
+    'codigo': ['cod', 'código', 'conta'],
+    'tipo': ['t', 'tp', 'sintética'],
+    'descricao': ['desc', 'descrição', 'nome'],
+    'referencia': ['ref', 'referência', 'reduzido'],
+}
+
+COLUNAS_ATUALIZADAS = (
+    'sequencial', 'codigo_reduzido', 'descricao', 'nivel', 'tipo_conta',
+    'natureza_saldo', 'permite_lancamento', 'tipo', 'referencia', 'updated_at'
+)
+
+def decodificar(bruto):
+    """
+    Decodifica o arquivo tentando UTF-8 e, em seguida, ISO-8859-1.
+    """
+    try:
+        return bruto.decode('utf-8')
+    except UnicodeDecodeError:
+        return bruto.decode('iso-8859-1')
+
+def detectar_delimitador(conteudo):
+    amostra = conteudo[:1024]
+    try:
+        delimiter = csv.Sniffer().sniff(amostra).delimiter
+    except csv.Error:
+        delimiter = None
+        
+    # Se não conseguir detectar, tentar delimitadores comuns
+    if not delimiter or delimiter.isalnum():
+        for candidato in (';', ',', '\t'):
+            if candidato in amostra:
+                return candidato
+        return ';'  # Padrão
+        
+    return delimiter
+
+def ler_plano_csv(conteudo):
+    """
+    Lê o CSV do plano de contas e identifica as colunas esperadas.
+    Retorna (df, mapeamento_colunas) ou levanta ValueError se a estrutura não for reconhecida.
+    """
+    delimiter = detectar_delimitador(conteudo)
+    current_app.logger.debug(f"Delimitador detectado: '{delimiter}'")
+    
+    df = pd.read_csv(StringIO(conteudo),
+                     sep=delimiter,
+                     dtype=str,  # Trata todas as colunas como strings
+                     on_bad_lines='skip',
+                     engine='python',  # Motor mais flexível
+                     skipinitialspace=True,  # Ignora espaços iniciais
+                     keep_default_na=False)  # Evita que pandas converta valores vazios em NaN
+    
+    current_app.logger.debug(f"Colunas detectadas: {list(df.columns)}")
+    
+    mapeamento_colunas = {}
+    for posicao, coluna in enumerate(COLUNAS_ESPERADAS):
+        candidatas = [coluna] + ALTERNATIVAS_COLUNAS[coluna]
+        encontrada = next((c for c in candidatas if c in df.columns), None)
+        
+        # Se não encontrou pelo nome, usar a posição da coluna
+        if encontrada is None and len(df.columns) > posicao:
+            encontrada = df.columns[posicao]
+        if encontrada is not None:
+            mapeamento_colunas[coluna] = encontrada
+    
+    current_app.logger.debug(f"Mapeamento de colunas: {mapeamento_colunas}")
+    
+    if len(mapeamento_colunas) < len(COLUNAS_ESPERADAS):
+        raise ValueError("Estrutura do CSV não reconhecida. O arquivo deve ter pelo menos 5 colunas.")
+        
+    return df, mapeamento_colunas
+
+def classificar_contas(df, mapeamento_colunas):
+    """
+    Normaliza as colunas e calcula nível, tipo de conta, natureza do saldo e
+    permissão de lançamento para todas as linhas de uma vez.
+    Retorna (contas, registros_ignorados).
+    """
+    contas = pd.DataFrame({
+        coluna: df[mapeamento_colunas[coluna]].astype(str).str.strip()
+        for coluna in COLUNAS_ESPERADAS
+    })
+    
+    # Pular linhas sem código ou descrição
+    validas = (
+        (contas['codigo'] != '') & (contas['codigo'].str.lower() != 'none') &
+        (contas['descricao'] != '') & (contas['descricao'].str.lower() != 'none')
+    )
+    registros_ignorados = int((~validas).sum())
+    contas = contas[validas]
+    
+    codigo = contas['codigo']
+    contas = contas.assign(
+        codigo_reduzido=contas['referencia'],
+        # Nível pelo número de pontos no código
+        nivel=codigo.str.count(r'\.') + 1,
+        # A ordem das condições reproduz a regra de classificação original
+        tipo_conta=np.select(
+            [codigo.str.startswith('1'), codigo.str.startswith('3'),
+             codigo.str.startswith('4'), codigo.str.startswith('2.4')],
+            ['ATIVO', 'DESPESA', 'RECEITA', 'PATRIMONIO_LIQUIDO'],
+            default='PASSIVO'
+        ),
+        natureza_saldo=np.where(codigo.str.match(r'[13]'), 'DEVEDOR', 'CREDOR'),
+        permite_lancamento=contas['tipo'].str.upper() != 'S',
+        codigo_pai=codigo.str.rpartition('.')[0]
+    )
+    
+    return contas, registros_ignorados
+
+def importar_plano(df, mapeamento_colunas):
+    """
+    Grava o plano de contas com um número constante de idas ao banco:
+    leitura do mapa de códigos, upsert em lote (já com o pai das contas cujo
+    pai existia), releitura do mapa e um segundo upsert em lote com o pai das
+    demais, e o índice da árvore. Tudo numa única transação: uma falha no
+    meio não deixa o plano novo gravado com a árvore antiga.
+    """
+    contas, registros_ignorados = classificar_contas(df, mapeamento_colunas)
+    
+    # Código repetido no arquivo: prevalece a última ocorrência
+    repetidos = int(contas['codigo'].duplicated(keep='last').sum())
+    contas = contas.drop_duplicates('codigo', keep='last')
+    
+    ids_existentes = dict(db.session.query(PlanoContas.codigo, PlanoContas.id).all())
+    existentes = contas['codigo'].isin(ids_existentes.keys())
+    
+    agora = datetime.utcnow()
+    colunas = ['codigo'] + [c for c in COLUNAS_ATUALIZADAS if c != 'updated_at']
+    # Pai já gravado antes desta importação: ligado no mesmo upsert
+    pais_conhecidos = contas['codigo_pai'].map(ids_existentes)
+    registros = contas[colunas].assign(
+        conta_pai_id=pais_conhecidos.astype('Int64').astype(object).where(pais_conhecidos.notna(), None),
+        created_at=agora,
+        updated_at=agora
+    )
+    
+    upsert(
+        PlanoContas.__table__,
+        registros.to_dict('records'),
+        chaves=('codigo',),
+        atualizar=COLUNAS_ATUALIZADAS + ('conta_pai_id',)
+    )
+    
+    # Segunda passada, só para as contas cujo pai é novo neste arquivo: outro
+    # upsert em lote (um UPDATE por conta seria uma ida ao banco por linha no MySQL)
+    pendentes = pais_conhecidos.isna() & (contas['codigo_pai'] != '')
+    if pendentes.any():
+        ids_por_codigo = dict(db.session.query(PlanoContas.codigo, PlanoContas.id).all())
+        pais = contas.loc[pendentes, 'codigo_pai'].map(ids_por_codigo)
+        ligacoes = registros.loc[pendentes].assign(conta_pai_id=pais)[pais.notna()]
+        upsert(
+            PlanoContas.__table__,
+            ligacoes.assign(conta_pai_id=ligacoes['conta_pai_id'].astype(int)).to_dict('records'),
+            chaves=('codigo',),
+            atualizar=('conta_pai_id',)
+        )
+    
+    # A hierarquia mudou: recalcular o índice da árvore do plano (lê as
+    # contas gravadas acima na mesma transação)
+    arvore_plano.reconstruir_indice()
+    db.session.commit()
+    
+    return {
+        "registros_importados": int((~existentes).sum()),
+        "registros_atualizados": int(existentes.sum()) + repetidos,
+        "registros_ignorados": registros_ignorados
+    }
@@ -0,0 +1,237 @@
+"""
+Indicadores financeiros (liquidez, endividamento e rentabilidade) por período
+contábil, gravados em indicadores_financeiros.
+
+Cada indicador é uma fórmula aritmética sobre agregados do balancete: somas
+das contas analíticas sob um prefixo de código (ativo circulante = 1.1, ...).
+Os agregados de uma competência saem de uma única consulta e também são
+gravados, com tipo AGREGADO, como referência para o próximo cálculo.
+
+O recálculo é incremental: depois de cada importação do balancete, só os
+indicadores que usam algum agregado cujo valor mudou (ou cuja fórmula mudou
+neste registro) são regravados. A série histórica é lida apenas dessa
+tabela, sem tocar nos itens do balancete.
+"""
+import ast
+import operator
+from models.models import db
+from models.financeiro_models import BalanceteItem, IndicadorFinanceiro, PeriodoContabil
+from services import balancete
+from services.upsert import upsert
+
+TIPO_AGREGADO = 'AGREGADO'
+
+# Limite de DECIMAL(15,4); razões com denominador quase zero ficam sem valor
+LIMITE_VALOR = 10 ** 11
+
+# Agregado -> (prefixo da conta, natureza). Contas credoras entram com o sinal
+# invertido, para que passivo, PL e receitas fiquem positivos como nos relatórios
+AGREGADOS = {
+    'ativo': ('1', 'D'),
+    'ativo_circulante': ('1.1', 'D'),
+    'disponivel': ('1.1.1', 'D'),
+    'realizavel_longo_prazo': ('1.2.1', 'D'),
+    'passivo_circulante': ('2.1', 'C'),
+    'passivo_nao_circulante': ('2.2', 'C'),
+    'patrimonio_liquido': ('2.4', 'C'),
+    'receitas': ('4', 'C'),
+    'custos': ('5', 'D'),
+    'despesas': ('3', 'D'),
+}
+
+# Indicador -> (tipo, fórmula sobre os agregados)
+INDICADORES = {
+    'liquidez_corrente': ('LIQUIDEZ', 'ativo_circulante / passivo_circulante'),
+    'liquidez_imediata': ('LIQUIDEZ', 'disponivel / passivo_circulante'),
+    'liquidez_geral': (
+        'LIQUIDEZ', '(ativo_circulante + realizavel_longo_prazo) / (passivo_circulante + passivo_nao_circulante)'
+    ),
+    'endividamento_geral': ('ENDIVIDAMENTO', '(passivo_circulante + passivo_nao_circulante) / ativo * 100'),
+    'composicao_endividamento': (
+        'ENDIVIDAMENTO', 'passivo_circulante / (passivo_circulante + passivo_nao_circulante) * 100'
+    ),
+    'capital_terceiros': (
+        'ENDIVIDAMENTO', '(passivo_circulante + passivo_nao_circulante) / patrimonio_liquido * 100'
+    ),
+    'margem_bruta': ('RENTABILIDADE', '(receitas - custos) / receitas * 100'),
+    'margem_liquida': ('RENTABILIDADE', '(receitas - custos - despesas) / receitas * 100'),
+    'rentabilidade_pl': ('RENTABILIDADE', '(receitas - custos - despesas) / patrimonio_liquido * 100'),
+}
+
+_OPERADORES = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+def _compilar(formula):
+    """
+    Árvore da fórmula e os agregados que ela usa. Aceita só números, nomes de
+    agregados, + - * / e parênteses.
+    """
+    arvore = ast.parse(formula, mode='eval').body
+    entradas = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Name):
+            if no.id not in AGREGADOS:
+                raise ValueError(f"Agregado desconhecido na fórmula '{formula}': {no.id}")
+            entradas.add(no.id)
+        elif isinstance(no, ast.Constant) and not isinstance(no.value, (int, float)):
+            raise ValueError(f"Constante não numérica na fórmula '{formula}'")
+        elif isinstance(no, ast.BinOp) and type(no.op) not in _OPERADORES:
+            raise ValueError(f"Operador não permitido na fórmula '{formula}'")
+        elif not isinstance(no, (ast.Name, ast.BinOp, ast.UnaryOp, ast.USub, ast.Constant, ast.Load, *_OPERADORES)):
+            raise ValueError(f"Expressão não permitida na fórmula '{formula}'")
+    return arvore, frozenset(entradas)
+
+def _avaliar(no, agregados):
+    if isinstance(no, ast.Constant):
+        return float(no.value)
+    if isinstance(no, ast.Name):
+        return agregados[no.id]
+    if isinstance(no, ast.UnaryOp):
+        return -_avaliar(no.operand, agregados)
+    return _OPERADORES[type(no.op)](_avaliar(no.left, agregados), _avaliar(no.right, agregados))
+
+# Compiladas na importação do módulo: uma fórmula inválida falha no deploy, não no cálculo
+_COMPILADAS = {nome: _compilar(formula) for nome, (_, formula) in INDICADORES.items()}
+
+def formula_agregado(nome):
+    prefixo, natureza = AGREGADOS[nome]
+    return f"-soma({prefixo})" if natureza == 'C' else f"soma({prefixo})"
+
+def _calcular_indicador(nome, agregados):
+    arvore, _ = _COMPILADAS[nome]
+    try:
+        valor = round(_avaliar(arvore, agregados), 4)
+    except ZeroDivisionError:
+        return None
+    return valor if abs(valor) < LIMITE_VALOR else None
+
+def agregados(competencia):
+    """
+    Valores dos agregados no balancete publicado da competência, numa consulta.
+    """
+    somas = []
+    for nome, (prefixo, natureza) in AGREGADOS.items():
+        soma = db.func.coalesce(db.func.sum(db.case(
+            (db.or_(BalanceteItem.conta == prefixo, BalanceteItem.conta.like(f'{prefixo}.%')),
+             BalanceteItem.valor_atual),
+            else_=0
+        )), 0)
+        somas.append((-soma if natureza == 'C' else soma).label(nome))
+
+    # Só as analíticas: as sintéticas repetem a soma das filhas
+    linha = balancete.itens_publicados(competencia).filter(BalanceteItem.tipo == 'A')\
+        .with_entities(*somas).one()
+    return {nome: round(float(valor), 2) for nome, valor in zip(AGREGADOS, linha)}
+
+def atualizar(competencia):
+    """
+    Recalcula os indicadores da competência cujos agregados mudaram desde o
+    último cálculo. Retorna os nomes dos indicadores regravados.
+    """
+    valores = agregados(competencia)
+    periodo_id = balancete.periodos_contabeis([competencia], criar=True)[competencia]
+
+    gravados = {
+        nome: (valor, formula) for nome, valor, formula in db.session.query(
+            IndicadorFinanceiro.nome_indicador, IndicadorFinanceiro.valor, IndicadorFinanceiro.formula
+        ).filter(IndicadorFinanceiro.periodo_id == periodo_id)
+    }
+
+    def alterado(nome, valor, formula):
+        anterior = gravados.get(nome)
+        if anterior is None or anterior[1] != formula:
+            return True
+        return (None if anterior[0] is None else float(anterior[0])) != valor
+
+    linhas = []
+    mudaram = set()
+    for nome, valor in valores.items():
+        formula = formula_agregado(nome)
+        if alterado(nome, valor, formula):
+            mudaram.add(nome)
+            linhas.append({
+                'periodo_id': periodo_id, 'tipo_indicador': TIPO_AGREGADO,
+                'nome_indicador': nome, 'valor': valor, 'formula': formula
+            })
+
+    recalculados = []
+    for nome, (tipo, formula) in INDICADORES.items():
+        _, entradas = _COMPILADAS[nome]
+        # Agregado alterado ou fórmula nova/diferente: recalcula; senão o valor gravado continua certo
+        if not (entradas & mudaram or nome not in gravados or gravados[nome][1] != formula):
+            continue
+        recalculados.append(nome)
+        linhas.append({
+            'periodo_id': periodo_id, 'tipo_indicador': tipo,
+            'nome_indicador': nome, 'valor': _calcular_indicador(nome, valores), 'formula': formula
+        })
+
+    upsert(
+        IndicadorFinanceiro.__table__,
+        linhas,
+        chaves=('periodo_id', 'nome_indicador'),
+        atualizar=('tipo_indicador', 'valor', 'formula')
+    )
+    db.session.commit()
+    return recalculados
+
+def ler_nomes(texto):
+    nomes = [n.strip() for n in (texto or '').split(',') if n.strip()]
+    invalidos = [n for n in nomes if n not in INDICADORES and n not in AGREGADOS]
+    if invalidos:
+        raise ValueError(f"Indicador inválido: {', '.join(invalidos)}. Use {', '.join(INDICADORES)}")
+    return list(dict.fromkeys(nomes))
+
+def series(inicio=None, fim=None, nomes=None, tipo=None):
+    """
+    Série mensal de cada indicador entre as competências `inicio` e `fim`
+    (AAAA-MM, inclusivas), lida só de indicadores_financeiros. `nomes` pode
+    pedir também agregados; sem ele, vêm todos os indicadores (ou os do `tipo`).
+    """
+    consulta = db.session.query(
+        IndicadorFinanceiro.nome_indicador, IndicadorFinanceiro.tipo_indicador,
+        IndicadorFinanceiro.formula, IndicadorFinanceiro.valor,
+        PeriodoContabil.ano, PeriodoContabil.mes
+    ).join(PeriodoContabil, IndicadorFinanceiro.periodo_id == PeriodoContabil.id)
+
+    ano_mes = PeriodoContabil.ano * 100 + PeriodoContabil.mes
+    if inicio:
+        ano, mes = balancete.ano_mes(inicio)
+        consulta = consulta.filter(ano_mes >= ano * 100 + mes)
+    if fim:
+        ano, mes = balancete.ano_mes(fim)
+        consulta = consulta.filter(ano_mes <= ano * 100 + mes)
+    if nomes:
+        consulta = consulta.filter(IndicadorFinanceiro.nome_indicador.in_(nomes))
+    else:
+        consulta = consulta.filter(IndicadorFinanceiro.tipo_indicador != TIPO_AGREGADO)
+    if tipo:
+        consulta = consulta.filter(IndicadorFinanceiro.tipo_indicador == tipo)
+
+    resultado = {}
+    competencias = set()
+    for nome, tipo_indicador, formula, valor, ano, mes in consulta.order_by(PeriodoContabil.ano, PeriodoContabil.mes):
+        competencia = f"{ano:04d}-{mes:02d}"
+        competencias.add(competencia)
+        serie = resultado.setdefault(nome, {
+            'nome': nome,
+            'tipo': tipo_indicador,
+            'formula': formula,
+            'valores': []
+        })
+        serie['valores'].append({
+            'competencia': competencia,
+            'valor': float(valor) if valor is not None else None
+        })
+
+    ordem = list(INDICADORES) + list(AGREGADOS)
+    return {
+        'inicio': inicio,
+        'fim': fim,
+        'competencias': sorted(competencias),
+        'indicadores': sorted(resultado.values(), key=lambda serie: ordem.index(serie['nome']))
+    }
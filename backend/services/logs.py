@@ -0,0 +1,142 @@
+"""
+Logs estruturados (JSON, uma linha por registro) sem escrita na thread da requisição.
+
+Os handlers do logger raiz são substituídos por um QueueHandler: a requisição
+só enfileira o registro e uma thread (QueueListener) formata e escreve no
+stdout. A fila é limitada; se o stdout não der vazão, os registros excedentes
+são descartados e contados em valex_logs_descartados_total, em vez de
+segurar a requisição.
+
+O nível vem de LOG_LEVEL (padrão: DEBUG em desenvolvimento, INFO nos demais
+ambientes). Laços que registram progresso (ex.: blocos da importação) passam
+`extra={'amostra': '<chave>'}`: só um registro por chave a cada
+LOG_AMOSTRAGEM_SEGUNDOS é escrito, com o total de suprimidos no seguinte.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import has_request_context, request # type: ignore
+from services.metricas import logs_descartados_total
+
+TAMANHO_FILA = 10000
+
+# Atributos padrão do LogRecord; os demais vieram de `extra` e vão para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+class FormatadorJSON(logging.Formatter):
+    def format(self, record):
+        dados = {
+            'momento': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+        }
+        dados.update({
+            chave: valor for chave, valor in vars(record).items()
+            if chave not in _ATRIBUTOS_PADRAO and chave != 'amostra'
+        })
+        if record.exc_info:
+            dados['excecao'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            dados['excecao'] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class Amostragem(logging.Filter):
+    """
+    Deixa passar um registro por chave `amostra` a cada `intervalo` segundos.
+    """
+    def __init__(self, intervalo):
+        super().__init__()
+        self.intervalo = intervalo
+        self._ultimos = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        chave = getattr(record, 'amostra', None)
+        if chave is None:
+            return True
+        agora = time.monotonic()
+        with self._lock:
+            ultimo, suprimidos = self._ultimos.get(chave, (None, 0))
+            if ultimo is not None and agora - ultimo < self.intervalo:
+                self._ultimos[chave] = (ultimo, suprimidos + 1)
+                return False
+            self._ultimos[chave] = (agora, 0)
+        if suprimidos:
+            record.suprimidos = suprimidos
+        return True
+
+class FilaDeLogs(QueueHandler):
+    def prepare(self, record):
+        # Só o necessário na thread da requisição: a mensagem final e o
+        # contexto da requisição, que não existe mais na thread do listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            record.metodo = request.method
+            record.caminho = request.path
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logs_descartados_total.inc()
+
+def nivel_padrao():
+    if os.getenv('LOG_LEVEL'):
+        return os.getenv('LOG_LEVEL').upper()
+    return 'DEBUG' if os.getenv('FLASK_ENV') == 'development' else 'INFO'
+
+def _iniciar():
+    global _listener
+    fila = queue.Queue(TAMANHO_FILA)
+
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatadorJSON())
+    _listener = QueueListener(fila, saida, respect_handler_level=True)
+    _listener.start()
+
+    handler = FilaDeLogs(fila)
+    handler.addFilter(Amostragem(float(os.getenv('LOG_AMOSTRAGEM_SEGUNDOS', 5))))
+
+    raiz = logging.getLogger()
+    raiz.handlers = [handler]
+    raiz.setLevel(nivel_padrao())
+
+def _reiniciar_apos_fork():
+    # A thread do listener não sobrevive ao fork (preload_app do Gunicorn)
+    if _listener is not None:
+        _iniciar()
+
+def _parar():
+    if _listener is not None:
+        _listener.stop()
+
+def configurar_logs():
+    """
+    Instala a fila de logs no logger raiz (uma vez por processo).
+    """
+    if _listener is not None:
+        return
+    _iniciar()
+
+    # Bibliotecas verbosas ficam em WARNING mesmo com LOG_LEVEL=DEBUG
+    for nome in ('urllib3', 'sqlalchemy.engine'):
+        logging.getLogger(nome).setLevel(logging.WARNING)
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+    atexit.register(_parar)
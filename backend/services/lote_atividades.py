@@ -0,0 +1,183 @@
+"""
+Gravação em lote das atividades enviadas pela fila offline dos tablets.
+
+Cada item traz uma chave de idempotência gerada no tablet. O lote inteiro é
+validado com uma consulta por tabela (produtores, fazendas, variedades,
+classificações e chaves já gravadas), os itens válidos entram num único
+INSERT na mesma transação do resumo diário e o resultado volta item a item,
+na ordem recebida. Reenvios com a mesma chave voltam como 'duplicada', com o
+id da atividade gravada da primeira vez.
+"""
+from datetime import datetime, timedelta
+from pytz import utc # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from models.models import db, Atividade, ClassificacaoUva, Fazenda, Produtor, Variedade
+from services import eventos, resumo_diario
+from services.datas import TIMEZONE_COOPERATIVA
+
+LOTE_MAXIMO = 500
+TAMANHO_CHAVE = 64
+
+# Tolerância para o relógio do tablet adiantado
+FUTURO_TOLERADO = timedelta(minutes=5)
+
+COLUNAS_CRIADAS = (
+    Atividade.id, Atividade.produtor_id, Atividade.fazenda_id, Atividade.variedade_id, Atividade.classificacao_id,
+    Atividade.tipo_atividade, Atividade.quantidade_pallets, Atividade.caixas,
+    Atividade.created_at, Atividade.chave_idempotencia
+)
+
+def _inteiro(item, campo, obrigatorio=True):
+    valor = item.get(campo)
+    if valor is None:
+        if obrigatorio:
+            raise ValueError(f"Campo obrigatório: {campo}")
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)) or not str(valor).isdigit():
+        raise ValueError(f"Campo {campo} deve ser um inteiro não negativo")
+    return int(valor)
+
+def _momento(texto, agora):
+    """
+    Converte o registrado_em do tablet (ISO 8601) para UTC sem tzinfo, como
+    o created_at. Sem fuso, o horário é o local da cooperativa.
+    """
+    try:
+        momento = datetime.fromisoformat(str(texto).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"registrado_em inválido: {texto}. Use ISO 8601")
+    if momento.tzinfo is None:
+        momento = TIMEZONE_COOPERATIVA.localize(momento)
+    momento = momento.astimezone(utc).replace(tzinfo=None)
+    if momento > agora + FUTURO_TOLERADO:
+        raise ValueError("registrado_em está no futuro")
+    return momento
+
+def _validar(item, agora):
+    """
+    Valida os campos de um item isoladamente. Retorna a linha de atividade.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Cada item deve ser um objeto")
+
+    chave = item.get('chave')
+    if not isinstance(chave, str) or not 0 < len(chave) <= TAMANHO_CHAVE:
+        raise ValueError(f"Campo chave deve ser um texto de 1 a {TAMANHO_CHAVE} caracteres")
+
+    tipo_atividade = item.get('tipo_atividade')
+    if not isinstance(tipo_atividade, str) or not 0 < len(tipo_atividade) <= 20:
+        raise ValueError("Campo tipo_atividade deve ser um texto de 1 a 20 caracteres")
+
+    momento = _momento(item['registrado_em'], agora) if item.get('registrado_em') else agora
+    return {
+        'chave_idempotencia': chave,
+        'produtor_id': _inteiro(item, 'produtor_id'),
+        'fazenda_id': _inteiro(item, 'fazenda_id'),
+        'variedade_id': _inteiro(item, 'variedade_id'),
+        'classificacao_id': _inteiro(item, 'classificacao_id', obrigatorio=False),
+        'tipo_atividade': tipo_atividade,
+        'quantidade_pallets': _inteiro(item, 'quantidade_pallets'),
+        'caixas': _inteiro(item, 'caixas', obrigatorio=False),
+        'created_at': momento,
+        'updated_at': agora,
+    }
+
+def _existentes(coluna, valores):
+    valores = {v for v in valores if v is not None}
+    if not valores:
+        return set()
+    return {valor for (valor,) in db.session.query(coluna).filter(coluna.in_(valores))}
+
+def _referencias(linha, produtores, fazendas, variedades, classificacoes):
+    if linha['produtor_id'] not in produtores:
+        return f"Produtor {linha['produtor_id']} não encontrado"
+    if fazendas.get(linha['fazenda_id']) != linha['produtor_id']:
+        return f"Fazenda {linha['fazenda_id']} não encontrada para o produtor {linha['produtor_id']}"
+    if linha['variedade_id'] not in variedades:
+        return f"Variedade {linha['variedade_id']} não encontrada"
+    if linha['classificacao_id'] is not None and linha['classificacao_id'] not in classificacoes:
+        return f"Classificação {linha['classificacao_id']} não encontrada"
+    return None
+
+def _processar(itens):
+    agora = datetime.utcnow()
+    resultados = [None] * len(itens)
+    linhas = {}  # posição -> linha válida
+
+    for posicao, item in enumerate(itens):
+        try:
+            linhas[posicao] = _validar(item, agora)
+        except ValueError as e:
+            chave = item.get('chave') if isinstance(item, dict) else None
+            resultados[posicao] = {'chave': chave, 'status': 'invalida', 'erro': str(e)}
+
+    # Uma consulta por tabela para o lote inteiro
+    def valores(campo):
+        return [linha[campo] for linha in linhas.values()]
+        
+    produtores = _existentes(Produtor.id, valores('produtor_id'))
+    variedades = _existentes(Variedade.id, valores('variedade_id'))
+    classificacoes = _existentes(ClassificacaoUva.id, valores('classificacao_id'))
+    fazendas = dict(
+        db.session.query(Fazenda.id, Fazenda.produtor_id).filter(Fazenda.id.in_(set(valores('fazenda_id'))))
+    ) if linhas else {}
+    gravadas = dict(
+        db.session.query(Atividade.chave_idempotencia, Atividade.id)
+        .filter(Atividade.chave_idempotencia.in_(set(valores('chave_idempotencia'))))
+    ) if linhas else {}
+
+    novas = {}  # chave -> posição do primeiro item com a chave
+    for posicao, linha in linhas.items():
+        chave = linha['chave_idempotencia']
+        if chave in gravadas or chave in novas:
+            resultados[posicao] = {'chave': chave, 'status': 'duplicada', 'id': gravadas.get(chave)}
+            continue
+        erro = _referencias(linha, produtores, fazendas, variedades, classificacoes)
+        if erro:
+            resultados[posicao] = {'chave': chave, 'status': 'invalida', 'erro': erro}
+            continue
+        novas[chave] = posicao
+
+    criadas = []
+    if novas:
+        db.session.execute(Atividade.__table__.insert(), [linhas[posicao] for posicao in novas.values()])
+        criadas = db.session.query(*COLUNAS_CRIADAS)\
+            .filter(Atividade.chave_idempotencia.in_(list(novas))).all()
+        resumo_diario.registrar_atividades(criadas)
+
+    ids = {atividade.chave_idempotencia: atividade.id for atividade in criadas}
+    for chave, posicao in novas.items():
+        resultados[posicao] = {'chave': chave, 'status': 'criada', 'id': ids[chave]}
+    # Duplicatas dentro do próprio lote apontam para a atividade criada agora
+    for resultado in resultados:
+        if resultado['status'] == 'duplicada' and resultado['id'] is None:
+            resultado['id'] = ids.get(resultado['chave'])
+
+    return resultados, [eventos.dados_atividade(atividade) for atividade in criadas]
+
+def registrar_lote(itens):
+    """
+    Grava o lote numa transação e retorna o resultado de cada item
+    ({'chave', 'status': 'criada' | 'duplicada' | 'invalida', 'id' ou 'erro'}).
+    """
+    if not isinstance(itens, list):
+        raise ValueError("O corpo deve ser uma lista de atividades")
+    if len(itens) > LOTE_MAXIMO:
+        raise ValueError(f"Lote com {len(itens)} atividades; o máximo é {LOTE_MAXIMO}")
+
+    # Um reenvio concorrente do mesmo lote pode gravar as chaves entre a
+    # consulta e o INSERT: o índice único recusa e a segunda tentativa as
+    # encontra como duplicadas
+    for tentativa in range(2):
+        try:
+            resultados, dados_eventos = _processar(itens)
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if tentativa:
+                raise
+
+    for dados in dados_eventos:
+        eventos.publicar_atividade('atividade_criada', dados)
+    return resultados
@@ -0,0 +1,185 @@
+"""
+Instrumentação das requisições e endpoint /metrics (formato texto do Prometheus).
+
+Por requisição: eventos do SQLAlchemy contam os comandos e somam o tempo no
+banco, o provedor JSON mede a serialização, e o cabeçalho Server-Timing
+devolve db/serialize/total ao cliente (aparece na aba Network do navegador).
+
+No processo: histogramas de latência por rota, requisições em andamento,
+checkouts e overflow do pool de conexões e duração das importações. Os
+valores são do processo (um worker, ver config_servidor.py).
+"""
+import threading
+import time
+from flask import Response, g, has_request_context, request # type: ignore
+from sqlalchemy import event # type: ignore
+from sqlalchemy.engine import Engine # type: ignore
+from sqlalchemy.pool import Pool # type: ignore
+from services.serializacao import ProvedorJSON
+
+BUCKETS_REQUISICAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_IMPORTACAO = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _rotulos(valores):
+    if not valores:
+        return ''
+    return '{' + ','.join(f'{nome}="{valor}"' for nome, valor in valores) + '}'
+
+class Contador:
+    tipo = 'counter'
+    
+    def __init__(self, nome, ajuda):
+        self.nome, self.ajuda = nome, ajuda
+        self._valores = {}
+        self._lock = threading.Lock()
+        
+    def inc(self, valor=1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+            
+    def amostras(self):
+        with self._lock:
+            return [(self.nome, chave, valor) for chave, valor in self._valores.items()]
+
+class Medidor(Contador):
+    tipo = 'gauge'
+    
+    def dec(self, valor=1, **rotulos):
+        self.inc(-valor, **rotulos)
+
+class Histograma:
+    tipo = 'histogram'
+    
+    def __init__(self, nome, ajuda, buckets):
+        self.nome, self.ajuda, self.buckets = nome, ajuda, buckets
+        self._series = {}
+        self._lock = threading.Lock()
+        
+    def observar(self, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._series.setdefault(chave, {'buckets': [0] * len(self.buckets), 'soma': 0.0, 'total': 0})
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie['buckets'][i] += 1
+            serie['soma'] += valor
+            serie['total'] += 1
+            
+    def amostras(self):
+        resultado = []
+        with self._lock:
+            for chave, serie in self._series.items():
+                for limite, contagem in zip(self.buckets, serie['buckets']):
+                    resultado.append((f'{self.nome}_bucket', chave + (('le', limite),), contagem))
+                resultado.append((f'{self.nome}_bucket', chave + (('le', '+Inf'),), serie['total']))
+                resultado.append((f'{self.nome}_sum', chave, round(serie['soma'], 6)))
+                resultado.append((f'{self.nome}_count', chave, serie['total']))
+        return resultado
+
+requisicao_segundos = Histograma('valex_http_requisicao_segundos', 'Duração das requisições por rota', BUCKETS_REQUISICAO)
+requisicoes_total = Contador('valex_http_requisicoes_total', 'Requisições por rota e status')
+requisicoes_andamento = Medidor('valex_http_requisicoes_em_andamento', 'Requisições sendo atendidas agora')
+sql_comandos_total = Contador('valex_sql_comandos_total', 'Comandos SQL executados por rota')
+sql_segundos_total = Contador('valex_sql_segundos_total', 'Tempo no banco por rota')
+pool_checkouts_total = Contador('valex_db_pool_checkouts_total', 'Conexões retiradas do pool')
+pool_em_uso = Medidor('valex_db_pool_conexoes_em_uso', 'Conexões do pool em uso')
+importacao_segundos = Histograma('valex_importacao_segundos', 'Duração das importações contábeis', BUCKETS_IMPORTACAO)
+logs_descartados_total = Contador('valex_logs_descartados_total', 'Registros de log descartados com a fila cheia')
+
+METRICAS = (
+    requisicao_segundos, requisicoes_total, requisicoes_andamento, sql_comandos_total,
+    sql_segundos_total, pool_checkouts_total, pool_em_uso, importacao_segundos, logs_descartados_total
+)
+
+# Eventos de todos os engines/pools (o engine do Flask-SQLAlchemy é criado sob demanda)
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_do_comando(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('inicio_comando', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_do_comando(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info['inicio_comando'].pop()
+    if has_request_context():
+        g.sql_comandos = g.get('sql_comandos', 0) + 1
+        g.sql_segundos = g.get('sql_segundos', 0.0) + time.perf_counter() - inicio
+
+@event.listens_for(Pool, 'checkout')
+def _checkout(*_):
+    pool_checkouts_total.inc()
+    pool_em_uso.inc()
+
+@event.listens_for(Pool, 'checkin')
+def _checkin(*_):
+    pool_em_uso.dec()
+
+class ProvedorJSONMedido(ProvedorJSON):
+    """
+    Provedor JSON da aplicação que acumula o tempo de serialização da requisição.
+    """
+    def response(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        resposta = super().response(*args, **kwargs)
+        if has_request_context():
+            g.serializacao_segundos = g.get('serializacao_segundos', 0.0) + time.perf_counter() - inicio
+        return resposta
+
+def _metricas_do_pool(db):
+    # Tamanho e overflow são lidos do pool na hora da coleta
+    pool = db.engine.pool
+    linhas = []
+    if hasattr(pool, 'size'):
+        linhas += ['# TYPE valex_db_pool_tamanho gauge', f'valex_db_pool_tamanho {pool.size()}']
+    if hasattr(pool, 'overflow'):
+        # O SQLAlchemy conta o overflow a partir de -pool_size
+        linhas += ['# TYPE valex_db_pool_overflow gauge', f'valex_db_pool_overflow {max(pool.overflow(), 0)}']
+    return linhas
+
+def exportar(db=None):
+    linhas = []
+    for metrica in METRICAS:
+        linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+        linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+        for nome, rotulos, valor in metrica.amostras():
+            linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+    if db is not None:
+        linhas += _metricas_do_pool(db)
+    return '\n'.join(linhas) + '\n'
+
+def configurar_metricas(app):
+    from models.models import db
+    
+    app.json = ProvedorJSONMedido(app)
+    
+    @app.before_request
+    def iniciar_medicao():
+        g.inicio_requisicao = time.perf_counter()
+        g.sql_comandos, g.sql_segundos, g.serializacao_segundos = 0, 0.0, 0.0
+        requisicoes_andamento.inc()
+        
+    @app.after_request
+    def registrar_medicao(resposta):
+        total = time.perf_counter() - g.get('inicio_requisicao', time.perf_counter())
+        sql_segundos = g.get('sql_segundos', 0.0)
+        
+        resposta.headers['Server-Timing'] = (
+            f'db;dur={sql_segundos * 1000:.1f};desc="{g.get("sql_comandos", 0)} comandos", '
+            f'serialize;dur={g.get("serializacao_segundos", 0.0) * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        
+        rota = request.url_rule.rule if request.url_rule else 'desconhecida'
+        requisicao_segundos.observar(total, rota=rota, metodo=request.method)
+        requisicoes_total.inc(rota=rota, metodo=request.method, status=resposta.status_code)
+        sql_comandos_total.inc(g.get('sql_comandos', 0), rota=rota)
+        sql_segundos_total.inc(round(sql_segundos, 6), rota=rota)
+        return resposta
+        
+    @app.teardown_request
+    def finalizar_medicao(_erro):
+        if 'inicio_requisicao' in g:
+            requisicoes_andamento.dec()
+        
+    @app.route('/metrics')
+    def metrics():
+        return Response(exportar(db), mimetype='text/plain; version=0.0.4')
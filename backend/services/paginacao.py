@@ -0,0 +1,127 @@
+"""
+Paginação por chave (keyset) para as listagens da API.
+
+A página seguinte é buscada com `WHERE (colunas) > (valores da última linha)`
+na mesma ordem do índice, em vez de OFFSET: a centésima página custa o mesmo
+que a primeira. O cursor entregue ao cliente é opaco (base64 dos valores da
+última linha) e a página vem no corpo como lista, como antes; o cursor da
+próxima página vai nos cabeçalhos X-Proximo-Cursor e Link.
+"""
+import base64
+import json
+from datetime import date, datetime
+from urllib.parse import urlencode
+from flask import jsonify, request # type: ignore
+from sqlalchemy import and_, or_ # type: ignore
+from services.serializacao import TAMANHO_LOTE, resposta_json_em_fluxo
+
+LIMITE_MAXIMO = 500
+
+def codificar_cursor(valores):
+    valores = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, colunas):
+    """
+    Converte o cursor de volta nos valores das colunas de ordenação. Levanta
+    ValueError se o cursor não foi gerado para essas colunas.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+        
+    if not isinstance(valores, list) or len(valores) != len(colunas):
+        raise ValueError("Cursor inválido")
+        
+    convertidos = []
+    for coluna, valor in zip(colunas, valores):
+        tipo = coluna.type.python_type
+        if valor is not None and tipo in (date, datetime):
+            valor = tipo.fromisoformat(valor)
+        convertidos.append(valor)
+    return convertidos
+
+def ler_limite(padrao=None):
+    """
+    Lê o parâmetro `limite` da requisição, limitado a LIMITE_MAXIMO. Sem
+    `limite` nem `cursor`, retorna `padrao` (None = listagem completa).
+    """
+    limite = request.args.get('limite')
+    if limite is None:
+        if padrao is None and request.args.get('cursor'):
+            return LIMITE_MAXIMO
+        return padrao
+    try:
+        limite = int(limite)
+    except ValueError:
+        raise ValueError("Parâmetro 'limite' deve ser um número inteiro")
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+def _apos(colunas, valores, descendente):
+    # (a, b, c) > (x, y, z) expandido em OR, que todos os bancos sabem resolver pelo índice
+    condicoes = []
+    for i, (coluna, valor) in enumerate(zip(colunas, valores)):
+        iguais = [c == v for c, v in zip(colunas[:i], valores[:i])]
+        seguinte = coluna < valor if descendente else coluna > valor
+        condicoes.append(and_(*iguais, seguinte))
+    return or_(*condicoes)
+
+def paginar(query, colunas, limite, cursor=None, descendente=False):
+    """
+    Aplica ordenação, cursor e limite à query.
+    
+    `colunas` devem identificar a linha de forma única (terminar no id) e ser
+    selecionadas pela query com esses mesmos nomes. Retorna (linhas,
+    proximo_cursor); proximo_cursor é None na última página.
+    """
+    if cursor:
+        query = query.filter(_apos(colunas, decodificar_cursor(cursor, colunas), descendente))
+        
+    query = query.order_by(*[c.desc() if descendente else c.asc() for c in colunas])
+    if limite is None:
+        return query.all(), None
+        
+    # Uma linha a mais diz se existe próxima página sem precisar de COUNT
+    linhas = query.limit(limite + 1).all()
+    if len(linhas) <= limite:
+        return linhas, None
+        
+    linhas = linhas[:limite]
+    return linhas, codificar_cursor(_valores(linhas[-1], colunas))
+
+def _valores(linha, colunas):
+    # A linha pode ser uma entidade (Produtor), uma tupla de colunas
+    # (with_entities) ou uma tupla com a entidade primeiro (Atividade, nome, ...)
+    campos = getattr(linha, '_fields', ())
+    if campos and all(coluna.key in campos for coluna in colunas):
+        return [getattr(linha, coluna.key) for coluna in colunas]
+    entidade = linha[0] if campos or isinstance(linha, tuple) else linha
+    return [getattr(entidade, coluna.key) for coluna in colunas]
+
+def resposta_paginada(itens, proximo_cursor):
+    resposta = jsonify(itens)
+    if proximo_cursor:
+        resposta.headers['X-Proximo-Cursor'] = proximo_cursor
+        
+        args = request.args.to_dict()
+        args['cursor'] = proximo_cursor
+        resposta.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resposta
+
+def listagem(query, colunas, padrao=None, descendente=False):
+    """
+    Resposta de uma listagem selecionada com with_entities. Sem `limite` nem
+    `cursor` a listagem completa é escrita em fluxo direto do cursor do banco;
+    com eles, volta a página como em `paginar`.
+    """
+    limite = ler_limite(padrao)
+    cursor = request.args.get('cursor')
+    chaves = [coluna['name'] for coluna in query.column_descriptions]
+    
+    if limite is None:
+        query = query.order_by(*[c.desc() if descendente else c.asc() for c in colunas])
+        return resposta_json_em_fluxo(query.yield_per(TAMANHO_LOTE), chaves)
+        
+    linhas, proximo_cursor = paginar(query, colunas, limite, cursor, descendente)
+    return resposta_paginada([dict(zip(chaves, linha)) for linha in linhas], proximo_cursor)
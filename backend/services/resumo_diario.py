@@ -0,0 +1,108 @@
+"""
+Resumo diário de pallets por produtor × variedade × classificação × fazenda.
+
+Mantido de forma incremental a cada atividade criada ou excluída, para que o
+painel do gestor leia os totais do dia e a análise da safra
+(services/analise_colheita.py) some dias inteiros sem reagregar a tabela atividade.
+"""
+from collections import defaultdict
+from sqlalchemy import bindparam # type: ignore
+from models.models import db, Atividade, ResumoDiarioAtividade
+from services.datas import data_local
+from services.upsert import upsert
+
+SEM_CLASSIFICACAO = 0
+
+CHAVES = ('data', 'produtor_id', 'variedade_id', 'classificacao_id', 'fazenda_id')
+TOTAIS = ('total_pallets', 'total_caixas', 'quantidade_registros')
+
+def _agrupar(atividades, sinal=1):
+    """
+    Soma pallets, caixas e registros por chave do resumo.
+    Aceita objetos Atividade ou linhas de consulta com os mesmos atributos.
+    """
+    totais = defaultdict(lambda: [0, 0, 0])
+    
+    for atividade in atividades:
+        chave = (
+            data_local(atividade.created_at),
+            atividade.produtor_id,
+            atividade.variedade_id,
+            atividade.classificacao_id or SEM_CLASSIFICACAO,
+            atividade.fazenda_id
+        )
+        total = totais[chave]
+        # int(): a rota de criação grava o valor recebido no JSON, que pode vir como texto ("3")
+        total[0] += sinal * int(atividade.quantidade_pallets)
+        total[1] += sinal * int(atividade.caixas or 0)
+        total[2] += sinal
+        
+    return [
+        dict(zip(CHAVES + TOTAIS, chave + tuple(total)))
+        for chave, total in totais.items()
+    ]
+
+def registrar_atividades(atividades):
+    """
+    Acrescenta atividades já persistidas (com created_at preenchido) ao resumo.
+    Deve ser chamada na mesma transação que grava as atividades.
+    """
+    upsert(
+        ResumoDiarioAtividade.__table__,
+        _agrupar(atividades),
+        chaves=CHAVES,
+        incrementar=TOTAIS
+    )
+
+def remover_atividades(atividades):
+    """
+    Desconta atividades do resumo e apaga as chaves que ficaram sem registros.
+    Deve ser chamada na mesma transação que exclui as atividades.
+    """
+    tabela = ResumoDiarioAtividade.__table__
+    linhas = _agrupar(atividades, sinal=-1)
+    
+    if not linhas:
+        return
+        
+    db.session.execute(
+        tabela.update()
+        .where(*[tabela.c[chave] == bindparam(f'b_{chave}') for chave in CHAVES])
+        .values({total: tabela.c[total] + bindparam(f'b_{total}') for total in TOTAIS}),
+        [{f'b_{coluna}': valor for coluna, valor in linha.items()} for linha in linhas]
+    )
+    # Só as chaves recém-descontadas: sem filtro, o DELETE varreria (e no
+    # MySQL bloquearia por intervalo) o resumo inteiro a cada exclusão
+    chave = db.tuple_(*[tabela.c[coluna] for coluna in CHAVES])
+    db.session.execute(
+        tabela.delete().where(
+            chave.in_([tuple(linha[coluna] for coluna in CHAVES) for linha in linhas]),
+            tabela.c.quantidade_registros <= 0
+        )
+    )
+
+def reconstruir():
+    """
+    Recalcula todo o resumo a partir da tabela atividade.
+    Retorna a quantidade de linhas gravadas no resumo.
+    """
+    tabela = ResumoDiarioAtividade.__table__
+    
+    atividades = db.session.query(
+        Atividade.produtor_id,
+        Atividade.variedade_id,
+        Atividade.classificacao_id,
+        Atividade.fazenda_id,
+        Atividade.quantidade_pallets,
+        Atividade.caixas,
+        Atividade.created_at
+    ).yield_per(5000)
+    
+    linhas = _agrupar(atividades)
+    
+    db.session.execute(tabela.delete())
+    if linhas:
+        db.session.execute(tabela.insert(), linhas)
+    db.session.commit()
+    
+    return len(linhas)
@@ -0,0 +1,121 @@
+"""
+Serialização JSON das respostas.
+
+ProvedorJSON usa o orjson quando instalado (com fallback para o json da
+biblioteca padrão) e converte Decimal, date e datetime direto, sem que as
+rotas precisem montar floats e strings antes. `resposta_json_em_fluxo`
+escreve listagens grandes como um array JSON em blocos, lendo do cursor do
+banco, sem montar a lista inteira em memória.
+"""
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, g, request, stream_with_context # type: ignore
+from flask.json.provider import DefaultJSONProvider # type: ignore
+
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+
+TAMANHO_LOTE = 1000
+
+def _padrao(valor):
+    # DECIMAL(15,2) vira número, como as rotas já faziam com float()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+def _opcoes_orjson(ordenar):
+    return orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if ordenar else 0)
+
+def para_json(valor, ordenar=False):
+    """
+    Serializa `valor` em bytes UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(valor, default=_padrao, option=_opcoes_orjson(ordenar))
+    return json.dumps(valor, default=_padrao, ensure_ascii=False, sort_keys=ordenar, separators=(',', ':')).encode()
+
+class ProvedorJSON(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _padrao)
+            return json.dumps(obj, **kwargs)
+        return para_json(obj, self.sort_keys).decode()
+        
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(para_json(obj, self.sort_keys), mimetype=self.mimetype)
+
+def _blocos_do_array(linhas, chaves, tamanho_lote):
+    yield b'['
+    primeiro = True
+    lote = []
+    for linha in linhas:
+        lote.append(dict(zip(chaves, linha)))
+        if len(lote) >= tamanho_lote:
+            yield (b'' if primeiro else b',') + para_json(lote)[1:-1]
+            primeiro = False
+            lote = []
+    if lote:
+        yield (b'' if primeiro else b',') + para_json(lote)[1:-1]
+    yield b']'
+
+def _gzip(blocos):
+    # Compressão incremental: o Flask-Compress comprimiria o corpo inteiro de uma vez
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+def _copiar(blocos, ao_concluir, limite, codificacao=None):
+    """
+    Repassa os blocos e, se o fluxo terminar com até `limite` bytes, entrega o
+    corpo inteiro a `ao_concluir(corpo, codificacao)`. Fluxo interrompido
+    (cliente desconectou) não chega ao fim do gerador e não é entregue.
+    """
+    partes = []
+    tamanho = 0
+    for bloco in blocos:
+        if partes is not None:
+            tamanho += len(bloco)
+            if tamanho <= limite:
+                partes.append(bloco)
+            else:
+                partes = None  # Grande demais para o cache: só repassa
+        yield bloco
+    if partes is not None:
+        ao_concluir(b''.join(partes), codificacao)
+
+def resposta_em_fluxo(blocos, mimetype, cabecalhos=None):
+    """
+    Resposta escrita à medida que o gerador `blocos` (bytes) é percorrido,
+    comprimida com gzip em blocos quando o cliente aceita.
+    
+    Dentro de uma rota com cache (services/cache_respostas.py), o corpo sem
+    compressão e, se houver, o comprimido também são entregues ao cache ao
+    final do fluxo.
+    """
+    copia = g.pop('copia_fluxo', None)
+    if copia is not None:
+        blocos = _copiar(blocos, *copia)
+    cabecalhos = dict(cabecalhos or {}, Vary='Accept-Encoding')
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        blocos = _gzip(blocos)
+        if copia is not None:
+            blocos = _copiar(blocos, *copia, codificacao='gzip')
+        cabecalhos['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(blocos), mimetype=mimetype, headers=cabecalhos)
+
+def resposta_json_em_fluxo(linhas, chaves, tamanho_lote=TAMANHO_LOTE):
+    """
+    Resposta com um array JSON de objetos {chave: valor} escrito em blocos
+    enquanto `linhas` (ex.: query com yield_per) é percorrido.
+    """
+    return resposta_em_fluxo(_blocos_do_array(linhas, chaves, tamanho_lote), 'application/json')
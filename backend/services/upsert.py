@@ -0,0 +1,39 @@
+from models.models import db
+
+def _insert_do_dialeto(tabela):
+    dialeto = db.session.get_bind().dialect.name
+    
+    if dialeto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert # type: ignore
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert # type: ignore
+    elif dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert # type: ignore
+    else:
+        raise NotImplementedError(f"Upsert não suportado para o banco '{dialeto}'")
+        
+    return dialeto, insert(tabela)
+
+def upsert(tabela, linhas, chaves, atualizar=(), incrementar=()):
+    """
+    Insere as linhas em lote; quando a chave única já existe, sobrescreve as
+    colunas de `atualizar` e soma os valores novos às colunas de `incrementar`.
+    
+    Usa INSERT ... ON DUPLICATE KEY UPDATE no MySQL e ON CONFLICT nos demais
+    bancos (SQLite nos testes locais). Executa um único executemany.
+    """
+    if not linhas:
+        return
+        
+    dialeto, stmt = _insert_do_dialeto(tabela)
+    novo = stmt.inserted if dialeto == 'mysql' else stmt.excluded
+    
+    valores = {coluna: novo[coluna] for coluna in atualizar}
+    valores.update({coluna: tabela.c[coluna] + novo[coluna] for coluna in incrementar})
+    
+    if dialeto == 'mysql':
+        stmt = stmt.on_duplicate_key_update(valores)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=list(chaves), set_=valores)
+        
+    db.session.execute(stmt, linhas)
@@ -8,13 +8,13 @@ import { ThemeProvider } from './components/ThemeContext';
 // Componente wrapper para passar as props corretamente
 const CooperadoDashboardWrapper = () => {
   const location = useLocation();
-  const state = location.state as { cooperadoNome: string } | null;
+  const state = location.state as { cooperadoNome: string; produtorId?: number } | null;
   
   if (!state?.cooperadoNome) {
     return <Homepage />;
   }
   
-  return <CooperadoRegistro cooperadoNome={state.cooperadoNome} />;
+  return <CooperadoRegistro cooperadoNome={state.cooperadoNome} produtorId={state.produtorId} />;
 };
 
 const App = () => {
@@ -3,11 +3,14 @@ import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { useCallback } from 'react';
 import { useTheme } from './ThemeContext';
+import { assinarAtividades } from '../config/eventos';
+import { enfileirarAtividade, sincronizarAoReconectar, sincronizarPendentes } from '../config/filaOffline';
 import './CooperadoRegistro.css';
 
 
 interface CooperadoRegistroProps {
   cooperadoNome: string;
+  produtorId?: number;
 }
 
 interface Fazenda {
@@ -71,7 +74,16 @@ interface Atividade {
   caixas: number;
 }
 
-const CooperadoRegistro: React.FC<CooperadoRegistroProps> = ({ cooperadoNome }) => {
+interface Bootstrap {
+  produtor: Produtor;
+  fazendas: Fazenda[];
+  classificacoes: Classificacao[];
+  historico: Atividade[];
+  historico_proximo_cursor: string | null;
+  resumo: ResumoDia;
+}
+
+const CooperadoRegistro: React.FC<CooperadoRegistroProps> = ({ cooperadoNome, produtorId }) => {
   const navigate = useNavigate();
   const [produtor, setProdutor] = useState<Produtor | null>(null);
   const [fazendas, setFazendas] = useState<Fazenda[]>([]);
@@ -106,16 +118,6 @@ const CooperadoRegistro: React.FC<CooperadoRegistroProps> = ({ cooperadoNome })
     }
 }, [produtor?.id]);
 
-// Atualiza o useEffect do histórico para ser mais eficiente
-useEffect(() => {
-  if (!produtor?.id) return;
-  
-  fetchHistorico();
-  
-  const interval = setInterval(fetchHistorico, 15000);
-  return () => clearInterval(interval);
-}, [produtor?.id, fetchHistorico]);
-
 const handleCaixasChange = (e: React.ChangeEvent<HTMLInputElement>) => {
   const caixas = e.target.value;
   setQuantidadeCaixas(caixas);
@@ -174,87 +176,62 @@ const handleCaixasChange = (e: React.ChangeEvent<HTMLInputElement>) => {
       console.error('Erro ao buscar resumo do dia:', error);
     }
   }, [produtor]);
+  // Envia as atividades registradas sem conexão assim que ela voltar
+  useEffect(() => {
+    return sincronizarAoReconectar(() => {
+      fetchResumoDia();
+      fetchHistorico();
+    });
+  }, [fetchResumoDia, fetchHistorico]);
+
   useEffect(() => {
     if (!produtor?.id) return;
   
-    // Buscar resumo inicial
-    fetchResumoDia();
-  
-    // Configurar intervalo de atualização (a cada 30 segundos)
-    const interval = setInterval(fetchResumoDia, 30000);
-  
-    // Limpar intervalo quando o componente for desmontado
-    return () => clearInterval(interval);
-  }, [produtor?.id, fetchResumoDia]); // Adicione fetchResumoDia como dependência
+    // O resumo e o histórico iniciais vêm do bootstrap. Atualizar resumo e histórico a cada atividade registrada ou excluída (fecha a conexão ao desmontar)
+    return assinarAtividades(`/eventos/produtor/${produtor.id}`, () => {
+      fetchResumoDia();
+      fetchHistorico();
+    });
+  }, [produtor?.id, fetchResumoDia, fetchHistorico]); // Adicione fetchResumoDia como dependência
 
+  // Uma única requisição ao abrir a tela: produtor, fazendas, classificações,
+  // histórico e resumo da semana
   useEffect(() => {
-    const fetchProdutorData = async () => {
+    const fetchBootstrap = async () => {
       try {
-        const response = await axios.get(`${process.env.REACT_APP_API_URL}/produtores`);
-        const produtores = response.data;
-        
-        const produtorEncontrado = produtores.find(
-          (p: Produtor) => p.nome === cooperadoNome
-        );
-        
-        if (produtorEncontrado) {
-          setProdutor(produtorEncontrado);
-          
-          // Buscar fazendas do produtor e agrupar por nome
-          const fazendasResponse = await axios.get(
-            `${process.env.REACT_APP_API_URL}/fazendas/produtor/${produtorEncontrado.id}`
-          );
-          
-          // Agrupa fazendas por nome
-          const fazendasUnicas = fazendasResponse.data.reduce((acc: any[], curr: any) => {
-            if (!acc.find((f: any) => f.nome === curr.nome)) {
-              acc.push(curr);
-            }
-            return acc;
-          }, []);
-          
-          setFazendas(fazendasUnicas);
+        let id = produtorId;
+        if (!id) {
+          const response = await axios.get(`${process.env.REACT_APP_API_URL}/produtores`);
+          id = response.data.find((p: Produtor) => p.nome === cooperadoNome)?.id;
+          if (!id) return;
         }
+
+        const response = await axios.get<Bootstrap>(
+          `${process.env.REACT_APP_API_URL}/cooperado/${id}/bootstrap`
+        );
+        const dados = response.data;
+
+        // Agrupa fazendas por nome
+        const fazendasUnicas = dados.fazendas.reduce((acc: Fazenda[], curr: Fazenda) => {
+          if (!acc.find((f) => f.nome === curr.nome)) {
+            acc.push(curr);
+          }
+          return acc;
+        }, []);
+
+        setProdutor(dados.produtor);
+        setFazendas(fazendasUnicas);
+        setClassificacoes(dados.classificacoes);
+        setHistorico(dados.historico);
+        setResumoDia(dados.resumo);
       } catch (error) {
         console.error('Erro ao buscar dados do produtor:', error);
         alert('Erro ao carregar dados. Por favor, tente novamente.');
       }
     };
-  
-    fetchProdutorData();
-  }, [cooperadoNome]);
-
-  useEffect(() => {
-    const fetchClassificacoes = async () => {
-      try {
-        const response = await axios.get(`${process.env.REACT_APP_API_URL}/classificacoes`);
-        setClassificacoes(response.data);
-      } catch (error) {
-        console.error('Erro ao buscar classificações:', error);
-      }
-    };
-
-    fetchClassificacoes();
-  }, []);
 
-  useEffect(() => {
-    const fetchHistorico = async () => {
-      if (!produtor?.id) return;
-      try {
-        const response = await axios.get(`${process.env.REACT_APP_API_URL}/atividades/historico/${produtor.id}`)
-        setHistorico(response.data);
-      } catch (error) {
-        console.error('Erro ao buscar histórico:', error);
-      }
-    };
-  
-    if (produtor?.id) {
-      fetchHistorico();
-      // Atualizar a cada 30 segundos
-      const interval = setInterval(fetchHistorico, 30000);
-      return () => clearInterval(interval);
-    }
-  }, [produtor?.id]);
+    fetchBootstrap();
+  }, [cooperadoNome, produtorId]);
 
   const handleDeleteAtividade = (atividadeId: number) => {
     setDeleteActivityId(atividadeId);
@@ -304,17 +281,32 @@ const handleCaixasChange = (e: React.ChangeEvent<HTMLInputElement>) => {
             caixas: numeroCaixas
         };
 
-        await axios.post(`${process.env.REACT_APP_API_URL}/atividades`, dadosAtividade);
-
-        fetchHistorico();
-        fetchResumoDia();
-
-        alert('Atividade registrada com sucesso!');
+        // Passa sempre pela fila local: sem conexão, é enviada ao reconectar
+        const pendente = enfileirarAtividade(dadosAtividade);
         setSelectedFazenda('');
         setSelectedVariedade('');
         setSelectedClassificacao('');
         setTipoAtividade('EMBALAGEM');
         setQuantidadeCaixas('');
+
+        let resultados;
+        try {
+            resultados = await sincronizarPendentes();
+        } catch (error) {
+            console.error('Sem conexão ao registrar atividade:', error);
+            alert('Sem conexão: a atividade foi guardada no aparelho e será enviada quando a conexão voltar');
+            return;
+        }
+
+        fetchHistorico();
+        fetchResumoDia();
+
+        const resultado = resultados.find((r) => r.chave === pendente.chave);
+        if (resultado?.status === 'invalida') {
+            alert(`Erro ao registrar atividade: ${resultado.erro}`);
+        } else {
+            alert('Atividade registrada com sucesso!');
+        }
     } catch (error) {
         console.error('Erro ao registrar atividade:', error);
         alert('Erro ao registrar atividade');
@@ -606,6 +598,22 @@ const handleCaixasChange = (e: React.ChangeEvent<HTMLInputElement>) => {
                 <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z" />
               </svg>
               Histórico de Atividades
+              {produtor && (
+                <span className="ml-auto flex space-x-3 text-sm font-medium">
+                  <a
+                    href={`${process.env.REACT_APP_API_URL}/atividades/export?produtor_id=${produtor.id}`}
+                    className="text-blue-600 hover:text-blue-800"
+                  >
+                    Exportar CSV
+                  </a>
+                  <a
+                    href={`${process.env.REACT_APP_API_URL}/atividades/export?produtor_id=${produtor.id}&formato=xlsx`}
+                    className="text-blue-600 hover:text-blue-800"
+                  >
+                    Exportar XLSX
+                  </a>
+                </span>
+              )}
             </h3>
             <div className="overflow-x-auto">
             <table className="min-w-full divide-y divide-gray-200">
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 
@@ -6,19 +6,6 @@ interface FinanceiroReportsProps {
   onClose: () => void;
 }
 
-interface ContaBalancete {
-  id: number;
-  conta: string;
-  reducao: number | null;
-  tipo: string | null;
-  descricao: string;
-  valor_anterior: number;
-  valor_periodo_debito: number;
-  valor_periodo_credito: number;
-  valor_atual: number;
-  competencia?: string;
-}
-
 interface ContaRelatorio {
   codigo: string;
   descricao: string;
@@ -28,6 +15,32 @@ interface ContaRelatorio {
   tipo: string;
 }
 
+interface Demonstrativos {
+  competencia: string;
+  versao: number;
+  balanco: {
+    ativo: ContaRelatorio[];
+    passivo: ContaRelatorio[];
+    patrimonio: ContaRelatorio[];
+    total_ativo: number;
+    total_passivo: number;
+    total_patrimonio: number;
+  };
+  sobras_perdas: {
+    receitas: ContaRelatorio[];
+    custos: ContaRelatorio[];
+    despesas: ContaRelatorio[];
+    total_receitas: number;
+    total_custos: number;
+    total_despesas: number;
+    resultado: number;
+  };
+  fluxo_caixa: { operacional: number; investimento: number; financiamento: number };
+  patrimonio_liquido: ContaRelatorio[];
+  contas_pagar: ContaRelatorio[];
+  contas_receber: ContaRelatorio[];
+}
+
 // Cores para os gráficos
 const COLORS = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884d8', '#4C9FB4', '#AE4C4C', '#8DAE4C'];
 
@@ -35,7 +48,6 @@ const FinanceiroReports: React.FC<FinanceiroReportsProps> = ({ onClose }) => {
   const [activeTab, setActiveTab] = useState<string>('balanco');
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string | null>(null);
-  const [, setBalanceteData] = useState<ContaBalancete[]>([]);
   const [competencia, setCompetencia] = useState<string>('2024-12');
   const [competenciasDisponiveis, setCompetenciasDisponiveis] = useState<string[]>(['2024-12']);
   
@@ -70,26 +82,6 @@ const FinanceiroReports: React.FC<FinanceiroReportsProps> = ({ onClose }) => {
     total_ativo: 0, total_passivo: 0, total_patrimonio: 0
   });
 
-  const processarDados = useCallback((dados: ContaBalancete[]) => {
-    if (!verificarDadosBalancete(dados)) {
-      return;
-    }
-  
-    console.log('Processando dados do balancete:', dados.length, 'registros');
-    
-    try {
-      processarContasPagar(dados);
-      processarContasReceber(dados);
-      processarFluxoCaixa(dados);
-      processarPatrimonioLiquido(dados);
-      processarSobrasPerdas(dados);
-      processarBalancoPatrimonial(dados);
-    } catch (error) {
-      console.error('Erro ao processar dados:', error);
-      setError(`Erro ao processar dados: ${error instanceof Error ? error.message : 'Erro desconhecido'}`);
-    }
-  }, []);
-
   // Carregar as competências disponíveis
   useEffect(() => {
     const fetchCompetencias = async () => {
@@ -108,380 +100,31 @@ const FinanceiroReports: React.FC<FinanceiroReportsProps> = ({ onClose }) => {
     fetchCompetencias();
   }, []);
 
-  // Carregar os dados do balancete
+  // Carregar os demonstrativos já calculados no servidor
   useEffect(() => {
-    const fetchBalancete = async () => {
+    const fetchDemonstrativos = async () => {
       setLoading(true);
       setError(null);
       
       try {
-        // Usar a competência na URL para garantir que os dados sejam filtrados corretamente
-        const response = await axios.get(`${process.env.REACT_APP_API_URL}/contabilidade/balancete/${competencia}`);
-        setBalanceteData(response.data);
-        processarDados(response.data);
+        const response = await axios.get<Demonstrativos>(`${process.env.REACT_APP_API_URL}/contabilidade/demonstrativos/${competencia}`);
+        const dados = response.data;
+        setBalanco(dados.balanco);
+        setSobrasPerdas(dados.sobras_perdas);
+        setFluxoCaixa(dados.fluxo_caixa);
+        setPatrimonioLiquido(dados.patrimonio_liquido);
+        setContasPagar(dados.contas_pagar);
+        setContasReceber(dados.contas_receber);
         setLoading(false);
       } catch (error) {
-        console.error('Erro ao buscar balancete', error);
+        console.error('Erro ao buscar demonstrativos', error);
         setError('Erro ao carregar dados do balancete para a competência selecionada');
         setLoading(false);
       }
     };
   
-    fetchBalancete();
-  }, [competencia, processarDados]);
-
-  const verificarDadosBalancete = (dados: ContaBalancete[]) => {
-    if (!dados || !Array.isArray(dados) || dados.length === 0) {
-      console.error('Dados do balancete vazios ou inválidos');
-      setError('Dados do balancete vazios ou inválidos');
-      return false;
-    }
-  
-    // Verificar estrutura básica das contas
-    const estruturaBasica = {
-      'Ativo': { prefixo: '1', natureza: 'DEVEDOR' },
-      'Passivo': { prefixo: '2', natureza: 'CREDOR' },
-      'Despesas': { prefixo: '3', natureza: 'DEVEDOR' },
-      'Receitas': { prefixo: '4', natureza: 'CREDOR' },
-    };
-  
-    // Log para análise da estrutura do balancete
-    console.log('Análise da estrutura do balancete:');
-    
-    Object.entries(estruturaBasica).forEach(([grupo, info]) => {
-      const contasGrupo = dados.filter(item => item.conta && item.conta.startsWith(info.prefixo));
-      
-      if (contasGrupo.length === 0) {
-        console.warn(`Alerta: Nenhuma conta do grupo '${grupo}' encontrada`);
-      }
-      
-      // Verificar a primeira conta do grupo para validar sinal
-      const primeiraConta = contasGrupo[0];
-      if (primeiraConta) {
-        const valorAtual = primeiraConta.valor_atual || 0;
-        const sinalEsperado = info.natureza === 'DEVEDOR' ? 1 : -1;
-        const sinalEncontrado = Math.sign(valorAtual);
-        
-        console.log(`Grupo ${grupo}: Primeira conta ${primeiraConta.conta} - ${primeiraConta.descricao}`);
-        console.log(`  Valor: ${valorAtual}, Sinal esperado: ${sinalEsperado}, Sinal encontrado: ${sinalEncontrado}`);
-        
-        if ((sinalEsperado > 0 && sinalEncontrado < 0) || (sinalEsperado < 0 && sinalEncontrado > 0)) {
-          console.warn(`  Alerta: Sinal contrário ao esperado para o grupo ${grupo}`);
-        }
-      }
-    });
-  
-    // Totais para validação
-    const totalAtivo = dados
-      .filter(item => item.conta && item.conta.startsWith('1'))
-      .reduce((sum, item) => sum + (item.valor_atual || 0), 0);
-      
-    const totalPassivo = dados
-      .filter(item => item.conta && item.conta.startsWith('2') && !item.conta.startsWith('2.4'))
-      .reduce((sum, item) => sum + (item.valor_atual || 0), 0);
-      
-    const totalPL = dados
-      .filter(item => item.conta && item.conta.startsWith('2.4'))
-      .reduce((sum, item) => sum + (item.valor_atual || 0), 0);
-      
-    const totalReceitas = dados
-      .filter(item => item.conta && item.conta.startsWith('4'))
-      .reduce((sum, item) => sum + (item.valor_atual || 0), 0);
-      
-    const totalDespesas = dados
-      .filter(item => item.conta && (item.conta.startsWith('3') || item.conta.startsWith('5')))
-      .reduce((sum, item) => sum + (item.valor_atual || 0), 0);
-  
-    console.log('Totais brutos para validação:');
-    console.log({
-      totalAtivo,
-      totalPassivo,
-      totalPL,
-      totalReceitas,
-      totalDespesas,
-      diferencaBalanco: totalAtivo + totalPassivo + totalPL,
-      resultado: totalReceitas + totalDespesas
-    });
-  
-    return true;
-  };
-
-  const processarContasPagar = (dados: ContaBalancete[]) => {
-    // Filtrar contas a pagar (grupo 2.1 - passivo circulante)
-    const contasFiltradas = dados.filter(item => 
-      item && item.conta && 
-      item.conta.startsWith('2.1') && 
-      item.tipo === 'A' && 
-      (item.valor_atual > 0 || false)
-    );
-
-    const contas = contasFiltradas.map(item => ({
-      codigo: item.conta,
-      descricao: item.descricao,
-      valor: item.valor_atual || 0,
-      percentual: 0, // Será calculado depois
-      nivel: item.conta ? item.conta.split('.').length : 0,
-      tipo: item.tipo || '',
-    }));
-
-    setContasPagar(contas);
-  };
-
-  const processarContasReceber = (dados: ContaBalancete[]) => {
-    // Filtrar contas a receber (grupo 1.1.2 - créditos)
-    const contasFiltradas = dados.filter(item => 
-      item && item.conta && 
-      item.conta.startsWith('1.1.2') && 
-      item.tipo === 'A' && 
-      (item.valor_atual > 0 || false)
-    );
-
-    const contas = contasFiltradas.map(item => ({
-      codigo: item.conta,
-      descricao: item.descricao,
-      valor: item.valor_atual || 0,
-      percentual: 0, // Será calculado depois
-      nivel: item.conta ? item.conta.split('.').length : 0,
-      tipo: item.tipo || '',
-    }));
-
-    setContasReceber(contas);
-  };
-
-  const processarFluxoCaixa = (dados: ContaBalancete[]) => {
-    // Para fluxo operacional, considerar mais contas e preservar o sinal
-    const operacional = dados
-      .filter(item => {
-        // Contas do grupo 1.1 (Ativo Circulante) e grupo 3 (Despesas) e grupo 4 (Receitas)
-        return item.conta && (
-          item.conta.startsWith('1.1.1') || // Caixa e equivalentes
-          item.conta.startsWith('3') ||     // Despesas operacionais
-          item.conta.startsWith('4')        // Receitas operacionais
-        );
-      })
-      .reduce((sum, item) => {
-        // Se for conta de receita (natureza credora)
-        if (item.conta && item.conta.startsWith('4')) {
-          return sum + ((item.valor_periodo_credito || 0) - (item.valor_periodo_debito || 0));
-        }
-        // Se for conta de despesa ou ativo (natureza devedora)
-        else {
-          return sum + ((item.valor_periodo_debito || 0) - (item.valor_periodo_credito || 0));
-        }
-      }, 0);
-    
-    // Para investimento (não usar Math.abs para preservar o sinal)
-    const investimento = dados
-      .filter(item => item.conta && (
-        item.conta.startsWith('1.2.2') || // Imobilizado
-        item.conta.startsWith('1.2.3')    // Investimentos
-      ))
-      .reduce((sum, item) => {
-        // Natureza devedora: aumento de ativos = saída de caixa (negativo no fluxo)
-        return sum - ((item.valor_periodo_debito || 0) - (item.valor_periodo_credito || 0));
-      }, 0);
-    
-    // Para financiamento
-    const financiamento = dados
-      .filter(item => item.conta && (
-        item.conta.startsWith('2.2.1') || // Empréstimos LP
-        item.conta.startsWith('2.4.1')    // Capital social
-      ))
-      .reduce((sum, item) => {
-        // Natureza credora: aumento de passivos = entrada de caixa (positivo no fluxo)
-        return sum + ((item.valor_periodo_credito || 0) - (item.valor_periodo_debito || 0));
-      }, 0);
-    
-    // Preservar sinais para análise correta
-    setFluxoCaixa({
-      operacional: operacional,
-      investimento: investimento,
-      financiamento: financiamento
-    });
-  };
-  
-  const processarPatrimonioLiquido = (dados: ContaBalancete[]) => {
-    // Filtrar contas de patrimônio líquido (grupo 2.4)
-    const contasFiltradas = dados.filter(item => 
-      item && item.conta && 
-      item.conta.startsWith('2.4') && 
-      (item.valor_atual !== 0)
-    );
-  
-    const contas = contasFiltradas.map(item => ({
-      codigo: item.conta,
-      descricao: item.descricao,
-      // Invertemos o sinal pois o saldo do PL deve aparecer como positivo
-      valor: Math.abs(item.valor_atual || 0),
-      percentual: 0,
-      nivel: item.conta ? item.conta.split('.').length : 0,
-      tipo: item.tipo || '',
-    }));
-  
-    setPatrimonioLiquido(contas);
-  };
-
-  const processarSobrasPerdas = (dados: ContaBalancete[]) => {
-    // Receitas - grupo 4 (contas de natureza credora devem ser apresentadas como positivas)
-    const receitas = dados
-      .filter(item => item && item.conta && item.conta.startsWith('4') && item.tipo === 'A')
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        // Inverte o sinal pois o saldo atual deve aparecer como positivo para receitas
-        valor: Math.abs(item.valor_atual || 0),
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }));
-    
-    // Custos - grupo 5 (já estão positivos, mantemos assim)
-    const custos = dados
-      .filter(item => item && item.conta && item.conta.startsWith('5') && item.tipo === 'A')
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        valor: item.valor_atual || 0,
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }));
-    
-    // Despesas - grupo 3 (já estão positivas, mantemos assim)
-    const despesas = dados
-      .filter(item => item && item.conta && item.conta.startsWith('3') && item.tipo === 'A')
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        valor: item.valor_atual || 0,
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }));
-    
-    // Calcular totais
-    const total_receitas = receitas.reduce((sum, item) => sum + item.valor, 0);
-    const total_custos = custos.reduce((sum, item) => sum + item.valor, 0);
-    const total_despesas = despesas.reduce((sum, item) => sum + item.valor, 0);
-    
-    // Cálculo correto do resultado: Receitas - Custos - Despesas
-    const resultado = total_receitas - total_custos - total_despesas;
-    
-    // Log para depuração
-    console.log('Totais DSP:', {
-      total_receitas,
-      total_custos,
-      total_despesas,
-      resultado
-    });
-    
-    setSobrasPerdas({
-      receitas,
-      custos,
-      despesas,
-      total_receitas,
-      total_custos,
-      total_despesas,
-      resultado
-    });
-  };
-
-  const processarBalancoPatrimonial = (dados: ContaBalancete[]) => {
-    // Ativo - grupo 1 (contas de natureza devedora, saldo já está positivo)
-    const ativo = dados
-      .filter(item => item && item.conta && item.conta.startsWith('1'))
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        valor: item.valor_atual || 0,
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }))
-      .sort((a, b) => a.codigo.localeCompare(b.codigo));
-    
-    // Passivo - grupo 2 (exceto 2.4 patrimônio líquido)
-    // Contas de natureza credora, devem ser apresentadas como positivas
-    const passivo = dados
-      .filter(item => item && item.conta && item.conta.startsWith('2') && !item.conta.startsWith('2.4'))
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        // Invertemos o sinal pois o saldo do passivo deve aparecer como positivo
-        valor: Math.abs(item.valor_atual || 0),
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }))
-      .sort((a, b) => a.codigo.localeCompare(b.codigo));
-    
-    // Patrimônio Líquido - grupo 2.4
-    // Contas de natureza credora, devem ser apresentadas como positivas
-    const patrimonio = dados
-      .filter(item => item && item.conta && item.conta.startsWith('2.4'))
-      .map(item => ({
-        codigo: item.conta,
-        descricao: item.descricao,
-        // Invertemos o sinal pois o saldo do PL deve aparecer como positivo
-        valor: Math.abs(item.valor_atual || 0),
-        percentual: 0,
-        nivel: item.conta ? item.conta.split('.').length : 0,
-        tipo: item.tipo || '',
-      }))
-      .sort((a, b) => a.codigo.localeCompare(b.codigo));
-    
-    // Calcular totais (buscando apenas as contas principais de nível 1)
-    // Para o Ativo
-    const total_ativo = dados.reduce((sum, item) => {
-      if (item && item.conta && 
-          (item.conta === '1' || 
-           (item.conta.startsWith('1') && item.conta.split('.').length === 1 && item.tipo === 'S'))) {
-        return sum + (item.valor_atual || 0);
-      }
-      return sum;
-    }, 0);
-    
-    // Para o Passivo (invertendo o sinal)
-    const total_passivo = dados.reduce((sum, item) => {
-      if (item && item.conta && 
-          ((item.conta.startsWith('2') && !item.conta.startsWith('2.4') && 
-            item.conta.split('.').length === 1 && item.tipo === 'S') || 
-           item.conta === '2')) {
-        // Invertemos o sinal pois o saldo do passivo deve aparecer como positivo
-        return sum + Math.abs(item.valor_atual || 0);
-      }
-      return sum;
-    }, 0);
-    
-    // Para o Patrimônio Líquido (invertendo o sinal)
-    const total_patrimonio = dados.reduce((sum, item) => {
-      if (item && item.conta && 
-          (item.conta === '2.4' || 
-           (item.conta.startsWith('2.4.') && item.conta.split('.').length === 2 && item.tipo === 'S'))) {
-        // Invertemos o sinal pois o saldo do PL deve aparecer como positivo
-        return sum + Math.abs(item.valor_atual || 0);
-      }
-      return sum;
-    }, 0);
-    
-    // Verificar se o balanço fecha - para depuração
-    console.log('Verificação de Balanço:', { 
-      ativo: total_ativo, 
-      passivo: total_passivo,
-      patrimonio: total_patrimonio,
-      passivo_pl: total_passivo + total_patrimonio,
-      diferenca: total_ativo - (total_passivo + total_patrimonio)
-    });
-    
-    setBalanco({
-      ativo,
-      passivo,
-      patrimonio,
-      total_ativo,
-      total_passivo,
-      total_patrimonio
-    });
-  };
+    fetchDemonstrativos();
+  }, [competencia]);
 
   const formatarValor = (valor: number) => {
     return valor.toLocaleString('pt-BR', {
@@ -1303,6 +946,18 @@ const FinanceiroReports: React.FC<FinanceiroReportsProps> = ({ onClose }) => {
                   ))}
                 </select>
               </div>
+              <a
+                href={`${process.env.REACT_APP_API_URL}/contabilidade/balancete/${competencia}/export`}
+                className="px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-400 font-medium"
+              >
+                Balancete CSV
+              </a>
+              <a
+                href={`${process.env.REACT_APP_API_URL}/contabilidade/balancete/${competencia}/export?formato=xlsx`}
+                className="px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-400 font-medium"
+              >
+                Balancete XLSX
+              </a>
               <button 
                 onClick={onClose}
                 className="px-4 py-2 bg-white text-blue-700 rounded-lg hover:bg-blue-50 font-medium"
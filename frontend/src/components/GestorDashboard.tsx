@@ -5,6 +5,7 @@ import { useNavigate } from 'react-router-dom';
 import { useTheme } from './ThemeContext';
 import PlanoContasReport from './PlanoContasReport';
 import FinanceiroReports from './FinanceiroReports'
+import { assinarAtividades } from '../config/eventos';
 import './GestorDashboard.css';
 
 interface ResumoDia {
@@ -63,8 +64,8 @@ const GestorDashboard: React.FC = () => {
 
   useEffect(() => {
     fetchDados();
-    const interval = setInterval(fetchDados, 60000);
-    return () => clearInterval(interval);
+    // Atualiza quando alguma atividade é registrada ou excluída, sem polling
+    return assinarAtividades('/eventos/gestor', fetchDados);
   }, []);
 
   if (isLoading) {
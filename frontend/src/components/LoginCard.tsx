@@ -83,7 +83,8 @@ const LoginCard: React.FC<LoginCardProps> = ({ type, onClose }) => {
         const senhaCorreta = senhasCooperados[username] || '';
         
         if (password === senhaCorreta) {
-          navigate('/cooperado-dashboard', { state: { cooperadoNome: username } });
+          const produtorId = produtores.find((p) => p.nome === username)?.id;
+          navigate('/cooperado-dashboard', { state: { cooperadoNome: username, produtorId } });
         } else {
             alert('Senha inválida para o cooperado selecionado!');
           }
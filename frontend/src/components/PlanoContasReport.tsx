@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import {Tooltip, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import axios from 'axios';
+import { aguardarImportacao, JobImportacao } from '../config/importacoes';
 
 interface PlanoContasReportProps {
   onClose: () => void;
@@ -42,6 +43,7 @@ interface DataType {
 }
 // Cores para os gráficos
 const COLORS = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884d8'];
+const LIMITE_BUSCA = 20;
 
 const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
     const [data, setData] = useState<DataType>({
@@ -134,18 +136,30 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
   // eslint-disable-next-line react-hooks/exhaustive-deps
 }, []);
 
+  // Busca no servidor (código, código reduzido ou descrição sem acentos), com uma
+  // pequena espera entre teclas; a resposta de uma busca anterior é descartada
   useEffect(() => {
-    if (data && search.trim()) {
-      const term = search.toLowerCase();
-      const filtered = data.contasCompletas.filter(conta => 
-        conta.codigo.toLowerCase().includes(term) || 
-        conta.descricao.toLowerCase().includes(term)
-      );
-      setFilteredAccounts(filtered);
-    } else {
+    const termo = search.trim();
+    if (!termo) {
       setFilteredAccounts([]);
+      return;
     }
-  }, [search, data]);
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      axios.get<Conta[]>(`${process.env.REACT_APP_API_URL}/contabilidade/plano-contas/busca`, {
+        params: { q: termo, limite: LIMITE_BUSCA },
+        signal: controller.signal
+      })
+        .then((response) => setFilteredAccounts(response.data))
+        .catch((err) => {
+          if (!axios.isCancel(err)) console.error('Erro ao buscar contas:', err);
+        });
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [search]);
 
   const toggleGroup = (grupo: string) => {
     setExpandedGroups(prev => ({
@@ -212,7 +226,7 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
     formData.append('arquivo', file);
     
     try {
-      const response = await axios.post(
+      const response = await axios.post<JobImportacao>(
         `${process.env.REACT_APP_API_URL}/contabilidade/importar-plano`,
         formData,
         {
@@ -222,7 +236,17 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
         }
       );
       
-      setUploadStatus(`Importação concluída! Importados: ${response.data.registros_importados}, Atualizados: ${response.data.registros_atualizados}`);
+      // A importação roda em segundo plano; acompanha o job até terminar
+      setUploadStatus('Arquivo recebido. Importando plano de contas...');
+      const job = await aguardarImportacao(response.data, (atual) => {
+        if (atual.status === 'EXECUTANDO') setUploadStatus('Importando plano de contas...');
+      });
+      
+      if (job.status === 'CONCLUIDO') {
+        setUploadStatus(`Importação concluída! Importados: ${job.resultado?.registros_importados}, Atualizados: ${job.resultado?.registros_atualizados}`);
+      } else {
+        setUploadStatus(`Erro na importação: ${job.erro || 'importação interrompida'}`);
+      }
     } catch (error: any) {
         console.error('Erro ao enviar arquivo:', error);
         // Exibe mensagem de erro mais detalhada
@@ -552,8 +576,8 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
                           </tr>
                         </thead>
                         <tbody className="bg-white divide-y divide-gray-200">
-                          {filteredAccounts.slice(0, 20).map(conta => (
-                            <tr key={conta.sequencial} className="hover:bg-gray-50">
+                          {filteredAccounts.map(conta => (
+                            <tr key={conta.id ?? conta.codigo} className="hover:bg-gray-50">
                               <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">
                                 {conta.codigo}
                               </td>
@@ -582,9 +606,9 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
                       Nenhuma conta encontrada com os termos pesquisados
                     </p>
                   )}
-                  {filteredAccounts.length > 20 && (
+                  {filteredAccounts.length >= LIMITE_BUSCA && (
                     <p className="text-center py-2 text-gray-500">
-                      Mostrando 20 de {filteredAccounts.length} resultados. Refine sua busca para ver mais resultados específicos.
+                      Mostrando os {LIMITE_BUSCA} primeiros resultados. Refine sua busca para ver mais resultados específicos.
                     </p>
                   )}
                 </div>
@@ -651,7 +675,7 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
                         formData.append('arquivo', file);
                         formData.append('competencia', competencia || '2024-12');
                         
-                        axios.post(
+                        axios.post<JobImportacao>(
                           `${process.env.REACT_APP_API_URL}/contabilidade/importar-balancete-csv`,
                           formData,
                           {
@@ -660,8 +684,17 @@ const PlanoContasReport: React.FC<PlanoContasReportProps> = ({ onClose }) => {
                             }
                           }
                         )
-                        .then(response => {
-                          setUploadStatus(`Importação CSV concluída! Balancete importado com ${response.data.registros_importados} registros para a competência ${response.data.competencia}`);
+                        .then(response => aguardarImportacao(response.data, (atual) => {
+                          if (atual.status === 'EXECUTANDO') {
+                            setUploadStatus(`Importando balancete: ${atual.linhas_processadas} linhas (${atual.linhas_por_segundo ?? 0} linhas/s)`);
+                          }
+                        }))
+                        .then(job => {
+                          if (job.status === 'CONCLUIDO') {
+                            setUploadStatus(`Importação CSV concluída! Balancete importado com ${job.resultado?.registros_importados} registros para a competência ${job.competencia}`);
+                          } else {
+                            setUploadStatus(`Erro na importação: ${job.erro || 'importação interrompida'}`);
+                          }
                         })
                         .catch(error => {
                           console.error('Erro ao enviar arquivo:', error);
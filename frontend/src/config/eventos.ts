@@ -0,0 +1,42 @@
+// src/config/eventos.ts
+import { API_URL } from './api';
+
+const TIPOS_ATIVIDADE = ['atividade_criada', 'atividade_removida'];
+
+// Espera antes de reabrir um fluxo que o servidor recusou (503 no limite de conexões)
+const ESPERA_NOVA_TENTATIVA_MS = 30000;
+
+/**
+ * Assina o fluxo SSE de atividades (ex.: `/eventos/gestor`) e chama `aoAtualizar`
+ * a cada atividade criada/removida e a cada reconexão (eventos perdidos além do
+ * buffer do servidor). Retorna a função que fecha a conexão.
+ */
+export const assinarAtividades = (caminho: string, aoAtualizar: () => void): (() => void) => {
+  let fonte: EventSource;
+  let conectou = false;
+  let novaTentativa: ReturnType<typeof setTimeout> | undefined;
+
+  const abrir = () => {
+    fonte = new EventSource(`${API_URL}${caminho}`);
+    TIPOS_ATIVIDADE.forEach((tipo) => fonte.addEventListener(tipo, aoAtualizar));
+    fonte.onopen = () => {
+      if (conectou) aoAtualizar();
+      conectou = true;
+    };
+    // Erros de rede o navegador reconecta sozinho; uma resposta não-200 (503 no
+    // limite de conexões) fecha a fonte de vez, então reabrimos mais tarde
+    fonte.onerror = () => {
+      if (fonte.readyState !== EventSource.CLOSED) return;
+      novaTentativa = setTimeout(() => {
+        aoAtualizar();
+        abrir();
+      }, ESPERA_NOVA_TENTATIVA_MS);
+    };
+  };
+  abrir();
+
+  return () => {
+    clearTimeout(novaTentativa);
+    fonte.close();
+  };
+};
@@ -0,0 +1,92 @@
+// src/config/filaOffline.ts
+import axios from 'axios';
+import { API_URL } from './api';
+
+export interface NovaAtividade {
+  produtor_id: number;
+  fazenda_id: number;
+  variedade_id: number;
+  classificacao_id: number | null;
+  tipo_atividade: string;
+  quantidade_pallets: number;
+  caixas: number | null;
+}
+
+export interface AtividadePendente extends NovaAtividade {
+  chave: string;
+  registrado_em: string;
+}
+
+export interface ResultadoLote {
+  chave: string;
+  status: 'criada' | 'duplicada' | 'invalida';
+  id?: number | null;
+  erro?: string;
+}
+
+const ARMAZENAMENTO = 'valex:atividades-pendentes';
+const LOTE_MAXIMO = 500;
+
+const gerarChave = (): string =>
+  typeof crypto !== 'undefined' && 'randomUUID' in crypto
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+export const atividadesPendentes = (): AtividadePendente[] =>
+  JSON.parse(localStorage.getItem(ARMAZENAMENTO) || '[]');
+
+const salvar = (pendentes: AtividadePendente[]) =>
+  localStorage.setItem(ARMAZENAMENTO, JSON.stringify(pendentes));
+
+/**
+ * Guarda a atividade na fila local com chave de idempotência e horário do registro.
+ * Ela só sai da fila quando o servidor responde por ela.
+ */
+export const enfileirarAtividade = (dados: NovaAtividade): AtividadePendente => {
+  const pendente = { ...dados, chave: gerarChave(), registrado_em: new Date().toISOString() };
+  salvar([...atividadesPendentes(), pendente]);
+  return pendente;
+};
+
+let sincronizacao: Promise<ResultadoLote[]> | null = null;
+
+/**
+ * Envia a fila em lotes para /atividades/lote. Reenvios são seguros: o servidor
+ * reconhece as chaves já gravadas. Rejeita se não houver conexão (a fila é mantida).
+ */
+export const sincronizarPendentes = (): Promise<ResultadoLote[]> => {
+  if (!sincronizacao) {
+    sincronizacao = (async () => {
+      const resultados: ResultadoLote[] = [];
+      try {
+        let lote = atividadesPendentes().slice(0, LOTE_MAXIMO);
+        while (lote.length > 0) {
+          const response = await axios.post<ResultadoLote[]>(`${API_URL}/atividades/lote`, lote);
+          const respondidas = new Set(response.data.map((resultado) => resultado.chave));
+          salvar(atividadesPendentes().filter((pendente) => !respondidas.has(pendente.chave)));
+          resultados.push(...response.data);
+          lote = atividadesPendentes().slice(0, LOTE_MAXIMO);
+        }
+      } finally {
+        sincronizacao = null;
+      }
+      return resultados;
+    })();
+  }
+  return sincronizacao;
+};
+
+/**
+ * Sincroniza agora e sempre que a conexão voltar. Retorna a função que para de observar.
+ */
+export const sincronizarAoReconectar = (aoSincronizar: (resultados: ResultadoLote[]) => void) => {
+  const sincronizar = () => {
+    if (!navigator.onLine || atividadesPendentes().length === 0) return;
+    sincronizarPendentes()
+      .then((resultados) => aoSincronizar(resultados))
+      .catch((error) => console.error('Erro ao sincronizar atividades pendentes:', error));
+  };
+  window.addEventListener('online', sincronizar);
+  sincronizar();
+  return () => window.removeEventListener('online', sincronizar);
+};
@@ -0,0 +1,36 @@
+// src/config/importacoes.ts
+import axios from 'axios';
+import { API_URL } from './api';
+
+export interface JobImportacao {
+  id: string;
+  tipo: 'plano' | 'balancete';
+  competencia: string | null;
+  status: 'PENDENTE' | 'EXECUTANDO' | 'CONCLUIDO' | 'ERRO' | 'INTERROMPIDO';
+  linhas_processadas: number;
+  linhas_ignoradas: number;
+  linhas_por_segundo: number | null;
+  erro: string | null;
+  resultado: { [chave: string]: any } | null;
+}
+
+const FINALIZADOS = ['CONCLUIDO', 'ERRO', 'INTERROMPIDO'];
+
+/**
+ * Consulta o job de importação até terminar, chamando `aoProgredir` a cada leitura.
+ * Retorna o job no estado final.
+ */
+export const aguardarImportacao = async (
+  job: JobImportacao,
+  aoProgredir: (job: JobImportacao) => void,
+  intervaloMs = 1000
+): Promise<JobImportacao> => {
+  let atual = job;
+  while (!FINALIZADOS.includes(atual.status)) {
+    await new Promise((resolve) => setTimeout(resolve, intervaloMs));
+    const response = await axios.get<JobImportacao>(`${API_URL}/contabilidade/jobs/${atual.id}`);
+    atual = response.data;
+    aoProgredir(atual);
+  }
+  return atual;
+};
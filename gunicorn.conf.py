@@ -1,12 +1,30 @@
-import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from config_servidor import opcoes_gunicorn, perfil_atual
 
 bind = "0.0.0.0:8000"
-workers = 2  # Reduzido para 2
+# Perfil escolhido por PERFIL_SERVIDOR (gthread, gevent ou sync), ver backend/config_servidor.py
+_opcoes = opcoes_gunicorn(perfil_atual())
+workers = _opcoes['workers']
+worker_class = _opcoes['worker_class']
+threads = _opcoes.get('threads', 1)
+worker_connections = _opcoes.get('worker_connections', 1000)
+# Constrói o app uma vez no mestre e faz fork dos workers (ver config_servidor.py)
+preload_app = _opcoes['preload_app']
 timeout = 60  # Reduzido para 60
 keepalive = 5
 max_requests = 1000
 max_requests_jitter = 50
-worker_class = "sync"
 loglevel = "info"
 accesslog = "-"
-errorlog = "-"
\ No newline at end of file
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Com preload_app o worker herda o app do mestre: descarta as conexões
+    # herdadas (sem fechá-las, são do mestre) para abrir as próprias
+    if preload_app:
+        from models.models import db
+        with worker.app.wsgi().app_context():
+            db.engine.dispose(close=False)